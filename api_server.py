@@ -0,0 +1,56 @@
+"""
+戦術提案 API サーバー (ローカル専用)
+Streamlit を経由せずに JSON で戦術提案を取得できます。
+
+    python api_server.py                       # http://127.0.0.1:8502
+    python api_server.py --host 0.0.0.0 --token <合言葉>   # 同じWi-Fiのタブレットから
+
+例:
+    curl "http://127.0.0.1:8502/suggest?down=3&distance=2&field_position=80"
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src import profiling
+from src.service import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_WORKERS, create_server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="戦術提案 API サーバー")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="待ち受けアドレス (既定: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="ワーカースレッド数")
+    parser.add_argument("--token", default=os.environ.get("TACTICS_API_TOKEN"),
+                        help="指定するとリクエストに 'Authorization: Bearer <token>' が必要になります")
+    parser.add_argument("--timing", action="store_true", help="処理時間を計測する (GET /timings で確認)")
+    args = parser.parse_args(argv)
+
+    # Run from the app folder so the relative data paths resolve
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    if args.timing:
+        profiling.set_enabled(True)
+
+    start = time.perf_counter()
+    server = create_server(args.host, args.port, args.workers, api_token=args.token)
+    version, df = server.store.snapshot()
+    print(f"🏈 {len(df)} 件のプレーを読み込みました ({time.perf_counter() - start:.2f}秒)")
+    print(f"🌐 http://{args.host}:{args.port}/suggest で待機中 (ワーカー {args.workers})")
+    if args.host != "127.0.0.1" and not args.token:
+        print("⚠️ 外部公開時は --token の指定をおすすめします")
+    print("終了するには Ctrl+C を押してください")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n終了中...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
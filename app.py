@@ -2,23 +2,30 @@ import streamlit as st
 import pandas as pd
 import sys
 import os
+import threading
 from datetime import datetime, timedelta
 
 # Add src to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Force reload of data_manager to ensure latest code is used
-import src.data_manager
-import src.analyzer
-import src.security
-
-from src.data_manager import load_excel, get_database, update_database, get_statistics
-from src.analyzer import analyze_situation
+# Heavy optional modules (openpyxl via pandas.read_excel, requests/nflverse in
+# import_nfl_data) are imported where they are used, not at startup.
+from src.data_manager import (
+    load_excel, update_database, get_statistics,
+    get_data_version, reset_database, rollback, list_versions, get_page, backfill_derived_columns,
+    get_text_index, get_player_stats, get_rows, get_details, get_play_store, warm_up, get_commit_stats,
+    get_read_problems, get_partition_store, list_partitions
+)
+from src.analyzer import SCOPE_KEYS, coalesced_analyze_situation
+from src.drive_sim import DRIVES_PER_CALL, DriveModel, simulate_situation
+from src.player_stats import top_players
+from src import profiling, coalesce, live_game, jobs, export, column_mapping, dimensions
 from src.security import (
     verify_user, change_password, is_locked_out, 
     get_failed_attempts, log_access, get_access_log,
     is_security_enabled, is_admin, register_user, user_exists,
     admin_reset_password, get_all_users, get_user_display_name,
+    get_users_version, get_access_log_version,
     MAX_FAILED_ATTEMPTS, SESSION_TIMEOUT_MINUTES, ADMIN_USERNAME,
     DEFAULT_USER_PASSWORD
 )
@@ -33,6 +40,279 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# ========================
+# Cached Data Access
+# ========================
+# Every widget interaction reruns this script. Reads go through these caches,
+# keyed by the generation numbers that the writers bump, so a rerun without a
+# write does not touch the disk.
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """
+    Once per process: loads the play store snapshot and the text store in the
+    background, so they are in memory by the time the login is done.
+    """
+    def run():
+        warm_up()
+        profiling.mark_startup("store_ready")
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_play_store(data_version):
+    """(play table, PlayIndex) shared by all sessions; from the snapshot when it is current."""
+    return get_play_store()
+
+def load_play_table(data_version):
+    """
+    Play table shared by all sessions (PLAY_TABLE_COLUMNS only; Detail is
+    read by row id when shown). Treat as read-only.
+    """
+    return load_play_store(data_version)[0]
+
+def load_play_index(data_version):
+    """Situation index over the shared play table, built once per data version."""
+    return load_play_store(data_version)[1]
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_text_index(data_version):
+    """Full-text index of Detail (stored next to the database, updated on ingest)."""
+    return get_text_index()
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_player_table(data_version):
+    """Per-player x situation aggregates (stored next to the database, updated on ingest)."""
+    return get_player_stats()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_top_players(data_version, down, distance, field_pos):
+    """Most frequent ball carriers for a situation."""
+    return top_players(load_player_table(data_version), down=down, distance=distance, field_pos=field_pos)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_statistics(data_version):
+    return get_statistics()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_partitions(data_version):
+    return list_partitions()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_versions(data_version):
+    return list_versions()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_suggestions(data_version, situation_items):
+    """Analysis results for one situation (given as sorted key/value pairs)."""
+    situation = dict(situation_items)
+    scope = [situation.get(key) for key in SCOPE_KEYS]
+    if any(value is not None for value in scope):
+        # One opponent / season: only its partitions are read (the table keeps Detail for keywords)
+        table, index = get_partition_store(*scope)
+        return coalesced_analyze_situation(table, situation, data_version, index=index)
+    text_index = load_text_index(data_version) if situation.get("Keyword") else None
+    return coalesced_analyze_situation(load_play_table(data_version), situation, data_version,
+                                       index=load_play_index(data_version), text_index=text_index)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_drive_model(data_version, scope):
+    """Play outcome pools for the drive simulator, built once per data version and scope."""
+    if any(value is not None for value in scope):
+        return DriveModel(get_partition_store(*scope)[0])
+    return DriveModel(load_play_table(data_version))
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_drive_simulation(data_version, situation_items):
+    """Simulated drives per candidate call for one situation (same plays as load_suggestions)."""
+    situation = dict(situation_items)
+    scope = tuple(situation.get(key) for key in SCOPE_KEYS)
+    model = load_drive_model(data_version, scope)
+    if any(value is not None for value in scope):
+        table, index = get_partition_store(*scope)
+        return simulate_situation(table, situation, model, index=index)
+    text_index = load_text_index(data_version) if situation.get("Keyword") else None
+    return simulate_situation(load_play_table(data_version), situation, model,
+                              index=load_play_index(data_version), text_index=text_index)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_users(users_version):
+    return get_all_users()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_is_admin(users_version, username):
+    return is_admin(username)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_access_log(log_version, limit):
+    return get_access_log(limit)
+
+@st.cache_data(show_spinner=False)
+def load_template_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_uploaded_excel(file_id, _uploaded_file):
+    """Parses an upload once per file instead of on every rerun."""
+    _uploaded_file.seek(0)
+    all_sheets = pd.read_excel(_uploaded_file, sheet_name=None)
+    sheet_names = list(all_sheets.keys())
+    first_columns = list(list(all_sheets.values())[0].columns) if all_sheets else []
+    _uploaded_file.seek(0)
+    result = load_excel(_uploaded_file)
+    return sheet_names, first_columns, result
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_column_values(data_version, column):
+    df = load_play_table(data_version)
+    if column not in df.columns:
+        return []
+    return sorted(df[column].dropna().astype(str).unique().tolist())
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_page(data_version, offset, limit, filter_items, sort_by, ascending):
+    """One browser page: filtered/sorted on the play table, full rows read by id."""
+    filters = dict(filter_items)
+    text_index = load_text_index(data_version) if filters.get("text") else None
+    page, total = get_page(load_play_table(data_version), offset, limit, filters, sort_by, ascending,
+                           text_index=text_index)
+    return get_rows(page.index), total
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_details(data_version, ids):
+    return get_details(list(ids)).tolist()
+
+# ========================
+# Export
+# ========================
+def render_export(key: str, label: str, file_stem: str, make_file):
+    """
+    Format picker and download button. make_file(fmt) writes the export and
+    returns the file; it only runs when the button is clicked.
+    """
+    def file_bytes(fmt):
+        # download_button takes bytes or a plain file, not the spooled temporary file
+        with make_file(fmt) as out:
+            return out.read()
+
+    formats = export.available_formats()
+    col_fmt, col_btn = st.columns([1, 2])
+    fmt = col_fmt.selectbox("形式", formats, format_func=lambda f: export.FORMATS[f][0],
+                            key=f"{key}_format", label_visibility="collapsed")
+    _, extension, mime = export.FORMATS[fmt]
+    col_btn.download_button(
+        label=label,
+        data=lambda: file_bytes(fmt),
+        file_name=f"{file_stem}_{datetime.now():%Y%m%d_%H%M}.{extension}",
+        mime=mime,
+        key=f"{key}_download",
+        on_click="ignore",
+    )
+
+# ========================
+# Data Browser
+# ========================
+BROWSER_SORT_COLUMNS = ["Date", "Down", "Distance", "FieldPosition", "YardsGained", "Success"]
+KEYWORD_HELP = '選手名・単語で検索 (スペース区切りはAND)。例: s.howell / shotgun sacked / "pass short right"'
+
+def render_data_browser(key: str, page_size: int = 25, compact: bool = False):
+    """
+    Paginated, filterable view of the play table.
+    Filtering and sorting run on the server; only the visible page is sent to the browser.
+    """
+    data_version = get_data_version()
+
+    if compact:
+        cols = [st.container() for _ in range(5)]
+    else:
+        row1 = st.columns(3)
+        row2 = st.columns([2, 1, 1])
+        cols = [row1[0], row1[1], row1[2], row2[0], row2[1]]
+
+    play_type = cols[0].selectbox("プレー種別", ["すべて"] + load_column_values(data_version, "PlayType"), key=f"{key}_type")
+    down = cols[1].selectbox("ダウン", ["すべて", "1", "2", "3", "4"], key=f"{key}_down")
+    text = cols[2].text_input("キーワード (詳細)", key=f"{key}_text", help=KEYWORD_HELP)
+    sort_by = cols[3].selectbox("並べ替え", ["(なし)"] + BROWSER_SORT_COLUMNS, key=f"{key}_sort")
+    descending = cols[4].checkbox("降順", value=False, key=f"{key}_desc")
+
+    filters = {
+        "PlayType": None if play_type == "すべて" else play_type,
+        "Down": None if down == "すべて" else down,
+        "text": text.strip() or None,
+    }
+    filter_items = tuple(sorted(filters.items()))
+    sort_col = None if sort_by == "(なし)" else sort_by
+
+    page_no = st.number_input("ページ", min_value=1, value=1, step=1, key=f"{key}_page")
+    offset = (int(page_no) - 1) * page_size
+    page, total = load_page(data_version, offset, page_size, filter_items, sort_col, not descending)
+
+    total_pages = max(1, -(-total // page_size))
+    if page_no > total_pages:
+        offset = (total_pages - 1) * page_size
+        page, total = load_page(data_version, offset, page_size, filter_items, sort_col, not descending)
+        page_no = total_pages
+
+    if total == 0:
+        st.info("条件に一致するデータがありません。")
+        return
+
+    st.caption(f"全 {total} 件中 {offset + 1}–{offset + len(page)} 件目 (ページ {page_no}/{total_pages})")
+    st.dataframe(page, use_container_width=True)
+
+    def export_matches(fmt):
+        text_index = load_text_index(data_version) if filters["text"] else None
+        return export.export_plays(fmt, load_play_table(data_version), filters, text_index)
+
+    render_export(f"{key}_export", f"📥 {total} 件をエクスポート", "plays", export_matches)
+
+# ========================
+# Background Jobs
+# ========================
+NFL_SEASONS = list(range(2018, 2025))
+JOB_STATUS_LABELS = {
+    "queued": "⏳ 待機中", "running": "🔄 実行中", "done": "✅ 完了", "failed": "❌ 失敗",
+    "cancelled": "⏹️ キャンセル", "interrupted": "⚠️ 中断",
+}
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def _render_jobs():
+    """Recent jobs with progress; a finished job reruns the app so the new data shows up."""
+    recent = jobs.list_jobs(limit=5)
+    if not recent:
+        return
+    st.caption("バックグラウンドジョブ")
+    for job in recent:
+        st.progress(job.get("progress", 0.0),
+                    text=f"{JOB_STATUS_LABELS.get(job['status'], job['status'])} {job['label']} — {job.get('message', '')}")
+        if job["status"] in jobs.ACTIVE:
+            if st.button("キャンセル", key=f"job_cancel_{job['id']}"):
+                jobs.cancel(job["id"])
+        elif job["status"] in jobs.RESUMABLE:
+            if st.button("再開", key=f"job_resume_{job['id']}"):
+                jobs.resume(job["id"])
+                st.rerun(scope="app")
+        elif job["status"] == "done" and os.path.exists((job.get("result") or {}).get("zip") or ""):
+            st.download_button("📥 レポート (zip)", data=lambda path=job["result"]["zip"]: _read_file(path),
+                               file_name=f"scouting_{job['id']}.zip", mime="application/zip",
+                               key=f"job_download_{job['id']}", on_click="ignore")
+    if st.session_state.get("jobs_polling") and not any(job["status"] in jobs.ACTIVE for job in recent):
+        st.session_state.jobs_polling = False
+        st.rerun(scope="app")
+
+# Polls every 2 s while a job is active; otherwise the panel only updates with the page
+render_jobs_polling = st.fragment(run_every=2)(_render_jobs)
+render_jobs_static = st.fragment(_render_jobs)
+
+def render_jobs():
+    st.session_state.jobs_polling = jobs.has_active_jobs()
+    (render_jobs_polling if st.session_state.jobs_polling else render_jobs_static)()
+
 # ========================
 # Session State Initialization
 # ========================
@@ -46,6 +326,8 @@ if "user_role" not in st.session_state:
     st.session_state.user_role = None
 if "show_register" not in st.session_state:
     st.session_state.show_register = False
+if "live_game_id" not in st.session_state:
+    st.session_state.live_game_id = None
 
 # ========================
 # Session Timeout Check
@@ -155,6 +437,9 @@ def show_register_screen():
         st.session_state.show_register = False
         st.rerun()
 
+# Start loading the play store while the login screen is shown
+start_warm_up()
+
 # ========================
 # Security Check Gate
 # ========================
@@ -308,7 +593,7 @@ with st.sidebar:
     st.title("📊 データ管理")
     
     # Get current stats
-    stats = get_statistics()
+    stats = load_statistics(get_data_version())
     
     st.markdown("---")
     
@@ -320,11 +605,28 @@ with st.sidebar:
         st.metric("総プレー数", stats["total_plays"])
     
     st.caption(f"最終更新: {stats['last_update']}")
+
+    with st.expander("🗂️ チーム・シーズン別"):
+        partition_table = load_partitions(get_data_version())
+        if partition_table.empty:
+            st.caption("データがありません")
+        else:
+            st.dataframe(partition_table, hide_index=True, use_container_width=True)
+
+    with st.expander("📑 対戦相手レポート"):
+        st.caption("チームごとの傾向 (ラン/パス比率・よく使うプレー・3rdダウン・レッドゾーンなど) をExcelとHTMLでまとめて作成します。")
+        report_season = st.selectbox("シーズン", ["全シーズン"] + sorted(stats["seasons"], reverse=True), key="report_season")
+        report_teams = st.multiselect("チーム (空欄 = 全チーム)", sorted(t for t in stats["teams"] if t), key="report_teams")
+        if st.button("レポートを作成", disabled=stats["total_plays"] == 0, key="report_build"):
+            jobs.submit("tendency_report",
+                        {"season": None if report_season == "全シーズン" else report_season, "teams": report_teams or None},
+                        label=f"傾向レポート {report_season}")
+            st.rerun()
     
     # 🔐 Logout & Security Section
     st.markdown("---")
     current_user = st.session_state.username
-    is_current_admin = is_admin(current_user) if current_user else False
+    is_current_admin = load_is_admin(get_users_version(), current_user) if current_user else False
     
     st.subheader(f"👤 {get_user_display_name(current_user)}")
     
@@ -362,7 +664,7 @@ with st.sidebar:
         
         # User Management
         with st.expander("👥 ユーザー管理"):
-            users = get_all_users()
+            users = load_users(get_users_version())
             st.caption(f"登録ユーザー数: {len(users)}")
             
             for user in users:
@@ -387,7 +689,7 @@ with st.sidebar:
         
         # Access Logs (Admin only)
         with st.expander("📋 アクセスログ"):
-            logs = get_access_log(30)
+            logs = load_access_log(get_access_log_version(), 30)
             if logs:
                 for entry in logs:
                     timestamp = entry['timestamp'][:16].replace('T', ' ')
@@ -397,6 +699,41 @@ with st.sidebar:
                     st.caption(f"{icon} {timestamp}: {event} ({username})")
             else:
                 st.caption("ログがありません")
+        
+        # Performance timings (Admin only)
+        with st.expander("⏱️ パフォーマンス"):
+            timing_enabled = st.checkbox("計測を有効にする", value=profiling.is_enabled(), key="timing_enabled")
+            profiling.set_enabled(timing_enabled)
+            
+            startup = profiling.startup_times()
+            if startup:
+                labels = {"store_ready": "データ読込完了", "first_suggestion": "最初の提案"}
+                st.caption("起動から: " + " / ".join(
+                    f"{labels.get(name, name)} {seconds:.1f}秒" for name, seconds in startup.items()
+                ))
+            
+            timing_rows = profiling.summary()
+            if timing_rows:
+                st.caption("各処理の所要時間 (ミリ秒, 直近の計測)")
+                st.dataframe(pd.DataFrame(timing_rows), hide_index=True, use_container_width=True)
+            else:
+                st.caption("計測データがありません")
+            
+            st.download_button(
+                label="📥 JSONエクスポート",
+                data=profiling.export_json(),
+                file_name="timings.json",
+                mime="application/json",
+                key="timing_export"
+            )
+            st.caption("同時リクエストの統合 (coalescing)")
+            st.dataframe(pd.DataFrame(coalesce.all_stats()), hide_index=True, use_container_width=True)
+            st.caption("書き込みキュー (グループコミット)")
+            st.dataframe(pd.DataFrame([get_commit_stats()]), hide_index=True, use_container_width=True)
+            
+            if st.button("🔄 計測をリセット", key="timing_reset"):
+                profiling.reset()
+                st.rerun()
 
     # 📱 Mobile Access Info
     st.markdown("---")
@@ -439,32 +776,54 @@ with st.sidebar:
     with tab2:
         st.caption("入力用テンプレートをダウンロード")
         try:
-            with open("assets/template_v2.xlsx", "rb") as file:
-                st.download_button(
-                    label="📥 拡張テンプレート (Excel)",
-                    data=file,
-                    file_name="football_template_v2.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+            st.download_button(
+                label="📥 拡張テンプレート (Excel)",
+                data=load_template_bytes("assets/template_v2.xlsx"),
+                file_name="football_template_v2.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
         except Exception:
             st.warning("テンプレート生成中...")
             
     with tab4:
-        st.caption("データベースの初期化")
+        st.caption("プレー結果フラグ (サック・TD・反則など) の再計算")
+        if st.button("🔁 既存データのフラグを再計算", key="backfill_flags"):
+            with st.spinner("再計算中..."):
+                count = backfill_derived_columns()
+            st.success(f"{count} 件のプレーを再計算しました")
+        
+        st.caption("バージョン履歴 (書き込みごとに保存され、いつでも戻せます)")
+        history = load_versions(get_data_version())
+        version_labels = {
+            v["id"]: f"v{v['id']} {v['created'] or ''} {v['rows']}件 {v['note']}" + (" (現在)" if v["current"] else "")
+            for v in history
+        }
+        target_version = st.selectbox("戻すバージョン", list(version_labels), format_func=version_labels.get,
+                                      key="rollback_target")
+        if st.button("↩️ このバージョンに戻す", key="rollback_button"):
+            if rollback(target_version):
+                st.success(f"v{target_version} に戻しました")
+                st.rerun()
+            else:
+                st.error("このバージョンは見つかりません")
+        
+        st.caption("データベースの初期化 (空のバージョンに切り替えます。履歴から元に戻せます)")
         if st.checkbox("誤操作防止用チェック", key="reset_check"):
             if st.button("🗑️ データを全削除してリセット", type="primary"):
-                if os.path.exists("data/match_data.csv"):
-                    os.remove("data/match_data.csv")
+                if reset_database():
                     st.success("データベースをリセットしました")
                     st.rerun()
 
     with tab3:
         st.caption("現在保存されているデータの中身を確認")
-        if os.path.exists("data/match_data.csv"):
+        if stats["total_plays"]:
             try:
-                existing_df = pd.read_csv("data/match_data.csv", on_bad_lines='skip') # Try to skip bad lines first to show something
-                st.markdown(f"**総データ数:** {len(existing_df)} 件")
-                st.dataframe(existing_df.head(50), use_container_width=True)
+                st.markdown(f"**総データ数:** {stats['total_plays']} 件")
+                problems = get_read_problems()
+                if problems:
+                    st.warning(f"⚠️ データファイルの {problems['count']} 行が壊れていたため読み込まれていません"
+                               f"（CSVの行番号: {', '.join(map(str, problems['lines']))}）")
+                render_data_browser("sidebar_browser", page_size=20, compact=True)
             except Exception as e:
                 st.error("⚠️ データファイルが破損しているため読み込めません。")
                 st.warning("「リセット」タブからデータベースを初期化してください。")
@@ -476,20 +835,15 @@ with st.sidebar:
         st.caption("ExcelファイルまたはNFLデータから追加")
         
         # NFL Section
-        with st.expander("🏈 NFLデータのインポート (2023)", expanded=False):
-            st.write("NFLの試合データを自動ダウンロードして追加します。")
-            if st.button("NFLデータを追加ダウンロード"):
-                with st.spinner("ダウンロード中..."):
-                    try:
-                        import import_nfl_data
-                        # Force reload to get updated script
-                        import importlib
-                        importlib.reload(import_nfl_data)
-                        
-                        count = import_nfl_data.main()
-                        st.success(f"✅ {count} 件のNFLデータをデータベースに追加しました！")
-                    except Exception as e:
-                        st.error(f"エラー: {e}")
+        with st.expander("🏈 NFLデータのインポート", expanded=False):
+            st.write("NFLの試合データを自動ダウンロードして追加します。バックグラウンドで実行されるので、その間もアプリを使えます。")
+            nfl_years = st.multiselect("シーズン", NFL_SEASONS, default=[2023], key="nfl_years")
+            nfl_limit = st.number_input("シーズンあたりの最大行数 (0 = 全件)", min_value=0, value=5000, step=1000, key="nfl_limit")
+            if st.button("NFLデータを追加ダウンロード", disabled=not nfl_years):
+                years = sorted(nfl_years)
+                jobs.submit("nfl_import", {"years": years, "limit": int(nfl_limit) or None},
+                            label=f"NFL {', '.join(map(str, years))}")
+                st.rerun()
 
         # Excel Section
         st.caption("Excelデータ追加")
@@ -501,24 +855,21 @@ with st.sidebar:
     )
     
     if uploaded_file is not None:
-        # First, read raw Excel to show columns and sheets
+        # Read raw Excel once per upload to show columns and sheets
+        result = None
         try:
-            import pandas as pd
-            all_sheets = pd.read_excel(uploaded_file, sheet_name=None)
-            sheet_names = list(all_sheets.keys())
+            sheet_names, first_columns, result = load_uploaded_excel(uploaded_file.file_id, uploaded_file)
             st.info(f"📋 検出されたシート数: {len(sheet_names)} ({', '.join(sheet_names[:5])}{'...' if len(sheet_names) > 5 else ''})")
             
             # Show columns from first sheet
-            first_sheet = list(all_sheets.values())[0]
-            st.info(f"📋 列名: {list(first_sheet.columns)}")
-            
-            uploaded_file.seek(0)  # Reset file pointer
+            st.info(f"📋 列名: {first_columns}")
         except Exception as e:
             st.error(f"ファイル読み込みエラー: {e}")
         
         try:
-            uploaded_file.seek(0)  # Reset file pointer again
-            result = load_excel(uploaded_file)
+            if result is None:
+                uploaded_file.seek(0)  # Reset file pointer
+                result = load_excel(uploaded_file)
             
             # Robust unpacking to handle potential stale module loading
             if isinstance(result, tuple):
@@ -535,6 +886,13 @@ with st.sidebar:
                 
             # Show logs in expander for debugging
             with st.expander("🔍 読み込みログ (デバッグ用)", expanded=False):
+                plans_used = df_preview.attrs.get("mapping_plans") if df_preview is not None else None
+                if plans_used:
+                    st.caption("シートごとの列マッピング (同じ見出しのシートはキャッシュを再利用)")
+                    st.dataframe(pd.DataFrame(plans_used), hide_index=True, use_container_width=True)
+                    mapping_stats = column_mapping.stats()
+                    st.caption(f"キャッシュ済みのマッピング: {mapping_stats['plans']} 件 "
+                               f"(ヒット {mapping_stats['hits']} / 新規 {mapping_stats['misses']})")
                 for log in logs:
                     st.text(log)
                     
@@ -547,17 +905,41 @@ with st.sidebar:
         if df_preview is not None:
             st.success(f"✅ {len(df_preview)} 件のデータを読み込みました（全シート合計）")
             
+            rejected = df_preview.attrs.get("rejected") or {}
+            if rejected.get("skipped_sheets"):
+                st.info(f"ℹ️ 形式を認識できないシートは取り込みません: {', '.join(rejected['skipped_sheets'])}")
+            if rejected.get("count"):
+                st.warning(f"⚠️ {rejected['count']} 件はエラーのため取り込みません: " + "、".join(rejected["summary"][:3]))
+                with st.expander("❗ エラーのある行"):
+                    st.dataframe(rejected["report"], hide_index=True, use_container_width=True)
+                    if os.path.exists(rejected["path"]):
+                        with open(rejected["path"], "rb") as f:
+                            st.download_button("📥 エラー行をダウンロード (CSV)", f.read(),
+                                               file_name=os.path.basename(rejected["path"]), mime="text/csv",
+                                               key="rejected_download")
+            
             with st.expander("📋 プレビュー"):
                 st.dataframe(df_preview.head(20), use_container_width=True)
             
             if st.button("✨ データベースに追加", use_container_width=True):
-                added = update_database(df_preview)
-                st.success(f"🎉 {added} 件追加しました！")
+                if len(df_preview) <= jobs.DEFAULT_CHUNK_ROWS:
+                    added = update_database(df_preview, note=f"Excel: {uploaded_file.name}")
+                    st.success(f"🎉 {added} 件追加しました！")
+                else:
+                    # Large workbooks are appended chunk by chunk in the background
+                    job_id = jobs.new_job_id()
+                    input_path = jobs.input_path(job_id, "pkl")
+                    os.makedirs(jobs.JOBS_DIR, exist_ok=True)
+                    df_preview.to_pickle(input_path)
+                    jobs.submit("append_frame", {"input": input_path, "note": f"Excel: {uploaded_file.name}"},
+                                label=f"Excel: {uploaded_file.name}", job_id=job_id)
                 st.rerun()
         elif df_preview is None:
             st.warning("⚠️ データの読み込みに失敗しました。")
             st.info("👆 上記の「読み込みログ」を確認して、エラー内容を教えてください。")
     
+    render_jobs()
+
     st.markdown("---")
     st.caption("Made with ❤️ for American Football")
 
@@ -616,6 +998,22 @@ with col3:
     else:
         score_diff = None
 
+    keyword = st.text_input("🔎 キーワード (選手名・プレー内容)", value="", help=KEYWORD_HELP)
+
+# Opponent / season (only their partitions are read) and scouting dimensions
+# (hash, formation, ...): the values found in the data
+scope_cols = st.columns(2 + len(dimensions.DIMENSIONS))
+with scope_cols[0]:
+    team = st.selectbox("対戦相手 (チーム)", ["指定なし"] + sorted(t for t in stats["teams"] if t), key="scope_team")
+with scope_cols[1]:
+    season = st.selectbox("シーズン", ["指定なし"] + sorted(stats["seasons"], reverse=True), key="scope_season")
+dimension_values = {}
+for dim_col, dimension in zip(scope_cols[2:], dimensions.DIMENSIONS):
+    with dim_col:
+        values = [v for v in load_column_values(get_data_version(), dimension.column) if v.strip()]
+        choice = st.selectbox(dimension.label, ["指定なし"] + values, key=f"dim_{dimension.column}")
+        dimension_values[dimension.column] = choice if choice != "指定なし" else None
+
 # Input Form - Row 2: Field Position Slider (more detailed)
 st.markdown("##### 📍 フィールド位置")
 use_field_pos = st.checkbox("フィールド位置を考慮する", value=True)
@@ -668,7 +1066,8 @@ st.markdown("")
 if st.button("⚡ 戦術を提案する", use_container_width=True, type="primary"):
     
     # Get data
-    df = get_database()
+    data_version = get_data_version()
+    df = load_play_table(data_version)
     
     if df.empty:
         st.warning("📭 データがありません。まずExcelファイルをアップロードしてください。")
@@ -680,15 +1079,29 @@ if st.button("⚡ 戦術を提案する", use_container_width=True, type="primar
             "FieldPosition": field_position,
             "ScoreDiff": score_diff,
             "Quarter": quarter if quarter != "指定なし" else None,
-            "TimeRemaining": time_rem
+            "TimeRemaining": time_rem,
+            "Keyword": keyword.strip() or None,
+            "Team": team if team != "指定なし" else None,
+            "Season": season if season != "指定なし" else None,
+            **dimension_values
         }
         
-        suggestions = analyze_situation(df, situation)
+        suggestions = load_suggestions(data_version, tuple(sorted(situation.items())))
+        profiling.mark_startup("first_suggestion")
+        # A live game in progress: today's results in this situation weigh into the ranking
+        live_weighted = False
+        if st.session_state.live_game_id:
+            live_suggestions = live_game.get_game(st.session_state.live_game_id).weight_suggestions(
+                suggestions, situation["Down"], situation["Distance"], situation["FieldPosition"])
+            live_weighted = live_suggestions is not suggestions
+            suggestions = live_suggestions
         
         if not suggestions:
             st.info("🔍 類似の状況が見つかりませんでした。もう少しデータを追加してください。")
         else:
             st.markdown("## 💡 推奨プレー")
+            if live_weighted:
+                st.caption(f"🔴 今日の試合の結果を反映しています (1プレー = 過去の{live_game.LIVE_WEIGHT:g}プレー分)")
             
             # Top suggestion - Hero card
             top = suggestions[0]
@@ -715,6 +1128,13 @@ if st.button("⚡ 戦術を提案する", use_container_width=True, type="primar
             </div>
             """, unsafe_allow_html=True)
             
+            # Recent plays behind the top suggestion (descriptions read by row id)
+            if top.get("example_ids"):
+                with st.expander("📝 類似プレーの例"):
+                    for detail in load_details(data_version, tuple(top["example_ids"])):
+                        if isinstance(detail, str) and detail.strip():
+                            st.caption(detail)
+            
             # Other options
             if len(suggestions) > 1:
                 st.markdown("### 🔄 その他の選択肢")
@@ -750,14 +1170,134 @@ if st.button("⚡ 戦術を提案する", use_container_width=True, type="primar
                         display_df.columns = ["プレー種別", "平均獲得ヤード", "成功率", "サンプル数", "理由・詳細"]
                         st.dataframe(display_df, use_container_width=True)
 
+            render_export("suggestions_export", "📥 提案一覧をエクスポート", "suggestions",
+                          lambda fmt: export.export_frame(export.suggestions_frame(suggestions), fmt, "suggestions"))
+
+            # Drive outcomes per call: Monte Carlo over the empirical play outcomes
+            with st.expander(f"🎲 ドライブシミュレーション (各プレー {DRIVES_PER_CALL:,} ドライブ)"):
+                simulation = load_drive_simulation(data_version, tuple(sorted(situation.items())))
+                if not simulation:
+                    st.caption("ダウン・残りヤード・フィールド位置を指定し、3回以上使われたラン・パスがある状況で表示されます。")
+                else:
+                    sim_df = pd.DataFrame(simulation)
+                    for col in ["first_down", "touchdown", "field_goal", "punt", "turnover"]:
+                        sim_df[col] = (sim_df[col] * 100).round(1)
+                    sim_df["expected_points"] = sim_df["expected_points"].round(2)
+                    sim_df = sim_df[["play_type", "first_down", "touchdown", "field_goal", "punt", "turnover",
+                                     "expected_points", "sample_size"]]
+                    sim_df.columns = ["プレー種別", "ダウン更新%", "TD%", "FG%", "パント%", "ターンオーバー%",
+                                      "期待得点", "サンプル数"]
+                    st.dataframe(sim_df, hide_index=True, use_container_width=True)
+                    st.caption("1プレー目はこの状況での各プレーの結果から、2プレー目以降は同じダウン・距離・位置の"
+                               "ラン・パスの結果から無作為に選んでドライブを進めます。4thダウンはFG圏内ならFG、"
+                               "それ以外はパント。時間・反則・FG失敗は考慮しません。")
+        
+        # Who had the ball in this situation (precomputed per-player table)
+        ball_carriers = load_top_players(data_version, situation["Down"], situation["Distance"], situation["FieldPosition"])
+        if not ball_carriers.empty:
+            with st.expander("🎯 この状況でボールを持つ選手 (ラン・パスターゲット)"):
+                carriers_df = ball_carriers.copy()
+                carriers_df["Share"] = (carriers_df["Share"] * 100).round(0).astype(int).astype(str) + "%"
+                carriers_df["SuccessRate"] = (carriers_df["SuccessRate"] * 100).round(0).astype(int).astype(str) + "%"
+                carriers_df.columns = ["選手", "回数", "割合", "平均獲得ヤード", "成功率"]
+                st.dataframe(carriers_df, hide_index=True, use_container_width=True)
+                render_export("carriers_export", "📥 選手一覧をエクスポート", "ball_carriers",
+                              lambda fmt: export.export_frame(ball_carriers, fmt, "ball_carriers"))
+        
+        # Today's results in the same situation (live game), shown separately from history
+        if st.session_state.live_game_id:
+            game = live_game.get_game(st.session_state.live_game_id)
+            today_rows = game.tendencies(situation["Down"], situation["Distance"], situation["FieldPosition"])
+            st.markdown(f"### 🔴 今日の試合 ({game.game_id})")
+            if today_rows:
+                today_df = pd.DataFrame(today_rows)[["play_type", "avg_gain", "success_rate", "count"]]
+                today_df.columns = ["プレー種別", "平均獲得ヤード", "成功率", "回数"]
+                st.dataframe(today_df, hide_index=True, use_container_width=True)
+            else:
+                st.caption("今日の試合ではまだ同じ状況のプレーがありません。")
+
 # ========================
-# Footer with current data preview
+# Live Game Mode
 # ========================
 st.markdown("---")
 
+with st.expander("🔴 ライブ試合モード (1プレーずつ記録)", expanded=st.session_state.live_game_id is not None):
+    if not st.session_state.live_game_id:
+        existing_games = live_game.list_games()
+        lc1, lc2 = st.columns(2)
+        with lc1:
+            live_opponent = st.text_input("対戦相手", key="live_opponent")
+            live_team = st.text_input("自チーム名 (任意)", key="live_team")
+            if st.button("▶️ 新しい試合を開始", key="live_start"):
+                if live_opponent.strip():
+                    st.session_state.live_game_id = live_game.make_game_id(live_game.today(), live_opponent)
+                    live_game.get_game(st.session_state.live_game_id, team=live_team.strip())
+                    st.rerun()
+                else:
+                    st.error("対戦相手を入力してください")
+        with lc2:
+            if existing_games:
+                resume_id = st.selectbox("記録中の試合を再開", existing_games, key="live_resume")
+                if st.button("⏯️ 再開", key="live_resume_btn"):
+                    st.session_state.live_game_id = resume_id
+                    st.rerun()
+    else:
+        game = live_game.get_game(st.session_state.live_game_id)
+        st.markdown(f"**試合:** {game.game_id}　**記録済み:** {game.play_count} プレー")
+        
+        with st.form("live_play_form", clear_on_submit=True):
+            fc1, fc2, fc3 = st.columns(3)
+            with fc1:
+                lp_quarter = st.selectbox("クォーター", ["1Q", "2Q", "3Q", "4Q", "OT"], key="lp_quarter")
+                lp_time = st.text_input("残り時間 (MM:SS)", key="lp_time")
+                lp_down = st.selectbox("ダウン", [1, 2, 3, 4], key="lp_down")
+            with fc2:
+                lp_distance = st.number_input("残りヤード", min_value=1, max_value=99, value=10, key="lp_distance")
+                lp_field = st.number_input("フィールド位置 (0-100)", min_value=0, max_value=100, value=25, key="lp_field")
+                lp_type = st.selectbox("プレー種別", ["パス (Pass)", "ラン (Run)", "パント (Punt)", "FG (Field Goal)"], key="lp_type")
+            with fc3:
+                lp_course = st.text_input("コース (例: short right / left end)", key="lp_course")
+                lp_gain = st.number_input("獲得ヤード", min_value=-99, max_value=99, value=0, key="lp_gain")
+                lp_success = st.checkbox("成功", key="lp_success")
+            lp_detail = st.text_input("メモ", key="lp_detail")
+            
+            if st.form_submit_button("➕ プレーを記録", use_container_width=True):
+                try:
+                    game.append_play({
+                        "Quarter": lp_quarter, "Time": lp_time, "Down": lp_down,
+                        "Distance": lp_distance, "FieldPosition": lp_field, "PlayType": lp_type,
+                        "RunCourse": lp_course if "Run" in lp_type else "",
+                        "PassCourse": lp_course if "Pass" in lp_type else "",
+                        "Detail": lp_detail, "YardsGained": lp_gain, "Success": int(lp_success)
+                    })
+                    st.success("記録しました")
+                except ValueError as e:
+                    st.error(str(e))
+        
+        today_rows = game.tendencies()
+        if today_rows:
+            st.caption("今日の傾向 (全状況)")
+            st.dataframe(pd.DataFrame(today_rows), hide_index=True, use_container_width=True)
+        
+        gc1, gc2 = st.columns(2)
+        with gc1:
+            if st.button("💾 試合を履歴データベースに反映", key="live_commit", disabled=game.committed):
+                try:
+                    added = game.commit_to_database()
+                    st.success(f"🎉 {added} 件を履歴に追加しました")
+                except ValueError as e:
+                    st.error(str(e))
+        with gc2:
+            if st.button("⏹️ ライブモードを終了", key="live_stop"):
+                st.session_state.live_game_id = None
+                st.rerun()
+
+# ========================
+# Footer with current data preview
+# ========================
+
 with st.expander("📊 現在のデータベース確認"):
-    df = get_database()
-    if not df.empty:
-        st.dataframe(df, use_container_width=True, height=300)
+    if stats["total_plays"] > 0:
+        render_data_browser("footer_browser")
     else:
         st.info("データがまだありません。Excelファイルをアップロードしてください。")
@@ -0,0 +1,225 @@
+"""
+Benchmark suite for the analyzer and ingest paths.
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py --sizes 10k,100k --save benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --sizes 10k,100k --compare benchmarks/baseline.json
+
+Each case runs against synthetic plays (see synthetic.py) inside a temporary
+working directory, so the real data/ folder is never touched.
+Comparison mode exits with status 1 if any case got slower than the
+baseline by more than --threshold (default 20%).
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+import synthetic
+from src import analyzer, data_manager, drive_sim, enrich, export, partitions, player_stats
+from src.play_index import PlayIndex
+from src.text_index import TextIndex, search_positions
+from src.text_store import TextStore
+import import_nfl_data
+
+NARROW_SITUATION = {"Down": 3, "Distance": 2, "FieldPosition": 80, "Quarter": "4Q"}
+BROAD_SITUATION = {"Down": None, "Distance": 10, "FieldPosition": None, "Quarter": None}
+KEYWORD_QUERY = "shotgun sacked"
+# Common situation with many candidate calls (up to MAX_CALLS x DRIVES_PER_CALL simulated drives)
+DRIVE_SITUATION = {"Down": 1, "Distance": 10, "FieldPosition": 25}
+
+# Excel is slow to write; cap the workbook size so large runs stay practical
+DEFAULT_EXCEL_MAX_ROWS = 50_000
+UPDATE_BATCH_ROWS = 1_000
+
+
+@contextlib.contextmanager
+def _working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _silenced(func):
+    """Wraps func so that its progress prints do not end up in the report."""
+    def run():
+        with contextlib.redirect_stdout(None):
+            return func()
+    return run
+
+
+def _time(func, repeat: int) -> dict:
+    """Runs func `repeat` times and returns wall-clock statistics in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "repeat": repeat,
+    }
+
+
+def run_suite(sizes: list[int], repeat: int, excel_max_rows: int, only: list[str] = None, log=print) -> dict:
+    results = {}
+
+    def record(name, size, func, times=repeat):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            return
+        key = f"{name}@{size}"
+        results[key] = _time(func, times)
+        log(f"  {key:<40} median {results[key]['median_s'] * 1000:10.2f} ms")
+
+    source = synthetic.load_source()
+    for size in sizes:
+        log(f"Generating {size:,} synthetic plays...")
+        plays = synthetic.generate_plays(size, seed=size, source=source)
+        record("add_derived_columns", size, lambda: enrich.add_derived_columns(plays))
+        db_plays = enrich.add_derived_columns(plays).reindex(columns=data_manager.STANDARD_COLUMNS, fill_value="")
+        index = PlayIndex(db_plays)
+
+        # Analyzer
+        record("filter_data.narrow", size, lambda: analyzer.filter_data(
+            db_plays, NARROW_SITUATION["Down"], NARROW_SITUATION["Distance"],
+            NARROW_SITUATION["FieldPosition"], NARROW_SITUATION["Quarter"]))
+        record("filter_data.broad", size, lambda: analyzer.filter_data(db_plays, None, BROAD_SITUATION["Distance"]))
+        record("analyze_situation.narrow", size, lambda: analyzer.analyze_situation(db_plays, NARROW_SITUATION))
+        record("analyze_situation.broad", size, lambda: analyzer.analyze_situation(db_plays, BROAD_SITUATION))
+        record("filter_data.two_minute", size, lambda: analyzer.filter_data(
+            db_plays, time_remaining="02:00", score_diff=-7))
+        record("play_index.build", size, lambda: PlayIndex(db_plays))
+        record("filter_data.indexed.narrow", size, lambda: analyzer.filter_data(
+            db_plays, NARROW_SITUATION["Down"], NARROW_SITUATION["Distance"],
+            NARROW_SITUATION["FieldPosition"], NARROW_SITUATION["Quarter"], index=index))
+        record("filter_data.indexed.two_minute", size, lambda: analyzer.filter_data(
+            db_plays, time_remaining="02:00", score_diff=-7, index=index))
+        record("drive_sim.build", size, lambda: drive_sim.DriveModel(db_plays))
+        drive_model = drive_sim.DriveModel(db_plays)
+        record("drive_sim.simulate", size, lambda: drive_sim.simulate_situation(
+            db_plays, DRIVE_SITUATION, drive_model, index=index))
+        record("text_index.build", size, lambda: TextIndex.build(db_plays["Detail"].tolist()))
+        text_index = TextIndex.build(db_plays["Detail"].tolist())
+        record("text_search.scan", size, lambda: search_positions(db_plays, KEYWORD_QUERY))
+        record("text_search.indexed", size, lambda: search_positions(db_plays, KEYWORD_QUERY, text_index))
+        record("player_stats.aggregate", size, lambda: player_stats.aggregate(db_plays))
+        record("text_store.build", size, lambda: TextStore.build(db_plays))
+        text_store = TextStore.build(db_plays)
+        store_sizes = text_store.sizes()
+        log(f"  text_store@{size}: {store_sizes['raw_bytes']:,} raw -> {store_sizes['stored_bytes']:,} bytes "
+            f"({store_sizes['raw_bytes'] / max(store_sizes['stored_bytes'], 1):.1f}x)")
+        record("text_store.get_one", size, lambda: text_store.get("Detail", [size // 2]))
+
+        # Store (inside a scratch directory; data_manager uses relative paths)
+        with tempfile.TemporaryDirectory() as tmp, _working_directory(tmp):
+            os.makedirs("data", exist_ok=True)
+            data_manager.update_database(plays.copy())
+            record("get_database", size, data_manager.get_database)
+            record("get_database.play_table", size, lambda: data_manager.get_database(data_manager.PLAY_TABLE_COLUMNS))
+            record("get_details", size, lambda: data_manager.get_details([0, size // 2, size - 1]))
+            record("export_plays.csv", size, lambda: export.export_plays("csv").close())
+            with open(data_manager.DATA_FILE_PATH, "rb") as f:
+                csv_bytes = f.read()
+            record("partitions.build", size, lambda: partitions.build_catalog(0, csv_bytes, plays))
+            catalog = data_manager.get_partition_catalog()
+            team_keys = partitions.select(catalog, plays["Team"].mode().iloc[0])
+            record("partitions.read_team", size, lambda: partitions.read_partitions(
+                data_manager.DATA_FILE_PATH, catalog, team_keys, usecols=data_manager.PARTITION_TABLE_COLUMNS))
+
+            batch = plays.head(UPDATE_BATCH_ROWS)
+            record("update_database", size, lambda: data_manager.update_database(batch.copy()))
+
+            excel_rows = min(size, excel_max_rows)
+            synthetic.to_workbook(plays.head(excel_rows), "bench.xlsx")
+            record("load_excel", excel_rows, _silenced(lambda: data_manager.load_excel("bench.xlsx")),
+                   times=max(1, repeat // 2))
+
+        raw = synthetic.to_nflverse(plays)
+        record("process_nfl_data", size, _silenced(lambda: import_nfl_data.process_nfl_data(raw)))
+
+        del plays, db_plays, index, drive_model, text_index, text_store, raw
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns human-readable lines for every case slower than baseline * (1 + threshold)."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous:
+            continue
+        ratio = current["median_s"] / previous["median_s"] if previous["median_s"] else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{key}: {previous['median_s'] * 1000:.2f} ms -> {current['median_s'] * 1000:.2f} ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analyzer and ingest paths.")
+    parser.add_argument("--sizes", default="10k,100k", help="Comma separated play counts, e.g. 10k,100k,1M,10M")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (median is reported)")
+    parser.add_argument("--excel-max-rows", type=int, default=DEFAULT_EXCEL_MAX_ROWS)
+    parser.add_argument("--only", default="", help="Comma separated case name prefixes to run")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [synthetic.parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    only = [s.strip() for s in args.only.split(",") if s.strip()]
+
+    results = run_suite(sizes, args.repeat, args.excel_max_rows, only)
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {len(results)} results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  ! {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
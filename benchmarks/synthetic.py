@@ -0,0 +1,173 @@
+"""
+Synthetic play generator for the benchmark suite.
+
+Rows are bootstrapped from data/match_data.csv so that the joint distribution
+of Down / Distance / FieldPosition / Quarter / PlayType / courses / YardsGained /
+Success follows the real data. Dates, clock, teams and the free-text
+descriptions are generated on top so that the text-heavy paths have
+realistic strings to chew on. Everything is vectorized, so 10M rows is
+a matter of memory, not of Python loops.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+SOURCE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "match_data.csv")
+
+# Columns copied as-is from the sampled source rows
+BOOTSTRAP_COLUMNS = [
+    "Quarter", "Down", "Distance", "FieldPosition", "PlayType",
+    "RunCourse", "PassCourse", "YardsGained", "Success"
+]
+
+TEAMS = [
+    "ARI", "ATL", "BAL", "BUF", "CAR", "CHI", "CIN", "CLE", "DAL", "DEN", "DET",
+    "GB", "HOU", "IND", "JAX", "KC", "LA", "LAC", "LV", "MIA", "MIN", "NE", "NO",
+    "NYG", "NYJ", "PHI", "PIT", "SEA", "SF", "TB", "TEN", "WAS"
+]
+
+_PLAYER_INITIALS = np.array(list("ABCDEFGHJKLMNOPRSTW"))
+_PLAYER_NAMES = np.array([
+    "Howell", "Dotson", "Robinson", "Kelce", "Allen", "Hill", "Jefferson", "Chase",
+    "Adams", "Henry", "Kupp", "Diggs", "Brown", "Lamb", "Waddle", "Pollard",
+    "Ekeler", "Chubb", "Jacobs", "Barkley", "Andrews", "Kittle", "Smith", "Moore"
+])
+
+NFL_TYPE_BY_PLAYTYPE = {
+    "パス (Pass)": "pass",
+    "ラン (Run)": "run",
+    "パント (Punt)": "punt",
+    "FG (Field Goal)": "field_goal",
+}
+
+
+def parse_size(text: str) -> int:
+    """'10k' -> 10000, '1M' -> 1000000, '2500' -> 2500"""
+    text = str(text).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    number = text[:-1] if scale > 1 else text
+    return int(float(number) * scale)
+
+
+def load_source(path: str = SOURCE_CSV) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    # Keep rows that carry the modern layout (legacy rows have empty Date/Quarter)
+    df = df.dropna(subset=["Date", "Quarter"])
+    return df[BOOTSTRAP_COLUMNS].reset_index(drop=True)
+
+
+def _players(rng: np.random.Generator, n: int) -> np.ndarray:
+    numbers = rng.integers(1, 99, n).astype(str)
+    initials = _PLAYER_INITIALS[rng.integers(0, len(_PLAYER_INITIALS), n)]
+    names = _PLAYER_NAMES[rng.integers(0, len(_PLAYER_NAMES), n)]
+    return np.char.add(np.char.add(np.char.add(numbers, "-"), np.char.add(initials, ".")), names)
+
+
+def _descriptions(rng: np.random.Generator, plays: pd.DataFrame, clock: np.ndarray, teams: np.ndarray) -> np.ndarray:
+    """nflverse-like play descriptions, e.g. "(14:30) (Shotgun) 14-S.Howell pass short right to 1-J.Dotson ..."."""
+    n = len(plays)
+    shotgun = np.where(rng.random(n) < 0.6, "(Shotgun) ", "")
+    passer, target, rusher, tackler = (_players(rng, n) for _ in range(4))
+    gained = plays["YardsGained"].fillna(0).astype(int).to_numpy(dtype=str)
+    pass_course = plays["PassCourse"].fillna("short middle").to_numpy(dtype=str)
+    run_course = plays["RunCourse"].fillna("middle").to_numpy(dtype=str)
+    play_type = plays["PlayType"].to_numpy(dtype=str)
+    sack = rng.random(n) < 0.07
+    incomplete = rng.random(n) < 0.35
+
+    pass_text = np.where(
+        sack,
+        np.char.add(np.char.add(passer, " sacked for "), np.char.add(gained, " yards")),
+        np.where(
+            incomplete,
+            np.char.add(np.char.add(np.char.add(passer, " pass incomplete "), np.char.add(pass_course, " to ")), target),
+            np.char.add(
+                np.char.add(np.char.add(passer, " pass "), np.char.add(pass_course, " to ")),
+                np.char.add(np.char.add(target, " for "), np.char.add(gained, " yards"))
+            )
+        )
+    )
+    run_text = np.char.add(
+        np.char.add(np.char.add(rusher, " "), np.char.add(run_course, " for ")),
+        np.char.add(gained, " yards")
+    )
+    other_text = np.char.add(np.char.add(rusher, " punts "), np.char.add(gained, " yards"))
+
+    body = np.where(
+        np.char.find(play_type, "Pass") >= 0, pass_text,
+        np.where(np.char.find(play_type, "Run") >= 0, run_text, other_text)
+    )
+    tackle = np.char.add(np.char.add(" (", tackler), "). ")
+    text = np.char.add(np.char.add(np.char.add("(", clock), ") "), shotgun)
+    text = np.char.add(np.char.add(text, body), tackle)
+    return np.char.add(np.char.add(np.char.add(text, "("), teams), ")")
+
+
+def generate_plays(n: int, seed: int = 0, source: pd.DataFrame = None) -> pd.DataFrame:
+    """Returns n synthetic plays in the database layout (plus a Team column)."""
+    rng = np.random.default_rng(seed)
+    source = load_source() if source is None else source
+
+    plays = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+
+    # Several seasons of weekly game days (Sundays from September on)
+    seasons = rng.integers(2018, 2024, n)
+    week = rng.integers(0, 18, n)
+    start = pd.to_datetime(pd.Series(seasons.astype(str)) + "-09-07")
+    dates = (start + pd.to_timedelta(week * 7, unit="D")).dt.strftime("%Y-%m-%d")
+
+    minutes = rng.integers(0, 15, n)
+    seconds = rng.integers(0, 60, n)
+    clock = np.char.add(np.char.add(np.char.zfill(minutes.astype(str), 2), ":"), np.char.zfill(seconds.astype(str), 2))
+    teams = np.array(TEAMS)[rng.integers(0, len(TEAMS), n)]
+
+    plays.insert(0, "Date", dates.to_numpy())
+    plays.insert(2, "Time", clock)
+    plays["Detail"] = _descriptions(rng, plays, clock, teams)
+    plays["ScoreDiff"] = np.clip(np.round(rng.normal(0, 9, n)), -35, 35).astype(int)
+    plays["Team"] = teams
+    return plays
+
+
+def to_nflverse(plays: pd.DataFrame) -> pd.DataFrame:
+    """Raw nflverse play-by-play frame (the input of import_nfl_data.process_nfl_data)."""
+    play_type = plays["PlayType"].map(NFL_TYPE_BY_PLAYTYPE).fillna("no_play")
+    pass_course = plays["PassCourse"].fillna("").astype(str).str.split(" ", n=1, expand=True)
+    run_course = plays["RunCourse"].fillna("").astype(str).str.split(" ", n=1, expand=True)
+    detail = plays["Detail"].str.replace(r" \([A-Z]{2,3}\)$", "", regex=True)
+    quarter = plays["Quarter"].str.rstrip("Q").astype(int)
+    clock = plays["Time"].str.split(":", expand=True).astype(int)
+    minutes, seconds = clock[0], clock[1]
+    return pd.DataFrame({
+        "game_date": plays["Date"],
+        "qtr": quarter,
+        "time": plays["Time"],
+        "down": plays["Down"],
+        "ydstogo": plays["Distance"],
+        "yardline_100": 100 - pd.to_numeric(plays["FieldPosition"], errors='coerce'),
+        "play_type": play_type,
+        "desc": detail,
+        "yards_gained": plays["YardsGained"],
+        "success": plays["Success"],
+        "pass_length": pass_course[0].where(play_type == "pass"),
+        "pass_location": pass_course[1].where(play_type == "pass") if 1 in pass_course else None,
+        "run_location": run_course[0].where(play_type == "run"),
+        "run_gap": run_course[1].where(play_type == "run") if 1 in run_course else None,
+        "kick_distance": np.where(play_type == "field_goal", 40, np.nan),
+        "posteam": plays["Team"],
+        "quarter_seconds_remaining": minutes * 60 + seconds,
+        "game_seconds_remaining": (4 - quarter).clip(lower=0) * 900 + minutes * 60 + seconds,
+        "score_differential": plays["ScoreDiff"],
+    })
+
+
+def to_workbook(plays: pd.DataFrame, path: str, sheets: int = 8):
+    """Writes plays as a multi-sheet workbook in the template_v2 layout (one sheet per team)."""
+    columns = ["Date", "Quarter", "Time", "Down", "Distance", "FieldPosition",
+               "PlayType", "RunCourse", "PassCourse", "YardsGained", "Detail"]
+    layout = plays[columns].rename(columns={"Detail": "Memo"})
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for i, chunk in enumerate(np.array_split(np.arange(len(layout)), sheets)):
+            layout.iloc[chunk].to_excel(writer, sheet_name=f"Team{i + 1}", index=False)
@@ -1,9 +1,12 @@
 
 import pandas as pd
-import requests
 import io
 import os
 
+from src.data_manager import update_database
+from src.dimensions import DIMENSION_COLUMNS
+from src.enrich import add_derived_columns, DERIVED_COLUMNS
+
 def fetch_nfl_data(year=2023, limit=5000):
     """
     Fetches NFL play-by-play data from nflverse.
@@ -102,11 +105,27 @@ def process_nfl_data(df):
     converted["RunCourse"] = df.apply(lambda x: get_course(x) if x['play_type'] == 'run' else "", axis=1)
     converted["PassCourse"] = df.apply(lambda x: get_course(x) if x['play_type'] == 'pass' else "", axis=1)
     
-    # Team (Store in Detail or ignore for now if not in Standard Columns? 
-    # Standard Columns: Date, Quarter, Time, Down, Distance, FieldPosition, PlayType, RunCourse, PassCourse, Detail, YardsGained, Success
-    # We will ignore 'Team' column for now to match the schema, or append it to detail.
+    # Team: the offense, stored as the partition key (and kept in Detail for keyword search)
+    converted["Team"] = df["posteam"].fillna("")
     converted["Detail"] = converted["Detail"] + " (" + df["posteam"] + ")"
 
+    # 12. Game clock / score state (numeric, so queries do not parse strings)
+    if "quarter_seconds_remaining" in df.columns:
+        converted["QuarterSecondsRemaining"] = pd.to_numeric(df["quarter_seconds_remaining"], errors='coerce')
+    if "game_seconds_remaining" in df.columns:
+        converted["GameSecondsRemaining"] = pd.to_numeric(df["game_seconds_remaining"], errors='coerce')
+    if "score_differential" in df.columns:
+        converted["ScoreDiff"] = pd.to_numeric(df["score_differential"], errors='coerce')
+
+    # Turnovers from nflverse's own flags: interceptions and fumbles the defense recovered
+    if "interception" in df.columns and "fumble_lost" in df.columns:
+        converted["is_turnover"] = ((pd.to_numeric(df["interception"], errors='coerce') == 1)
+                                    | (pd.to_numeric(df["fumble_lost"], errors='coerce') == 1)).astype(int)
+
+    # 13. Scouting dimensions: nflverse only flags shotgun snaps (no hash mark)
+    if "shotgun" in df.columns:
+        converted["Formation"] = df["shotgun"].map(lambda v: "Shotgun" if v == 1 else "")
+
     # STRICTLY ORDER COLUMNS TO MATCH database schema
     # otherwise append will corrupt data
     std_columns = [
@@ -115,11 +134,53 @@ def process_nfl_data(df):
     ]
     
     # Ensure all exist
-    for col in std_columns:
+    for col in std_columns + DIMENSION_COLUMNS:
         if col not in converted.columns:
             converted[col] = "" # fallback
             
-    return converted[std_columns]
+    # Derived columns are filled from the clock where nflverse did not provide them
+    return add_derived_columns(converted)[std_columns + DERIVED_COLUMNS + DIMENSION_COLUMNS + ["Team"]]
+
+def run_import_job(ctx, params):
+    """
+    Background job (see src/jobs.py): imports params["years"] one season
+    after another, limit rows each (None = whole season), appending
+    chunk_rows plays per commit. Each season is downloaded once into the job
+    directory, so a resumed job continues at its checkpoint (season, row)
+    without downloading again.
+    """
+    from src import jobs
+
+    years = [int(year) for year in params["years"]]
+    chunk_rows = int(params.get("chunk_rows") or jobs.DEFAULT_CHUNK_ROWS)
+    season = int(ctx.checkpoint.get("season", 0))
+    next_row = int(ctx.checkpoint.get("next_row", 0))
+    added = int(ctx.checkpoint.get("added", 0))
+
+    for season in range(season, len(years)):
+        year = years[season]
+        raw_path = jobs.input_path(ctx.job_id, f"{year}.csv")
+        if not os.path.exists(raw_path):
+            ctx.save(message=f"{year} シーズンをダウンロード中...")
+            raw_df = fetch_nfl_data(year=year, limit=params.get("limit"))
+            if raw_df is None:
+                raise RuntimeError(f"{year} シーズンのダウンロードに失敗しました")
+            raw_df.to_csv(raw_path + ".tmp", index=False)
+            os.replace(raw_path + ".tmp", raw_path)
+        raw_df = pd.read_csv(raw_path, low_memory=False)
+
+        for start in range(next_row, len(raw_df), chunk_rows):
+            ctx.check_cancel()
+            end = min(start + chunk_rows, len(raw_df))
+            clean_df = process_nfl_data(raw_df.iloc[start:end])
+            added += update_database(clean_df, note=f"NFLデータ {year}", group=ctx.job_id)
+            ctx.save({"season": season, "next_row": end, "added": added},
+                     (season + end / len(raw_df)) / len(years),
+                     f"{year}: {end}/{len(raw_df)} 行を処理 (追加 {added} 件)")
+        os.remove(raw_path)
+        next_row = 0
+        ctx.save({"season": season + 1, "next_row": 0, "added": added}, (season + 1) / len(years))
+    return {"added": added, "years": years}
 
 def main():
     # 1. Fetch
@@ -129,22 +190,11 @@ def main():
         # 2. Process
         clean_df = process_nfl_data(raw_df)
         
-        # 3. Save
-        # Check if DB exists to append or create
-        output_path = "data/match_data.csv"
-        
-        # Ensure directory
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-        if os.path.exists(output_path):
-            # Append but be careful with columns matching
-            clean_df.to_csv(output_path, mode='a', header=False, index=False)
-            print(f"Appended {len(clean_df)} plays to {output_path}")
-        else:
-            clean_df.to_csv(output_path, index=False)
-            print(f"Created {output_path} with {len(clean_df)} plays")
+        # 3. Save (appends and keeps the statistics sidecar in sync)
+        added = update_database(clean_df, note="NFLデータ")
+        print(f"Appended {added} plays to the database")
             
-        return len(clean_df)
+        return added
     return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+"""
+対戦相手レポート (スカウティングパック) の一括作成
+チームごとの傾向をExcelとHTMLで出力します。チームは並列に処理されます。
+
+    python scouting_report.py                          # 全チーム・全シーズン -> data/reports/<日時>/
+    python scouting_report.py --season 2023 --teams KC,BUF --out reports
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.tendency_report import DEFAULT_WORKERS, FORMATS, REPORTS_DIR, build_reports, zip_reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="対戦相手レポートの一括作成")
+    parser.add_argument("--season", default=None, help="シーズン (例: 2023)。省略時は全シーズン")
+    parser.add_argument("--teams", default="", help="カンマ区切りのチーム名。省略時は全チーム")
+    parser.add_argument("--out", default=None, help="出力フォルダ (既定: data/reports/<日時>)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="並列プロセス数")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="xlsx,html")
+    parser.add_argument("--zip", action="store_true", help="出力フォルダをzipにまとめる")
+    args = parser.parse_args(argv)
+
+    # Run from the app folder so the relative data paths resolve
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    out_dir = args.out or os.path.join(REPORTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}")
+    teams = [t.strip() for t in args.teams.split(",") if t.strip()] or None
+    formats = [f.strip() for f in args.formats.split(",") if f.strip() in FORMATS]
+
+    start = time.perf_counter()
+    result = build_reports(out_dir, args.season, teams, args.workers, formats,
+                           progress=lambda fraction, message: print(f"  {message}"))
+    print(f"📑 {result['teams']} チームのレポートを作成しました ({time.perf_counter() - start:.1f}秒): {out_dir}")
+    if args.zip and result["teams"]:
+        print(f"📦 {zip_reports(out_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,275 @@
 
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Any
 
-def filter_data(df: pd.DataFrame, down: int = None, distance: int = None, field_pos: int = None, quarter: str = None) -> pd.DataFrame:
+from src import dimensions
+from src.coalesce import RequestCoalescer
+from src.enrich import parse_clock, score_band
+from src.play_index import PlayIndex
+from src.profiling import span, timed
+from src.text_index import TextIndex, search_positions
+
+# Shares one analyze_situation run among concurrent identical requests
+_suggestion_coalescer = RequestCoalescer("analyze_situation")
+
+# Window around the entered clock when filtering by time remaining (seconds)
+TIME_WINDOW_SECONDS = 120
+
+def situation_conditions(down: int = None, distance: int = None, field_pos: int = None, quarter: str = None,
+                         time_remaining: str = None, score_diff: int = None,
+                         dims: Dict[str, str] = None) -> tuple:
+    """
+    Translates a situation into (equals, ranges) conditions on stored columns.
+    Ranges are inclusive (min, max) tuples; None means unbounded.
+    dims holds exact values of scouting dimensions (e.g. {"Hash": "L"}).
+    """
+    equals = {}
+    ranges = {}
+    if down is not None:
+        equals["Down"] = down
+    if quarter is not None:
+        equals["Quarter"] = quarter
+    for col, value in (dims or {}).items():
+        if value is not None:
+            equals[col] = value
+    # Distance: +- 2 yards
+    if distance is not None:
+        ranges["Distance"] = (max(0, distance - 2), distance + 2)
+    # Field Position: +- 10 yards
+    if field_pos is not None:
+        ranges["FieldPosition"] = (max(0, field_pos - 10), min(100, field_pos + 10))
+    # Clock: seconds remaining in the quarter, +- TIME_WINDOW_SECONDS
+    if time_remaining is not None:
+        seconds = parse_clock(pd.Series([time_remaining])).iloc[0]
+        if pd.notna(seconds):
+            ranges["QuarterSecondsRemaining"] = (max(0, seconds - TIME_WINDOW_SECONDS), seconds + TIME_WINDOW_SECONDS)
+    # Score: same score state (e.g. trailing by one score)
+    if score_diff is not None:
+        ranges["ScoreDiff"] = score_band(score_diff)
+    return equals, ranges
+
+def filter_data(df: pd.DataFrame, down: int = None, distance: int = None, field_pos: int = None, quarter: str = None,
+                time_remaining: str = None, score_diff: int = None, index: PlayIndex = None,
+                keyword: str = None, text_index: TextIndex = None, dims: Dict[str, str] = None) -> pd.DataFrame:
     """
     Filters the dataset based on the current situation.
     If a parameter is None, that filter is ignored.
+    keyword is a Detail search (player, term or "phrase"), see text_index.
+    With indexes built for df, the lookup uses them instead of scanning.
     """
     if df.empty:
         return df
-        
-    filtered = df.copy()
-        
-    # Filter by Down
-    if down is not None:
-        filtered = filtered[filtered["Down"] == down]
-    
-    # Filter by Distance (Range: Distance - 2 to Distance + 2)
-    if distance is not None:
-        min_dist = max(0, distance - 2)
-        max_dist = distance + 2
-        filtered = filtered[(filtered["Distance"] >= min_dist) & (filtered["Distance"] <= max_dist)]
-        
-    # Filter by Field Position (Range: +- 10 yards)
-    if field_pos is not None:
-        # Assuming FieldPosition is stored as int 0-100
-        # If it's string in DB, might need conversion. Assuming int here as per data_manager
-        # Only apply if 'FieldPosition' column exists and is numeric
-        if "FieldPosition" in filtered.columns:
-            # Try to convert to numeric just in case
-            filtered["FieldPosition_Num"] = pd.to_numeric(filtered["FieldPosition"], errors='coerce')
-            
-            min_pos = max(0, field_pos - 10)
-            max_pos = min(100, field_pos + 10)
-            
-            filtered = filtered[(filtered["FieldPosition_Num"] >= min_pos) & (filtered["FieldPosition_Num"] <= max_pos)]
-    
-    # Filter by Quarter
-    if quarter is not None and "Quarter" in filtered.columns:
-        filtered = filtered[filtered["Quarter"].astype(str) == str(quarter)]
-        
-    return filtered
 
-def analyze_situation(df: pd.DataFrame, current_situation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    equals, ranges = situation_conditions(down, distance, field_pos, quarter, time_remaining, score_diff, dims)
+
+    if index is not None and index.size == len(df) and all(index.has(col) for col in [*equals, *ranges]):
+        positions = index.select(equals, ranges)
+    else:
+        positions = np.flatnonzero(_situation_mask(df, equals, ranges).to_numpy())
+
+    if keyword:
+        positions = np.intersect1d(positions, search_positions(df, keyword, text_index), assume_unique=True)
+    return df.iloc[positions]
+
+def _situation_mask(df: pd.DataFrame, equals: dict, ranges: dict) -> pd.Series:
+    """Scan fallback of filter_data for tables without a PlayIndex."""
+    mask = pd.Series(True, index=df.index)
+    for col, value in equals.items():
+        if col not in df.columns:
+            continue
+        if isinstance(value, (int, float)):
+            mask &= pd.to_numeric(df[col], errors='coerce') == value
+        else:
+            mask &= df[col].astype(str) == str(value)
+    for col, (low, high) in ranges.items():
+        if col not in df.columns:
+            mask &= False
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        mask &= (values >= low) & (values <= high)
+    return mask
+
+# Keys that choose the plays to analyze (team / season partitions, date range)
+# rather than filter them; see data_manager.get_partition_store
+SCOPE_KEYS = ["Team", "Season", "DateFrom", "DateTo"]
+
+# Situation keys understood by analyze_situation (lower-case aliases accepted)
+SITUATION_KEYS = ["Down", "Distance", "FieldPosition", "Quarter", "ScoreDiff", "TimeRemaining", "Keyword"] \
+    + dimensions.DIMENSION_COLUMNS + SCOPE_KEYS
+
+def normalize_situation(raw: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Analyzes the filtered data and returns suggestions.
+    Validates a situation coming from outside the app (API, scripts) and
+    returns it in the same shape app.py builds. Raises ValueError on bad input.
+    """
+    by_lower = {str(k).lower(): v for k, v in (raw or {}).items()}
+    situation = {}
+    for key in SITUATION_KEYS:
+        value = by_lower.get(key.lower())
+        if value in ("", "指定なし"):
+            value = None
+        if value is not None:
+            if key in ("Down", "Distance", "FieldPosition", "ScoreDiff"):
+                try:
+                    value = int(float(value))
+                except (TypeError, ValueError):
+                    raise ValueError(f"{key} must be a number: {value!r}")
+            elif key == "Quarter":
+                value = str(value).upper()
+                if value.isdigit():
+                    value = f"{value}Q"
+            elif key in dimensions.DIMENSION_COLUMNS:
+                value = dimensions.normalize_value(key, value)
+            elif key in ("DateFrom", "DateTo"):
+                date = pd.to_datetime(str(value), errors='coerce')
+                if pd.isna(date):
+                    raise ValueError(f"{key} must be a date (YYYY-MM-DD): {value!r}")
+                value = date.strftime("%Y-%m-%d")
+            else:
+                value = str(value)
+        situation[key] = value
+
+    if situation["Down"] is not None and not 1 <= situation["Down"] <= 4:
+        raise ValueError("Down must be between 1 and 4")
+    if situation["Distance"] is not None and not 0 <= situation["Distance"] <= 99:
+        raise ValueError("Distance must be between 0 and 99")
+    if situation["FieldPosition"] is not None and not 0 <= situation["FieldPosition"] <= 100:
+        raise ValueError("FieldPosition must be between 0 and 100")
+    return situation
+
+# Situation buckets shared by the online aggregates (live game, per-player tables)
+def distance_bucket(distance) -> str:
+    """short (1-3), medium (4-7) or long (8+) yards to go."""
+    try:
+        distance = float(distance)
+    except (TypeError, ValueError):
+        return "unknown"
+    if distance <= 3:
+        return "short"
+    if distance <= 7:
+        return "medium"
+    return "long"
+
+def field_zone(field_pos) -> str:
+    """own (0-19), mid (20-79) or redzone (80-100)."""
+    try:
+        field_pos = float(field_pos)
+    except (TypeError, ValueError):
+        return "unknown"
+    if field_pos < 20:
+        return "own"
+    if field_pos >= 80:
+        return "redzone"
+    return "mid"
+
+def situation_bucket(down, distance, field_pos) -> tuple:
+    """Coarse situation key: (down, distance bucket, field zone)."""
+    try:
+        down = int(float(down))
+    except (TypeError, ValueError):
+        down = None
+    return (down, distance_bucket(distance), field_zone(field_pos))
+
+def distance_buckets(distance: pd.Series) -> pd.Series:
+    """Vectorized distance_bucket."""
+    values = pd.to_numeric(distance, errors='coerce')
+    labels = np.select([values <= 3, values <= 7, values > 7], ["short", "medium", "long"], "unknown")
+    return pd.Series(labels, index=distance.index)
+
+def field_zones(field_pos: pd.Series) -> pd.Series:
+    """Vectorized field_zone."""
+    values = pd.to_numeric(field_pos, errors='coerce')
+    labels = np.select([values < 20, values >= 80, values.notna()], ["own", "redzone", "mid"], "unknown")
+    return pd.Series(labels, index=field_pos.index)
+
+def get_strategy_name(row) -> str:
     """
-def analyze_situation(df: pd.DataFrame, current_situation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    Strategy label used for grouping: PlayType plus the run/pass course.
+    row can be a DataFrame row or a plain dict.
+    """
+    pt = str(row.get("PlayType", "")).strip()
+    
+    # Map numeric or short codes if necessary (handling legacy data)
+    code_map = {
+        "1": "パス (Pass)", "1.0": "パス (Pass)",
+        "2": "ラン (Run)", "2.0": "ラン (Run)",
+        "3": "スクリーン (Screen)", "3.0": "スクリーン (Screen)",
+        "4": "ドロー (Draw)", "4.0": "ドロー (Draw)",
+        "P": "パント (Punt)", "FG": "フィールドゴール (FG)"
+    }
+    
+    if pt in code_map:
+        pt = code_map[pt]
+    elif str(pt).replace(".0", "") in code_map:
+         pt = code_map[str(pt).replace(".0", "")]
+
+    # Add course detail
+    detail = ""
+    if "Pass" in pt or "Pass" in str(row.get("PlayType", "")):
+        course = str(row.get("PassCourse", "")).strip()
+        if course and course != "nan":
+            detail = f" - {course}"
+    elif "Run" in pt or "Run" in str(row.get("PlayType", "")):
+        course = str(row.get("RunCourse", "")).strip()
+        if course and course != "nan":
+            detail = f" - {course}"
+            
+    return f"{pt}{detail}"
+
+def strategy_names(df: pd.DataFrame) -> pd.Series:
+    """get_strategy_name for every row, computed once per distinct PlayType / course combination."""
+    if df.empty:
+        return pd.Series(dtype=object, index=df.index)
+    columns = [col for col in ("PlayType", "RunCourse", "PassCourse") if col in df.columns]
+    text = df[columns].astype(str)
+    # Missing values stay missing in str columns; give them their own marker
+    key = text[columns[0]].fillna("\x00").str.cat([text[col] for col in columns[1:]], sep="\x1f", na_rep="\x00")
+    first = ~key.duplicated().to_numpy()
+    labels = pd.Series(df[first].apply(get_strategy_name, axis=1).to_numpy(), index=key[first].to_numpy())
+    return pd.Series(labels.reindex(key.to_numpy()).to_numpy(), index=df.index)
+
+# Words in a strategy label (get_strategy_name) that make it a pass or a run
+PASS_WORDS = ("pass", "パス", "screen", "スクリーン")
+RUN_WORDS = ("run", "ラン", "draw", "ドロー")
+
+def play_families(strategies: pd.Series) -> pd.Series:
+    """'pass', 'run' or 'other' (kicks, unknown) for strategy labels."""
+    text = strategies.astype(str).str.lower()
+    is_pass = text.str.contains("|".join(PASS_WORDS), regex=True)
+    is_run = text.str.contains("|".join(RUN_WORDS), regex=True) & ~is_pass
+    return pd.Series(np.select([is_pass, is_run], ["pass", "run"], "other"), index=strategies.index)
+
+EXAMPLES_PER_SUGGESTION = 3
+
+# Outcome flags mentioned in the suggestion reason (flag column, label)
+OUTCOME_NOTES = [("is_td", "TD"), ("is_turnover", "ターンオーバー"), ("is_penalty", "反則")]
+
+def _flag_count(plays: pd.DataFrame, flag: str) -> int:
+    """Number of plays with an outcome flag set (0 if the column is missing)."""
+    if flag not in plays.columns:
+        return 0
+    return int(pd.to_numeric(plays[flag], errors='coerce').fillna(0).sum())
+
+def situation_plays(df: pd.DataFrame, current_situation: Dict[str, Any], index: PlayIndex = None,
+                    text_index: TextIndex = None) -> pd.DataFrame:
+    """filter_data for a situation dict (the plays analyze_situation groups)."""
+    dims = {col: current_situation.get(col) for col in dimensions.DIMENSION_COLUMNS}
+    return filter_data(df, current_situation.get("Down"), current_situation.get("Distance"),
+                       current_situation.get("FieldPosition"), current_situation.get("Quarter"),
+                       current_situation.get("TimeRemaining"), current_situation.get("ScoreDiff"), index=index,
+                       keyword=current_situation.get("Keyword"), text_index=text_index, dims=dims)
+
+@timed("analyze_situation")
+def analyze_situation(df: pd.DataFrame, current_situation: Dict[str, Any], index: PlayIndex = None,
+                      text_index: TextIndex = None) -> List[Dict[str, Any]]:
     """
     Analyzes the filtered data and returns suggestions.
+    Pass the PlayIndex / TextIndex built for df to avoid scanning the table.
     """
-    down = current_situation.get("Down")
-    distance = current_situation.get("Distance")
-    field_pos = current_situation.get("FieldPosition")
-    quarter = current_situation.get("Quarter")
-    
     # 1. Filter relevant past plays
-    relevant_plays = filter_data(df, down, distance, field_pos, quarter)
+    with span("analyze.filter"):
+        relevant_plays = situation_plays(df, current_situation, index, text_index)
     
     if relevant_plays.empty:
         return []
@@ -65,44 +278,16 @@ def analyze_situation(df: pd.DataFrame, current_situation: Dict[str, Any]) -> Li
     # Combines PlayType with RunCourse or PassCourse if available
     df_calc = relevant_plays.copy()
     
-    def get_strategy_name(row):
-        pt = str(row.get("PlayType", "")).strip()
-        
-        # Map numeric or short codes if necessary (handling legacy data)
-        code_map = {
-            "1": "パス (Pass)", "1.0": "パス (Pass)",
-            "2": "ラン (Run)", "2.0": "ラン (Run)",
-            "3": "スクリーン (Screen)", "3.0": "スクリーン (Screen)",
-            "4": "ドロー (Draw)", "4.0": "ドロー (Draw)",
-            "P": "パント (Punt)", "FG": "フィールドゴール (FG)"
-        }
-        
-        if pt in code_map:
-            pt = code_map[pt]
-        elif str(pt).replace(".0", "") in code_map:
-             pt = code_map[str(pt).replace(".0", "")]
-
-        # Add course detail
-        detail = ""
-        if "Pass" in pt or "Pass" in str(row.get("PlayType", "")):
-            course = str(row.get("PassCourse", "")).strip()
-            if course and course != "nan":
-                detail = f" - {course}"
-        elif "Run" in pt or "Run" in str(row.get("PlayType", "")):
-            course = str(row.get("RunCourse", "")).strip()
-            if course and course != "nan":
-                detail = f" - {course}"
-                
-        return f"{pt}{detail}"
-
-    df_calc["Strategy"] = df_calc.apply(get_strategy_name, axis=1)
+    with span("analyze.strategy"):
+        df_calc["Strategy"] = strategy_names(df_calc)
 
     # 3. Group by Strategy
-    stats = df_calc.groupby("Strategy").agg(
-        avg_gain=("YardsGained", "mean"),
-        success_rate=("Success", "mean"),
-        count=("YardsGained", "count")
-    ).reset_index()
+    with span("analyze.groupby"):
+        stats = df_calc.groupby("Strategy").agg(
+            avg_gain=("YardsGained", "mean"),
+            success_rate=("Success", "mean"),
+            count=("YardsGained", "count")
+        ).reset_index()
     
     # 4. Rank plays
     # Sort by metrics. For Kick-related plays, AvgGain might be 0, so maybe sort by count or success too?
@@ -111,44 +296,62 @@ def analyze_situation(df: pd.DataFrame, current_situation: Dict[str, Any]) -> Li
     
     suggestions = []
     
-    for _, row in stats.iterrows():
-        if row["count"] > 0:
-            strategy_name = row["Strategy"]
-            avg_gain = row["avg_gain"]
-            count = row["count"]
+    with span("analyze.context"):
+        for _, row in stats.iterrows():
+            if row["count"] > 0:
+                strategy_name = row["Strategy"]
+                avg_gain = row["avg_gain"]
+                count = row["count"]
             
-            # Analyze detail for context (Why is it negative? Why is it high?)
-            # Get original rows for this strategy
-            subset = df_calc[df_calc["Strategy"] == strategy_name]
+                # Analyze detail for context (Why is it negative? Why is it high?)
+                # Get original rows for this strategy
+                subset = df_calc[df_calc["Strategy"] == strategy_name]
             
-            context_notes = []
+                context_notes = []
             
-            # Check for negative plays (Sacks, Loss)
-            neg_plays = subset[subset["YardsGained"] < 0]
-            if not neg_plays.empty:
-                neg_count = len(neg_plays)
-                # Check desc for "sack"
-                sack_count = neg_plays["Detail"].str.contains("sack", case=False, na=False).sum()
-                if sack_count > 0:
-                    context_notes.append(f"サック{sack_count}回")
-                elif neg_count > 0:
-                    context_notes.append(f"ロス{neg_count}回")
+                # Check for negative plays (Sacks, Loss)
+                neg_plays = subset[subset["YardsGained"] < 0]
+                if not neg_plays.empty:
+                    neg_count = len(neg_plays)
+                    # Sacks come from the ingest-time flag (no text scan here)
+                    sack_count = _flag_count(neg_plays, "is_sack")
+                    if sack_count > 0:
+                        context_notes.append(f"サック{sack_count}回")
+                    elif neg_count > 0:
+                        context_notes.append(f"ロス{neg_count}回")
             
-            # Check for big plays
-            big_plays = subset[subset["YardsGained"] > 20]
-            if not big_plays.empty:
-                context_notes.append(f"ビッグゲインあり({len(big_plays)}回)")
-
-            reason_text = f"{count}回の類似プレーに基づく (平均 {round(avg_gain, 1)} yd)。"
-            if context_notes:
-                reason_text += " 要因: " + "、".join(context_notes)
-
-            suggestions.append({
-                "play_type": strategy_name,
-                "avg_gain": round(avg_gain, 1),
-                "success_rate": f"{row['success_rate']*100:.0f}%" if "success_rate" in row else "N/A",
-                "sample_size": count,
-                "reason": reason_text
-            })
+                # Check for big plays
+                big_plays = subset[subset["YardsGained"] > 20]
+                if not big_plays.empty:
+                    context_notes.append(f"ビッグゲインあり({len(big_plays)}回)")
+
+                for flag, label in OUTCOME_NOTES:
+                    flag_count = _flag_count(subset, flag)
+                    if flag_count > 0:
+                        context_notes.append(f"{label}{flag_count}回")
+
+                reason_text = f"{count}回の類似プレーに基づく (平均 {round(avg_gain, 1)} yd)。"
+                if context_notes:
+                    reason_text += " 要因: " + "、".join(context_notes)
+
+                suggestions.append({
+                    "play_type": strategy_name,
+                    "avg_gain": round(avg_gain, 1),
+                    "success_rate": f"{row['success_rate']*100:.0f}%" if "success_rate" in row else "N/A",
+                    "sample_size": count,
+                    "reason": reason_text,
+                    # Row ids of the most recent plays, for showing their descriptions
+                    "example_ids": [int(i) for i in subset.index[-EXAMPLES_PER_SUGGESTION:][::-1]]
+                })
             
     return suggestions
+
+def coalesced_analyze_situation(df: pd.DataFrame, current_situation: Dict[str, Any], data_version: Any,
+                                index: PlayIndex = None, text_index: TextIndex = None) -> List[Dict[str, Any]]:
+    """
+    analyze_situation with in-flight deduplication: concurrent calls for the
+    same situation and data version wait for a single computation.
+    The situation should already be normalized (see normalize_situation).
+    """
+    key = (data_version, tuple(sorted(current_situation.items())))
+    return _suggestion_coalescer.run(key, lambda: analyze_situation(df, current_situation, index, text_index))
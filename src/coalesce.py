@@ -0,0 +1,77 @@
+"""
+In-flight request coalescing.
+
+When several callers ask for the same key at the same time (e.g. every coach
+requesting "1st & 10 at the 25" right after a first down), only the first
+one runs the computation; the others wait for it and share the result.
+Nothing is kept after the computation finishes - caching is left to the
+callers, which already key their caches by data version.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List
+
+_registry: List["RequestCoalescer"] = []
+_registry_lock = threading.Lock()
+
+
+class RequestCoalescer:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._calls = 0
+        self._computed = 0
+        self._coalesced = 0
+        self._errors = 0
+        with _registry_lock:
+            _registry.append(self)
+
+    def run(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Returns func(), sharing one execution among concurrent calls with the same key."""
+        with self._lock:
+            self._calls += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self._computed += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                self._errors += 1
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "calls": self._calls,
+                "computed": self._computed,
+                "coalesced": self._coalesced,
+                "errors": self._errors,
+                "in_flight": len(self._inflight),
+            }
+
+
+def all_stats() -> List[Dict[str, Any]]:
+    """Metrics of every coalescer created in this process."""
+    with _registry_lock:
+        coalescers = list(_registry)
+    return [c.stats() for c in coalescers]
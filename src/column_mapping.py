@@ -0,0 +1,176 @@
+"""
+Column mapping plans for uploaded sheets.
+
+Format detection only looks at the header, and scouting workbooks repeat
+the same header on dozens of sheets. The header is reduced to a signature
+(normalized names, in order) and compiled once into a plan: the detected
+format and, for every standard column, the position of its source column
+or the value used when there is none. Plans are cached by signature for
+the life of the process, so further sheets and uploads with the same layout
+skip detection and are converted with one positional column selection.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src import dimensions, enrich
+
+MAX_PLANS = 256
+
+# Placeholder for the upload date (filled in when the plan is applied)
+TODAY = "<today>"
+
+BASE_COLUMNS = [
+    "Date", "Quarter", "Time", "Down", "Distance", "FieldPosition",
+    "PlayType", "RunCourse", "PassCourse", "Detail", "YardsGained", "Success"
+]
+NUMERIC_COLUMNS = ["Down", "Distance", "YardsGained", "Success"]
+
+# Keyword format ("shuma's" scouting sheets): standard column, header
+# keywords (first column containing one wins), words that rule a column out,
+# value when no column matches (None: column left out). Values are taken as
+# they are; src/validation.py coerces and checks them.
+KEYWORD_RULES = [
+    ("Date", (), (), TODAY),
+    ("PlayType", ("play type", "playtype"), (), "Unknown"),
+    ("FieldPosition", ("start yard", "yardline", "fieldposition"), (), ""),
+    ("Distance", ("first down", "to edown", "yards to e", "distance"), (), np.nan),
+    ("YardsGained", ("gained yards", "gained", "yardsgained"), (), np.nan),
+    ("Success", ("success/fail", "success", "fail"), (), np.nan),
+    ("Down", ("down",), ("first", "yards"), np.nan),
+    ("Quarter", ("quarter", "qtr"), (), ""),
+    ("Time", ("time", "remaining"), (), ""),
+    ("ScoreDiff", ("scorediff", "score diff", "点差"), (), None),
+    ("RunCourse", ("run course", "runcourse", "run dir"), (), ""),
+    ("PassCourse", ("pass course", "passcourse", "pass route"), (), ""),
+    ("Detail", ("memo", "note", "detail", "result"), (), ""),
+] + [(dimension.column, dimension.keywords, (), None) for dimension in dimensions.DIMENSIONS]
+# Declared defaults of the keyword layout for columns its sheets may not
+# have at all: the scouting workbooks log plays without a down, which are
+# imported as 1st down. Applied (and counted) by validation, only when the
+# sheet has no such column; a blank cell in an existing column is an error.
+KEYWORD_DEFAULTS = {"Down": 1}
+# Text columns whose blanks become "" instead of staying missing
+FILL_BLANK_COLUMNS = ["Detail"]
+
+_plans: "OrderedDict[Tuple[str, ...], dict]" = OrderedDict()
+_plans_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_name(name) -> str:
+    return re.sub(r"\s+", " ", str(name).strip().lower())
+
+
+def header_signature(columns: Sequence) -> Tuple[str, ...]:
+    return tuple(normalize_name(col) for col in columns)
+
+
+def _first_match(names: Sequence[str], keywords, exclude=()) -> Optional[int]:
+    for position, name in enumerate(names):
+        if any(keyword in name for keyword in keywords) and not any(word in name for word in exclude):
+            return position
+    return None
+
+
+def compile_plan(columns: Sequence) -> dict:
+    """Detects the format of a header and returns its mapping plan (see apply_plan)."""
+    names = header_signature(columns)
+    defaults = {}
+    if _first_match(names, ("play type", "playtype", "play #", "play#")) is not None:
+        fmt = "keyword"
+        mapping = []
+        for target, keywords, exclude, default in KEYWORD_RULES:
+            position = _first_match(names, keywords, exclude) if keywords else None
+            if position is not None or default is not None:
+                mapping.append((target, position, default))
+            if position is None and target in KEYWORD_DEFAULTS:
+                defaults[target] = KEYWORD_DEFAULTS[target]
+    elif "playtype" in names and "yardsgained" in names:
+        # Standard layout: exact names, missing numbers are left to validation
+        fmt = "standard"
+        mapping = [(col, names.index(col.lower()) if col.lower() in names else None,
+                    TODAY if col == "Date" else np.nan if col in NUMERIC_COLUMNS else "")
+                   for col in BASE_COLUMNS]
+        mapping += [(col, names.index(col.lower()), None)
+                    for col in enrich.DERIVED_COLUMNS + dimensions.DIMENSION_COLUMNS if col.lower() in names]
+    else:
+        # Unknown: the first column as play type; the situation is unknown, so
+        # validation rejects the rows instead of inventing one
+        fmt = "unknown"
+        mapping = [("Date", None, TODAY), ("Down", None, np.nan), ("Distance", None, np.nan),
+                   ("FieldPosition", None, ""), ("PlayType", 0 if names else None, "Unknown"),
+                   ("Detail", None, ""), ("YardsGained", None, np.nan), ("Success", None, np.nan)]
+    return {"signature": names, "header": [str(col) for col in columns], "format": fmt,
+            "mapping": mapping, "defaults": defaults, "hits": 0}
+
+
+def get_plan(columns: Sequence) -> Tuple[dict, bool]:
+    """The cached plan for this header (compiled on first sight) and whether it was cached."""
+    signature = header_signature(columns)
+    with _plans_lock:
+        plan = _plans.get(signature)
+        if plan is not None:
+            _plans.move_to_end(signature)
+            plan["hits"] += 1
+            _stats["hits"] += 1
+            return plan, True
+    plan = compile_plan(columns)
+    with _plans_lock:
+        _plans[signature] = plan
+        _stats["misses"] += 1
+        while len(_plans) > MAX_PLANS:
+            _plans.popitem(last=False)
+    return plan, False
+
+
+def apply_plan(df: pd.DataFrame, plan: dict) -> pd.DataFrame:
+    """Converts a sheet to the standard columns: one positional selection plus the fill values."""
+    mapped = [(target, position) for target, position, _ in plan["mapping"] if position is not None]
+    converted = df.iloc[:, [position for _, position in mapped]].copy()
+    converted.columns = [target for target, _ in mapped]
+    today = pd.Timestamp.now().strftime("%Y-%m-%d")
+    for target, position, default in plan["mapping"]:
+        if position is None:
+            converted[target] = today if default is TODAY else default
+        elif target in FILL_BLANK_COLUMNS and plan["format"] == "keyword":
+            converted[target] = converted[target].fillna("")
+    converted = converted[[target for target, _, _ in plan["mapping"]]]
+    if plan["format"] == "unknown":
+        converted.attrs["unknown_format"] = True
+    # Validated with these as declared defaults (see validation.with_defaults)
+    converted.attrs["defaults"] = dict(plan["defaults"])
+    return converted
+
+
+def describe(plan: dict) -> str:
+    """'keyword: PlayType<-Play Type, Down<-Down, Distance<-(none), ...' for logs and the debug view."""
+    parts = []
+    for target, position, _ in plan["mapping"]:
+        if target == "Date":
+            continue
+        if position is not None:
+            parts.append(f"{target}<-{plan['header'][position]}")
+        elif target in plan["defaults"]:
+            parts.append(f"{target}<-(default {plan['defaults'][target]})")
+        else:
+            parts.append(f"{target}<-(none)")
+    return f"{plan['format']}: " + ", ".join(parts)
+
+
+def cached_plans() -> List[Dict]:
+    """The cached plans, most recently used first (for the debug view)."""
+    with _plans_lock:
+        plans = list(reversed(_plans.values()))
+    return [{"format": plan["format"], "columns": len(plan["signature"]), "hits": plan["hits"],
+             "header": " | ".join(plan["header"])[:120], "mapping": describe(plan)} for plan in plans]
+
+
+def stats() -> Dict[str, int]:
+    with _plans_lock:
+        return dict(_stats, plans=len(_plans))
@@ -0,0 +1,234 @@
+"""
+Single-writer commit queue.
+
+Every database mutation (uploads, NFL imports, live game commits, backfill,
+rollback, reset) is handed to one writer thread and applied in submission
+order, so two sessions writing at the same moment cannot overwrite each
+other. Appends that are waiting together are written as one group commit
+(one CSV append, one new version, one sidecar update); each caller still
+gets its own acknowledgement through its Future.
+
+FileLock serializes writers across processes (e.g. import_nfl_data.py run
+from a terminal while the app is open).
+"""
+
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+# Upper bound on appends merged into one group commit
+MAX_GROUP = 64
+
+
+class FileLock:
+    """
+    Cross-process lock based on exclusively creating a lock file. The file
+    records who holds it (pid, host, a token) and the holder touches it every
+    stale_after / 4 seconds while it runs, so a long write keeps its lock.
+    A waiter breaks the lock only if the holder is gone: a process of this
+    host that no longer exists, or (any host) no heartbeat for stale_after
+    seconds.
+    """
+
+    def __init__(self, path: str, timeout: float = 60.0, stale_after: float = 300.0):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._depth = 0
+        self._owner = None
+        self._token = None
+        self._heartbeat = None
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        if self._owner == threading.get_ident():
+            self._depth += 1
+            return self
+        deadline = time.monotonic() + self.timeout
+        token = f"{os.getpid()} {socket.gethostname()} {uuid.uuid4().hex}"
+        while True:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, token.encode())
+                os.close(fd)
+                break
+            except FileExistsError:
+                try:
+                    holder = self._read()
+                    if self._holder_gone(holder) or time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        self._break(holder)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"database is locked by another process ({self.path})")
+                time.sleep(0.05)
+        self._owner = threading.get_ident()
+        self._depth = 1
+        self._token = token
+        self._stopped.clear()
+        self._heartbeat = threading.Thread(target=self._beat, args=(token,), name="file-lock-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+            self._stopped.set()
+            self._heartbeat.join()
+            try:
+                if self._read() == self._token:
+                    os.remove(self.path)
+            except OSError:
+                pass
+        return False
+
+    def _read(self) -> str:
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def _beat(self, token: str):
+        """Refreshes the lock file's mtime while this holder still owns it."""
+        while not self._stopped.wait(self.stale_after / 4):
+            try:
+                if self._read() != token:
+                    return
+                os.utime(self.path)
+            except OSError:
+                return
+
+    @staticmethod
+    def _holder_gone(holder: str) -> bool:
+        """True when the lock was taken on this host by a process that no longer exists."""
+        parts = holder.split()
+        # Signal 0 only probes on POSIX (os.kill terminates the process on Windows)
+        if len(parts) < 2 or parts[1] != socket.gethostname() or os.name == "nt":
+            return False
+        try:
+            os.kill(int(parts[0]), 0)
+        except ProcessLookupError:
+            return True
+        except (OSError, ValueError):
+            return False
+        return False
+
+    def _break(self, holder: str):
+        """
+        Removes the lock judged stale. It is moved aside first and put back if
+        it is no longer the one judged (another waiter broke it and took the
+        lock in between).
+        """
+        moved = f"{self.path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(self.path, moved)
+        except OSError:
+            return
+        try:
+            with open(moved, "r", encoding="utf-8", errors="replace") as f:
+                taken = f.read()
+            if taken != holder:
+                try:
+                    os.link(moved, self.path)
+                except OSError:
+                    pass
+            else:
+                print(f"Broke stale lock {self.path} ({holder or 'no holder recorded'})")
+        finally:
+            try:
+                os.remove(moved)
+            except OSError:
+                pass
+
+
+class CommitQueue:
+    def __init__(self, name: str, commit_appends: Callable[[List[Any]], List[Any]]):
+        """commit_appends(items) writes a group of appends and returns one result per item."""
+        self.name = name
+        self._commit_appends = commit_appends
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats = {"appends": 0, "calls": 0, "group_commits": 0, "largest_group": 0, "errors": 0}
+
+    # --- submission ---
+    def append(self, item: Any) -> Future:
+        """Queues one append; the Future resolves to its commit_appends() result."""
+        return self._submit("append", item)
+
+    def call(self, func: Callable[[], Any]) -> Future:
+        """Queues any other mutation; it runs alone, in order with the appends."""
+        return self._submit("call", func)
+
+    def run(self, kind: str, payload: Any) -> Any:
+        """Submits and waits. On the writer thread itself the work runs inline."""
+        if threading.current_thread() is self._thread:
+            return self._commit_appends([payload])[0] if kind == "append" else payload()
+        return self._submit(kind, payload).result()
+
+    def _submit(self, kind: str, payload: Any) -> Future:
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((kind, payload, future))
+        return future
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=f"{self.name}-writer", daemon=True)
+                    self._thread.start()
+
+    # --- writer thread ---
+    def _loop(self):
+        while True:
+            pending = [self._queue.get()]
+            # Everything that queued up meanwhile goes into this round
+            while len(pending) < MAX_GROUP:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            group = []
+            for request in pending:
+                if request[0] == "append":
+                    group.append(request)
+                    continue
+                self._flush(group)
+                group = []
+                self._run_call(request)
+            self._flush(group)
+
+    def _flush(self, group: List[tuple]):
+        if not group:
+            return
+        try:
+            results = self._commit_appends([payload for _, payload, _ in group])
+        except BaseException as e:
+            self._stats["errors"] += 1
+            for _, _, future in group:
+                future.set_exception(e)
+            return
+        self._stats["appends"] += len(group)
+        self._stats["group_commits"] += 1
+        self._stats["largest_group"] = max(self._stats["largest_group"], len(group))
+        for (_, _, future), result in zip(group, results):
+            future.set_result(result)
+
+    def _run_call(self, request: tuple):
+        _, func, future = request
+        self._stats["calls"] += 1
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            self._stats["errors"] += 1
+            future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats, name=self.name, pending=self._queue.qsize())
@@ -1,195 +1,95 @@
 
+import numpy as np
 import pandas as pd
+import csv
 import os
+import pickle
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import Optional
 
+from src import column_mapping, delta_store, enrich, metadata, partitions, player_stats, validation, versions
+from src.dimensions import DIMENSION_COLUMNS
+from src.commit_queue import CommitQueue, FileLock
+from src.play_index import PlayIndex
+from src.text_index import TextIndex, search_positions
+from src.text_store import STORE_COLUMNS, TextStore
+from src.profiling import span, timed
+
 # Constants
 DATA_FILE_PATH = "data/match_data.csv"
+STATS_FILE_PATH = "data/match_data.meta.json"
+TEXT_INDEX_PATH = "data/match_data.textidx.npz"
+PLAYER_STATS_PATH = "data/match_data.players"
+TEXT_STORE_PATH = "data/match_data.text.npz"
+SNAPSHOT_PATH = "data/match_data.snapshot.pkl"
+PARTITIONS_PATH = "data/match_data.partitions"
+VERSIONS_PATH = "data/match_data.versions.json"
+VERSIONS_DIR = "data/versions"
+LOCK_PATH = "data/match_data.lock"
+
+# Bump when the play table or PlayIndex layout changes; older snapshots are then rebuilt
+SNAPSHOT_FORMAT = 3
+
+# Sidecars derived from the current version; dropped when rollback/reset switches versions
+DERIVED_SIDECARS = [STATS_FILE_PATH, TEXT_INDEX_PATH, PLAYER_STATS_PATH, TEXT_STORE_PATH, SNAPSHOT_PATH,
+                    PARTITIONS_PATH]
+
+# Writers (appends, backfill, rollback, reset) run on the commit queue's thread
+# and hold both locks (see _writing()); readers take them only to adopt a CSV
+# changed outside the app.
+_write_lock = threading.RLock()
+_file_lock = FileLock(LOCK_PATH)
+
+# (data version, TextStore) of the last get_text_store()
+_text_store_cache = None
+# (data version, (play table, PlayIndex)) of the last get_play_store()
+_play_store_cache = None
+_play_store_lock = threading.Lock()
+# (data version, partition catalog) of the last get_partition_catalog()
+_partition_cache = None
+# (partition catalog, its runs in id order) for get_rows()
+_row_runs_cache = None
+# (data version, scope) -> (partition table, PlayIndex), most recently used last
+_partition_stores: "OrderedDict[tuple, tuple]" = OrderedDict()
+_partition_lock = threading.Lock()
+MAX_PARTITION_STORES = 8
+
+# Columns supplied by uploads and importers
+BASE_COLUMNS = column_mapping.BASE_COLUMNS
+
+# Internal standard columns: base columns, the ones derived at ingest and the
+# scouting dimensions (src/dimensions.py; blank when a source has none) and
+# the team the play belongs to (sheet name / posteam; see partitions.py)
+STANDARD_COLUMNS = BASE_COLUMNS + enrich.DERIVED_COLUMNS + DIMENSION_COLUMNS + ["Team"]
+
+# Columns the analysis path and the data browser keep in memory. The long
+# text columns (Detail, Time, players) are fetched by row id with get_rows().
+PLAY_TABLE_COLUMNS = [
+    "Date", "Quarter", "Down", "Distance", "FieldPosition",
+    "PlayType", "RunCourse", "PassCourse", "YardsGained", "Success"
+] + enrich.GAME_STATE_COLUMNS + enrich.FLAG_COLUMNS + DIMENSION_COLUMNS
+
+# Low-cardinality text columns read as categoricals (less memory, faster parse)
+CATEGORY_COLUMNS = ["Quarter", "PlayType", "RunCourse", "PassCourse"] + DIMENSION_COLUMNS
+
+# Tables of one team / season (get_partition_store): the play table plus
+# Detail, so keyword searches can scan the (small) table directly
+PARTITION_TABLE_COLUMNS = PLAY_TABLE_COLUMNS + ["Detail"]
 
-# Internal standard columns
-# Internal standard columns
-STANDARD_COLUMNS = [
-    "Date", "Quarter", "Time", "Down", "Distance", "FieldPosition", 
-    "PlayType", "RunCourse", "PassCourse", "Detail", "YardsGained", "Success"
-]
-
-# Column mapping for user's custom format
-# Maps user's column names -> standard column names
-COLUMN_MAPPINGS = {
-    # User format 1 (original)
-    "Date": "Date",
-    "Down": "Down", 
-    "Distance": "Distance",
-    "FieldPosition": "FieldPosition",
-    "PlayType": "PlayType",
-    "Detail": "Detail",
-    "YardsGained": "YardsGained",
-    "Success": "Success",
-    
-    # User format 2 (shuma's format)
-    "Play #": "PlayNumber",
-    "Play Type": "PlayType",
-    "PorFG": "PorFG",
-    "Start Yard": "FieldPosition",
-    "Yards to EDown": "Distance",
-    "Yards to FGained Yards": "YardsGained",
-    "Pass Success/Fail": "Success",
-    "Turnover (Yes/No)": "Turnover",
-    "FGgood/no": "FGResult",
-    "score": "Score",
-    "memo": "Memo",
-    
-    # New Standard Format (v2)
-    "Quarter": "Quarter",
-    "Time": "Time",
-    "PlayNumber": "PlayNumber",
-    "Team": "Team",
-    "RunCourse": "RunCourse",
-    "PassCourse": "PassCourse",
-    "Result": "Detail",
-    "Memo": "Detail"
-}
-
-
-def find_column(columns, *keywords):
-    """Find a column that contains any of the keywords (case-insensitive)."""
-    for col in columns:
-        col_lower = str(col).lower()
-        for keyword in keywords:
-            if keyword.lower() in col_lower:
-                return col
-    return None
 
 def detect_and_convert_format(df: pd.DataFrame) -> pd.DataFrame:
     """
     Detect the Excel format and convert to standard format.
+    The mapping plan is compiled once per header layout and cached (see
+    src/column_mapping.py); it is attached as attrs["mapping_plan"].
     """
-    columns = df.columns.tolist()
-    print(f"Processing columns: {columns}")
-    
-    # Check if it's shuma's format (has Play Type or Play #)
-    play_type_col = find_column(columns, 'play type', 'playtype')
-    has_shuma_format = play_type_col is not None or find_column(columns, 'play #', 'play#') is not None
-    
-    if has_shuma_format:
-        # Convert shuma's format to standard format
-        converted = pd.DataFrame()
-        
-        # Map columns
-        converted["Date"] = pd.Timestamp.now().strftime("%Y-%m-%d")
-        
-        # --- Basic Metrics ---
-        # Play Type
-        if play_type_col:
-            converted["PlayType"] = df[play_type_col].fillna("Unknown")
-        else:
-            converted["PlayType"] = "Unknown"
-        
-        # Field Position
-        field_col = find_column(columns, 'start yard', 'yardline', 'fieldposition')
-        if field_col:
-            converted["FieldPosition"] = df[field_col]
-        else:
-            converted["FieldPosition"] = ""
-        
-        # Distance (Yards to First Down)
-        distance_col = find_column(columns, 'first down', 'to edown', 'yards to e', 'distance')
-        if distance_col:
-            converted["Distance"] = pd.to_numeric(df[distance_col], errors='coerce')
-        else:
-            converted["Distance"] = 10
-            
-        # Yards Gained
-        gained_col = find_column(columns, 'gained yards', 'gained', 'yardsgained')
-        if gained_col:
-            converted["YardsGained"] = pd.to_numeric(df[gained_col], errors='coerce')
-        else:
-            converted["YardsGained"] = 0
-            
-        # Success
-        success_col = find_column(columns, 'success/fail', 'success', 'fail')
-        if success_col:
-            converted["Success"] = df[success_col].apply(
-                lambda x: 1 if str(x).lower() in ['success', 'yes', '1', 'true', '成功'] else 0
-            )
-        else:
-            converted["Success"] = 0
-            
-        # Down
-        down_col = find_column(columns, 'down')
-        if down_col and 'first' not in str(down_col).lower() and 'yards' not in str(down_col).lower():
-            converted["Down"] = pd.to_numeric(df[down_col], errors='coerce').fillna(1)
-        else:
-            converted["Down"] = 1
-
-        # --- Enhanced Metrics (Time, Course, etc) ---
-        
-        # Quarter
-        quarter_col = find_column(columns, 'quarter', 'qtr')
-        if quarter_col:
-            converted["Quarter"] = df[quarter_col]
-        else:
-            converted["Quarter"] = ""
-            
-        # Time
-        time_col = find_column(columns, 'time', 'remaining')
-        if time_col:
-            converted["Time"] = df[time_col]
-        else:
-            converted["Time"] = ""
-            
-        # Run Course
-        run_course_col = find_column(columns, 'run course', 'runcourse', 'run dir')
-        if run_course_col:
-            converted["RunCourse"] = df[run_course_col]
-        else:
-            converted["RunCourse"] = ""
-            
-        # Pass Course
-        pass_course_col = find_column(columns, 'pass course', 'passcourse', 'pass route')
-        if pass_course_col:
-            converted["PassCourse"] = df[pass_course_col]
-        else:
-            converted["PassCourse"] = ""
-            
-        # Detail (memo or Result)
-        memo_col = find_column(columns, 'memo', 'note', 'detail', 'result')
-        if memo_col:
-            converted["Detail"] = df[memo_col].fillna("")
-        else:
-            converted["Detail"] = ""
-        
-        print(f"Converted {len(converted)} rows with columns: {converted.columns.tolist()}")
-        return converted
-        
-    # Check if it's the original expected format
-    elif all(col in columns for col in ["PlayType", "YardsGained"]):
-        # Original format - just ensure all columns exist
-        result = df.copy()
-        for col in STANDARD_COLUMNS:
-            if col not in result.columns:
-                if col == "Date":
-                    result[col] = pd.Timestamp.now().strftime("%Y-%m-%d")
-                elif col in ["Down", "Distance", "YardsGained"]:
-                    result[col] = 0
-                elif col == "Success":
-                    result[col] = 0
-                else:
-                    result[col] = ""
-        return result[STANDARD_COLUMNS]
-    
-    else:
-        # Unknown format - try to use whatever columns exist
-        result = pd.DataFrame()
-        result["Date"] = pd.Timestamp.now().strftime("%Y-%m-%d")
-        result["Down"] = 1
-        result["Distance"] = 10
-        result["FieldPosition"] = ""
-        result["PlayType"] = df.iloc[:, 0] if len(df.columns) > 0 else "Unknown"
-        result["Detail"] = ""
-        result["YardsGained"] = 0
-        result["Success"] = 0
-        return result
+    plan, cached = column_mapping.get_plan(df.columns)
+    print(f"Processing columns: {df.columns.tolist()} ({'cached' if cached else 'new'} {plan['format']} plan)")
+    converted = column_mapping.apply_plan(df, plan)
+    converted.attrs["mapping_plan"] = {"plan": column_mapping.describe(plan), "cached": cached}
+    return converted
 
 def load_excel(file) -> tuple[Optional[pd.DataFrame], list[str]]:
     """
@@ -199,65 +99,99 @@ def load_excel(file) -> tuple[Optional[pd.DataFrame], list[str]]:
     logs = []
     try:
         # Read ALL sheets from Excel file
-        all_sheets = pd.read_excel(file, sheet_name=None)
+        with span("excel.read"):
+            all_sheets = pd.read_excel(file, sheet_name=None)
         
         logs.append(f"Found {len(all_sheets)} sheets: {list(all_sheets.keys())}")
         
         all_dfs = []
+        rejected_rows, rejected_errors, skipped_sheets, plans_used = [], [], [], []
         
         for sheet_name, df in all_sheets.items():
             if df.empty:
                 logs.append(f"Sheet '{sheet_name}' is empty, skipping")
                 continue
             
+            # Blank lines (formatted but empty cells) are not plays
+            df = df.dropna(how="all")
             logs.append(f"Processing sheet '{sheet_name}' with {len(df)} rows")
             logs.append(f"Columns: {df.columns.tolist()}")
             
             try:
                 # Detect format and convert
-                converted_df = detect_and_convert_format(df)
+                with span("excel.detect"):
+                    converted_df = detect_and_convert_format(df)
                 
                 # Check for conversion success
                 if converted_df.empty:
                     logs.append(f"  -> Warning: No valid data converted from sheet '{sheet_name}'")
                     continue
+                if converted_df.attrs.get("unknown_format"):
+                    # e.g. an instructions sheet: reported, not imported row by row
+                    logs.append(f"  -> Skipped sheet '{sheet_name}': no Down/Distance/PlayType columns recognized")
+                    skipped_sheets.append(sheet_name)
+                    continue
                     
                 logs.append(f"  -> Converted columns: {converted_df.columns.tolist()}")
+                mapping = converted_df.attrs["mapping_plan"]
+                logs.append(f"  -> Mapping plan ({'cached' if mapping['cached'] else 'new'}): {mapping['plan']}")
+                plans_used.append({"シート": sheet_name, "キャッシュ": mapping["cached"], "マッピング": mapping["plan"]})
                 
-                # Add sheet name as team identifier
-                converted_df["Team"] = sheet_name
+                layout_defaults = converted_df.attrs.get("defaults", {})
+                schema = validation.with_defaults(layout_defaults)
+                with span("excel.validate"):
+                    valid_df, errors, defaults = validation.validate_plays(converted_df, schema)
                 
-                # Convert numeric columns
-                converted_df["Down"] = pd.to_numeric(converted_df["Down"], errors='coerce').fillna(1).astype(int)
-                converted_df["Distance"] = pd.to_numeric(converted_df["Distance"], errors='coerce').fillna(10)
-                converted_df["YardsGained"] = pd.to_numeric(converted_df["YardsGained"], errors='coerce').fillna(0)
+                for col, count in defaults.items():
+                    if col in layout_defaults:
+                        logs.append(f"  -> {col}: no column in this sheet layout, {count} rows imported as "
+                                    f"{schema[col]['default']} (declared default)")
+                    else:
+                        logs.append(f"  -> {col}: {count} blank values imported as {schema[col]['default']}")
+                if len(errors):
+                    logs.append(f"  -> Rejected {len(errors)} rows: " + ", ".join(validation.summarize(errors)))
+                    rows = df.loc[errors.index].copy()
+                    rows.insert(0, "_sheet", sheet_name)
+                    # Spreadsheet row number (header is row 1)
+                    rows.insert(1, "_row", errors.index + 2)
+                    rejected_rows.append(rows)
+                    rejected_errors.append(errors)
                 
-                # Drop rows with missing PlayType
-                pre_filter_len = len(converted_df)
-                converted_df = converted_df.dropna(subset=["PlayType"])
-                converted_df = converted_df[converted_df["PlayType"].astype(str).str.strip() != ""]
-                
-                if len(converted_df) < pre_filter_len:
-                    logs.append(f"  -> Filtered out {pre_filter_len - len(converted_df)} rows with missing PlayType")
-                
-                if not converted_df.empty:
-                    all_dfs.append(converted_df)
-                    logs.append(f"  -> Added {len(converted_df)} rows from sheet '{sheet_name}'")
+                if not valid_df.empty:
+                    # Add sheet name as team identifier
+                    valid_df["Team"] = sheet_name
+                    all_dfs.append(valid_df)
+                    logs.append(f"  -> Added {len(valid_df)} rows from sheet '{sheet_name}'")
                 else:
-                    logs.append(f"  -> Sheet result is empty after filtering")
+                    logs.append(f"  -> Sheet result is empty after validation")
                     
             except Exception as e:
                 logs.append(f"  -> Error processing sheet '{sheet_name}': {str(e)}")
                 import traceback
                 logs.append(traceback.format_exc())
         
+        rejected = {"count": 0, "summary": [], "skipped_sheets": skipped_sheets} if skipped_sheets else None
+        if rejected_rows:
+            rejected_rows = pd.concat(rejected_rows, ignore_index=True)
+            rejected_errors = pd.concat(rejected_errors, ignore_index=True)
+            path = validation.quarantine(rejected_rows, rejected_errors, str(getattr(file, "name", file)))
+            logs.append(f"Quarantined {len(rejected_rows)} rejected rows in {path}")
+            rejected = {"path": path, "count": len(rejected_rows), "skipped_sheets": skipped_sheets,
+                        "summary": validation.summarize(rejected_errors),
+                        "report": validation.error_report(rejected_rows, rejected_errors)}
+        
         if not all_dfs:
             logs.append("No valid data found in any sheet")
             return None, logs
         
         # Combine all sheets
-        combined_df = pd.concat(all_dfs, ignore_index=True)
+        with span("excel.concat"):
+            combined_df = pd.concat(all_dfs, ignore_index=True)
         logs.append(f"Total combined rows: {len(combined_df)}")
+        # Rejected rows (quarantine file, summary, per-row report) for the upload screen
+        combined_df.attrs["rejected"] = rejected
+        # Mapping plan chosen per sheet, for the debug view
+        combined_df.attrs["mapping_plans"] = plans_used
         
         return combined_df, logs
         
@@ -267,51 +201,802 @@ def load_excel(file) -> tuple[Optional[pd.DataFrame], list[str]]:
         logs.append(traceback.format_exc())
         return None, logs
 
-def get_database() -> pd.DataFrame:
+# --- versions (see src/versions.py) ---
+def _count_rows(path: str) -> int:
+    return len(pd.read_csv(path, usecols=[0], on_bad_lines='skip'))
+
+@contextmanager
+def _writing():
+    """Exclusive access for a mutation: against this process's threads and other processes."""
+    with _write_lock, _file_lock:
+        yield
+
+def _live_file_matches(manifest: Optional[dict]) -> bool:
+    """True if the CSV on disk is the one (and the size) the manifest last wrote."""
+    if manifest is None:
+        return False
+    if manifest["live_file"] is None:
+        return not os.path.exists(DATA_FILE_PATH)
+    return os.path.exists(DATA_FILE_PATH) and os.path.getsize(DATA_FILE_PATH) == manifest["live_size"]
+
+def _load_manifest() -> dict:
+    """
+    Returns the version manifest. A CSV without a manifest (older installs)
+    or changed outside the app becomes a new version of its own.
+    """
+    manifest = versions.load_manifest(VERSIONS_PATH)
+    if _live_file_matches(manifest):
+        return manifest
+    with _writing():
+        # A writer (this process or another) may have been between its append and the manifest update
+        manifest = versions.load_manifest(VERSIONS_PATH)
+        if _live_file_matches(manifest):
+            return manifest
+        note = "外部で変更されたCSV" if manifest is not None else "既存のデータ"
+        manifest = manifest or versions.empty_manifest()
+        if manifest["live_file"] is not None:
+            # The versions stored in the live file no longer hold their rows
+            versions.drop_file(manifest, manifest["live_file"])
+            manifest["live_file"], manifest["live_size"] = None, 0
+        if os.path.exists(DATA_FILE_PATH):
+            file_id = versions.new_file_id(manifest)
+            size = os.path.getsize(DATA_FILE_PATH)
+            versions.add_version(manifest, file_id, _count_rows(DATA_FILE_PATH), size, note)
+            manifest["live_file"], manifest["live_size"] = file_id, size
+        os.makedirs(os.path.dirname(VERSIONS_PATH), exist_ok=True)
+        versions.save_manifest(VERSIONS_PATH, manifest)
+        _drop_derived_sidecars()
+        return manifest
+
+def _version_path(manifest: dict, version: dict) -> Optional[str]:
+    if version["file"] is None:
+        return None
+    if version["file"] == manifest["live_file"]:
+        return DATA_FILE_PATH
+    return os.path.join(VERSIONS_DIR, f"{version['file']}.csv")
+
+def _current_rows() -> int:
+    """Number of rows in the current version (readers stop there)."""
+    return versions.current(_load_manifest())["rows"]
+
+def _retire_live_file(manifest: dict):
+    """Moves the live CSV to VERSIONS_DIR if a kept version still reads it, else deletes it."""
+    live = manifest["live_file"]
+    if live is None:
+        return
+    if os.path.exists(DATA_FILE_PATH):
+        if live in versions.referenced_files(manifest):
+            os.makedirs(VERSIONS_DIR, exist_ok=True)
+            os.replace(DATA_FILE_PATH, os.path.join(VERSIONS_DIR, f"{live}.csv"))
+        else:
+            os.remove(DATA_FILE_PATH)
+    manifest["live_file"], manifest["live_size"] = None, 0
+
+def _start_live_file(manifest: dict, version: dict):
+    """
+    Copy-on-write: writes the rows of version into a new live CSV (STANDARD_COLUMNS
+    layout) that the next write appends to. Versions in the old file keep it.
+    A version already in the current layout is copied byte for byte.
+    """
+    same_layout = version["rows"] > 0 and _read_header(_version_path(manifest, version)) == STANDARD_COLUMNS
+    current_df = None if same_layout or version["rows"] == 0 else get_database()
+    _retire_live_file(manifest)
+    source = _version_path(manifest, version)
+
+    file_id = versions.new_file_id(manifest)
+    tmp_path = DATA_FILE_PATH + ".tmp"
+    with span("db.copy_on_write"):
+        if same_layout:
+            with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+                _copy_bytes(src, dst, version["size"])
+        else:
+            if current_df is None:
+                current_df = pd.DataFrame(columns=STANDARD_COLUMNS)
+            for col in STANDARD_COLUMNS:
+                if col not in current_df.columns:
+                    current_df[col] = ""
+            current_df[STANDARD_COLUMNS].to_csv(tmp_path, index=False)
+    os.replace(tmp_path, DATA_FILE_PATH)
+    manifest["live_file"], manifest["live_size"] = file_id, os.path.getsize(DATA_FILE_PATH)
+
+def _copy_bytes(src, dst, size: int, chunk: int = 1 << 20):
+    while size > 0:
+        data = src.read(min(chunk, size))
+        if not data:
+            break
+        dst.write(data)
+        size -= len(data)
+
+def _commit_version(manifest: dict, rows: int, note: str, group: Optional[str] = None) -> dict:
+    """Registers the live CSV (first `rows` rows) as the new current version and removes unreferenced files."""
+    manifest["live_size"] = os.path.getsize(DATA_FILE_PATH)
+    version = versions.add_version(manifest, manifest["live_file"], rows, manifest["live_size"], note, group)
+    versions.save_manifest(VERSIONS_PATH, manifest)
+    if os.path.isdir(VERSIONS_DIR):
+        referenced = versions.referenced_files(manifest)
+        for name in os.listdir(VERSIONS_DIR):
+            if name.endswith(".csv") and name[:-4] not in referenced:
+                os.remove(os.path.join(VERSIONS_DIR, name))
+    return version
+
+def _drop_derived_sidecars():
+    for path in DERIVED_SIDECARS:
+        if os.path.isdir(path):
+            delta_store.drop(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+def get_data_version() -> int:
+    """
+    Id of the current database version. Every write creates a new id and
+    rollback/reset switch to another one, so it is the cache key for every
+    cache and index built on the data. Read from the manifest, so writes from
+    another process (e.g. import_nfl_data.py run directly) are noticed too.
+    """
+    return _load_manifest()["current"]
+
+def list_versions() -> list[dict]:
+    """Kept versions, newest first (id, rows, created, note, current)."""
+    return versions.history(_load_manifest())
+
+def rollback(version_id: int) -> bool:
+    """
+    Makes a kept version current again. Only the pointer moves (plus an O(1)
+    file rename if the version lives in an older file); derived sidecars
+    are rebuilt on the next read. Returns False for an unknown version.
+    """
+    return _commit_queue.run("call", lambda: _rollback(version_id))
+
+def _rollback(version_id: int) -> bool:
+    with _writing():
+        manifest = _load_manifest()
+        target = versions.find(manifest, version_id)
+        if target is None:
+            return False
+        if target["file"] is not None and target["file"] != manifest["live_file"]:
+            # Swap the target's file in as the live CSV
+            source = _version_path(manifest, target)
+            _retire_live_file(manifest)
+            os.replace(source, DATA_FILE_PATH)
+            manifest["live_file"], manifest["live_size"] = target["file"], os.path.getsize(DATA_FILE_PATH)
+        manifest["current"] = version_id
+        versions.save_manifest(VERSIONS_PATH, manifest)
+        _drop_derived_sidecars()
+    return True
+
+# Rows of the current version missing from the last read (malformed CSV lines skipped by pandas)
+_skipped_lines = {"version": None, "count": 0}
+
+def _note_skipped_lines(expected: int, read: int):
+    _skipped_lines.update(version=_load_manifest()["current"], count=max(0, expected - read))
+    if read < expected:
+        print(f"Warning: {expected - read} malformed lines in {DATA_FILE_PATH} were skipped")
+
+def get_read_problems() -> dict:
+    """
+    Malformed lines of the database CSV: how many rows the last read of the
+    current version was missing and the first offending line numbers.
+    Empty when the last read was complete.
+    """
+    if not _skipped_lines["count"] or _skipped_lines["version"] != get_data_version():
+        return {}
+    return {"count": _skipped_lines["count"], "lines": find_malformed_lines()}
+
+def find_malformed_lines(limit: int = 20) -> list[int]:
+    """Line numbers (1 = header) of the database CSV whose field count differs from the header."""
+    found = []
+    with open(DATA_FILE_PATH, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        width = len(next(reader, []))
+        for row in reader:
+            if len(row) != width:
+                found.append(reader.line_num)
+                if len(found) >= limit:
+                    break
+    return found
+
+def get_database(columns: Optional[list] = None) -> pd.DataFrame:
     """
     Returns the current master dataset. 
     If not exists, returns an empty DataFrame with proper schema.
+    With columns, only those columns are parsed (e.g. PLAY_TABLE_COLUMNS);
+    the index is the row id either way.
+    Only the rows of the current version are read (see rollback()).
     """
-    if os.path.exists(DATA_FILE_PATH):
+    rows = _current_rows()
+    if rows and os.path.exists(DATA_FILE_PATH):
         try:
-            return pd.read_csv(DATA_FILE_PATH, on_bad_lines='skip')
+            header = _read_header(DATA_FILE_PATH)
+            if columns is not None and all(col in header for col in columns):
+                with span("db.read_columns"):
+                    df = pd.read_csv(
+                        DATA_FILE_PATH, usecols=columns, on_bad_lines='skip', nrows=rows,
+                        dtype={col: "category" for col in CATEGORY_COLUMNS if col in columns}
+                    )[columns]
+                _note_skipped_lines(rows, len(df))
+                return df
+            with span("db.read"):
+                df = pd.read_csv(DATA_FILE_PATH, on_bad_lines='skip', nrows=rows)
+            _note_skipped_lines(rows, len(df))
+            if any(col not in df.columns for col in enrich.DERIVED_COLUMNS):
+                # Written before the derived columns existed; stored on the next write
+                df = enrich.add_derived_columns(df)
+            df = _with_dimensions(df)
+            return df if columns is None else df[[col for col in columns if col in df.columns]]
         except Exception as e:
             print(f"Error reading database: {e}")
             pass
             
     # Return empty dataframe structure
-    return pd.DataFrame(columns=STANDARD_COLUMNS)
+    return pd.DataFrame(columns=STANDARD_COLUMNS if columns is None else columns)
 
-def update_database(new_df: pd.DataFrame) -> int:
+def get_rows(ids, columns: Optional[list] = None) -> pd.DataFrame:
     """
-    Appends new data to the master dataset and saves it.
-    Returns the number of rows added.
+    Reads only the rows with the given row ids (positions in the database),
+    optionally only some columns. Returned in the order of ids, indexed by id.
+    Used to fetch Detail and the other columns left out of the play table.
     """
-    current_df = get_database()
-    
-    # Ensure new_df has all standard columns
-    for col in STANDARD_COLUMNS:
+    ids = [int(i) for i in ids]
+    row_count = _current_rows()
+    if not ids or not row_count or not os.path.exists(DATA_FILE_PATH):
+        return pd.DataFrame(columns=columns or STANDARD_COLUMNS)
+    if columns is not None and all(col in STORE_COLUMNS for col in columns):
+        # Text columns: decompressed from the side store, no CSV scan
+        with span("text_store.get"):
+            return get_text_store().get_frame(ids, columns)
+    wanted = {i for i in ids if 0 <= i < row_count}
+    catalog = get_partition_catalog()
+    with span("db.read_rows"):
+        # Seek to the byte runs of the partition catalog; scan from the top only without one
+        rows = partitions.read_rows(DATA_FILE_PATH, catalog, list(wanted), _row_runs(catalog), usecols=columns) \
+            if catalog is not None else None
+        if rows is None:
+            rows = pd.read_csv(
+                DATA_FILE_PATH, usecols=columns, on_bad_lines='skip',
+                # Line 0 is the header; the scan stops after the last wanted row
+                skiprows=lambda line: line != 0 and line - 1 not in wanted,
+                nrows=len(wanted)
+            )
+            rows.index = sorted(wanted)[:len(rows)]
+    if any(col not in rows.columns for col in enrich.DERIVED_COLUMNS) and columns is None:
+        rows = _with_dimensions(enrich.add_derived_columns(rows))
+    return rows.reindex(ids)
+
+def _row_runs(catalog: dict):
+    """Runs of the catalog in id order, kept while the catalog is the current one."""
+    global _row_runs_cache
+    cached = _row_runs_cache
+    if cached is None or cached[0] is not catalog:
+        cached = (catalog, partitions.sorted_runs(catalog))
+        _row_runs_cache = cached
+    return cached[1]
+
+def iter_database(ids=None, columns: Optional[list] = None, chunk_rows: int = 20000):
+    """
+    Streams the current version in chunks of at most chunk_rows rows, indexed
+    by row id, so large exports never hold the whole table. With ids, only
+    those rows are yielded (in id order) and the scan stops after the last one.
+    """
+    row_count = _current_rows()
+    if not row_count or not os.path.exists(DATA_FILE_PATH):
+        return
+    wanted = None if ids is None else np.unique(np.asarray(ids, dtype=np.int64))
+    stop = row_count if wanted is None else min(row_count, int(wanted[-1]) + 1 if wanted.size else 0)
+    if stop == 0:
+        return
+    header = _read_header(DATA_FILE_PATH)
+    usecols = columns if columns is not None and all(col in header for col in columns) else None
+    first_id = 0
+    for chunk in pd.read_csv(DATA_FILE_PATH, usecols=usecols, on_bad_lines='skip', nrows=stop, chunksize=chunk_rows):
+        chunk.index = np.arange(first_id, first_id + len(chunk))
+        first_id += len(chunk)
+        if wanted is not None:
+            chunk = chunk[np.isin(chunk.index, wanted)]
+        if chunk.empty:
+            continue
+        if any(col not in chunk.columns for col in enrich.DERIVED_COLUMNS) and usecols is None:
+            chunk = enrich.add_derived_columns(chunk)
+        if usecols is None:
+            chunk = _with_dimensions(chunk)
+        yield chunk if columns is None else chunk[[col for col in columns if col in chunk.columns]]
+
+def _with_dimensions(df: pd.DataFrame) -> pd.DataFrame:
+    """Files written before a dimension (or Team) was stored read it as blank (stored on the next write)."""
+    for col in DIMENSION_COLUMNS + ["Team"]:
+        if col not in df.columns:
+            df[col] = ""
+    return df
+
+def get_details(ids) -> pd.Series:
+    """Detail text of the given row ids (in the order of ids)."""
+    return get_rows(ids, ["Detail"])["Detail"]
+
+def _read_header(path: str) -> list[str]:
+    """Returns the column names of an existing CSV (empty list if unreadable)."""
+    try:
+        return pd.read_csv(path, nrows=0).columns.tolist()
+    except Exception:
+        return []
+
+@timed("update_database")
+def update_database(new_df: pd.DataFrame, note: str = "", group: Optional[str] = None) -> int:
+    """
+    Appends new data to the master dataset and saves it as a new version.
+    Consecutive appends of one group (e.g. the chunks of an import job)
+    share a single history entry. Returns the number of rows added.
+    """
+    # Ensure new_df has all base columns, dimensions and the team
+    for col in BASE_COLUMNS + DIMENSION_COLUMNS + ["Team"]:
         if col not in new_df.columns:
             new_df[col] = ""
     
-    # Select only standard columns
-    new_df = new_df[STANDARD_COLUMNS]
+    # Derive numeric game-state columns once (in the caller's thread), then select only standard columns
+    rows = enrich.add_derived_columns(new_df)[STANDARD_COLUMNS]
     
-    # Concatenate
-    updated_df = pd.concat([current_df, new_df], ignore_index=True)
-    
-    # Save
-    updated_df.to_csv(DATA_FILE_PATH, index=False)
+    return _commit_queue.run("append", (rows, new_df, note, group))
+
+def _commit_appends(items: list) -> list[int]:
+    """
+    Group commit of queued appends [(rows, source df, note, group), ...]: one CSV
+    append, one new version and one update of each sidecar for all of them.
+    Returns the number of rows added per item.
+    """
+    rows = pd.concat([item[0] for item in items], ignore_index=True)
+    notes = [item[2] or f"{len(item[0])} 件追加" for item in items]
+    groups = {item[3] for item in items}
+    with _writing():
+        manifest = _load_manifest()
+        version = versions.current(manifest)
+        meta = _load_current_metadata()
+        first_id = version["rows"]
+        
+        os.makedirs(os.path.dirname(DATA_FILE_PATH), exist_ok=True)
+        with span("db.write"):
+            at_tip = (version["file"] is not None and version["file"] == manifest["live_file"]
+                      and version["size"] == manifest["live_size"])
+            if not at_tip or _read_header(DATA_FILE_PATH) != STANDARD_COLUMNS:
+                # Empty, rolled back or outdated layout: continue in a new file
+                _start_live_file(manifest, version)
+            # Append only the new rows: O(new rows) instead of rewriting the file.
+            # Rendered first, so the partition catalog gets their byte offsets.
+            offset = os.path.getsize(DATA_FILE_PATH)
+            data = rows.to_csv(header=False, index=False).encode("utf-8")
+            with open(DATA_FILE_PATH, "ab") as f:
+                f.write(data)
+            new_version = _commit_version(manifest, first_id + len(rows), " / ".join(notes),
+                                          groups.pop() if len(groups) == 1 else None)
+        
+        with span("db.metadata"):
+            for _, source, _, _ in items:
+                meta = metadata.add_rows(meta, source, new_version["size"])
+            meta["version"] = new_version["id"]
+            metadata.save_metadata(STATS_FILE_PATH, meta)
+        with span("db.text_index"):
+            _extend_text_index(first_id, rows["Detail"])
+        with span("db.player_stats"):
+            _extend_player_stats(first_id, rows)
+        with span("db.text_store"):
+            _extend_text_store(first_id, rows)
+        with span("db.partitions"):
+            _extend_partitions(manifest, first_id, offset, rows, data)
     
-    return len(new_df)
+    if len(items) > 1:
+        print(f"Group commit: {len(items)} appends, {len(rows)} rows")
+    return [len(item[0]) for item in items]
+
+# Single writer for every mutation (see src/commit_queue.py)
+_commit_queue = CommitQueue("database", _commit_appends)
+
+def get_commit_stats() -> dict:
+    """Writer queue counters (appends, group commits, largest group, pending, ...)."""
+    return _commit_queue.stats()
+
+@timed("backfill_derived_columns")
+def backfill_derived_columns() -> int:
+    """
+    Recomputes the derived columns of every stored row and writes them as a
+    new version in the current schema (the previous version stays available
+    for rollback). Outcome flags and players are extracted again (e.g. after
+    the patterns changed); game-state values already stored are kept.
+    Returns the number of rows processed.
+    """
+    return _commit_queue.run("call", _backfill_derived_columns)
+
+def _backfill_derived_columns() -> int:
+    with _writing():
+        manifest = _load_manifest()
+        version = versions.current(manifest)
+        if version["rows"] == 0:
+            return 0
+        # Row and partition counts do not change; only the size and version are updated afterwards
+        meta = _load_current_metadata()
+        with span("db.read"):
+            df = pd.read_csv(DATA_FILE_PATH, on_bad_lines='skip', nrows=version["rows"])
+        for col in BASE_COLUMNS + DIMENSION_COLUMNS:
+            if col not in df.columns:
+                df[col] = ""
+        df = enrich.add_derived_columns(df.drop(columns=enrich.FLAG_COLUMNS + enrich.PLAYER_COLUMNS, errors='ignore'))
+
+        tmp_path = DATA_FILE_PATH + ".tmp"
+        with span("db.write"):
+            df[STANDARD_COLUMNS].to_csv(tmp_path, index=False)
+            _retire_live_file(manifest)
+            os.replace(tmp_path, DATA_FILE_PATH)
+            manifest["live_file"] = versions.new_file_id(manifest)
+            new_version = _commit_version(manifest, len(df), "フラグ再計算")
+
+        meta["file_size"] = new_version["size"]
+        meta["version"] = new_version["id"]
+        metadata.save_metadata(STATS_FILE_PATH, meta)
+        # Players may have changed; the table is rebuilt on the next read
+        delta_store.drop(PLAYER_STATS_PATH)
+    print(f"Backfilled derived columns for {len(df)} rows")
+    return len(df)
+
+def reset_database() -> bool:
+    """
+    Switches to the empty version (0). Nothing is deleted: the previous
+    version stays in the history and can be restored with rollback().
+    Returns True if the database had rows.
+    """
+    return _commit_queue.run("call", _reset_database)
+
+def _reset_database() -> bool:
+    with _writing():
+        manifest = _load_manifest()
+        if versions.current(manifest)["rows"] == 0:
+            return False
+        manifest["current"] = 0
+        versions.save_manifest(VERSIONS_PATH, manifest)
+        _drop_derived_sidecars()
+    return True
+
+def filter_mask(df: pd.DataFrame, filters: Optional[dict] = None,
+                text_index: Optional[TextIndex] = None) -> Optional[np.ndarray]:
+    """Boolean mask of the rows of df matching filters (see get_page); None if nothing is filtered."""
+    mask = None
+    for col, value in (filters or {}).items():
+        if value is None or value == "":
+            continue
+        if col == "text":
+            cond = np.zeros(len(df), dtype=bool)
+            cond[search_positions(df, str(value), text_index)] = True
+        elif col not in df.columns:
+            continue
+        elif isinstance(value, tuple):
+            values = pd.to_numeric(df[col], errors='coerce')
+            cond = ((values >= value[0]) & (values <= value[1])).to_numpy()
+        else:
+            cond = (df[col].astype(str) == str(value)).to_numpy()
+        mask = cond if mask is None else mask & cond
+    return mask
+
+def get_page(df: pd.DataFrame, offset: int = 0, limit: int = 50, filters: Optional[dict] = None,
+             sort_by: Optional[str] = None, ascending: bool = True,
+             text_index: Optional[TextIndex] = None) -> tuple[pd.DataFrame, int]:
+    """
+    Returns one page of plays and the number of rows matching the filters.
+    Filtering and sorting happen here so that only `limit` rows reach the browser.
+    filters maps column -> value (equality), (min, max) tuple (inclusive range)
+    or, for the special key "text", a Detail search query (see text_index.search_positions).
+    """
+    if df.empty:
+        return df, 0
+
+    mask = filter_mask(df, filters, text_index)
+    matched = df if mask is None else df[mask]
+    total = len(matched)
+    offset = max(0, min(offset, total))
+    end = offset + max(0, limit)
+
+    if sort_by and sort_by in matched.columns:
+        values = matched[sort_by]
+        if pd.api.types.is_numeric_dtype(values) and not values.isna().any():
+            # Partial selection instead of a full sort (nsmallest/nlargest drop NaN)
+            pick = matched.nsmallest if ascending else matched.nlargest
+            page = pick(end, sort_by, keep="first").iloc[offset:end]
+        else:
+            page = matched.sort_values(sort_by, ascending=ascending, kind="stable").iloc[offset:end]
+    else:
+        page = matched.iloc[offset:end]
+
+    return page, total
+
+def _load_current_metadata() -> dict:
+    """
+    Returns the statistics sidecar of the current version, rebuilding it from
+    the database if it is missing or belongs to another version.
+    """
+    version = versions.current(_load_manifest())
+    if version["rows"] == 0:
+        return dict(metadata.empty_metadata(), version=version["id"])
+    meta = metadata.load_metadata(STATS_FILE_PATH)
+    if meta is None or meta.get("version") != version["id"]:
+        meta = metadata.build_metadata(get_database(), version["size"], os.path.getmtime(DATA_FILE_PATH))
+        meta["version"] = version["id"]
+        metadata.save_metadata(STATS_FILE_PATH, meta)
+    return meta
+
+def _extend_text_index(first_id: int, details: pd.Series):
+    """
+    Adds the descriptions of rows appended at play id first_id to the stored
+    text index. An index that does not end at first_id is dropped and
+    rebuilt on the next get_text_index().
+    """
+    index = TextIndex.load(TEXT_INDEX_PATH)
+    if index is not None and index.doc_count == first_id:
+        index.extend(details.tolist()).save(TEXT_INDEX_PATH)
+    elif os.path.exists(TEXT_INDEX_PATH):
+        os.remove(TEXT_INDEX_PATH)
+
+def get_text_index() -> TextIndex:
+    """
+    Returns the full-text index of Detail (play id = row position in the
+    database), building and storing it if it is missing or out of date.
+    """
+    row_count = _load_current_metadata()["row_count"]
+    with span("text_index.load"):
+        index = TextIndex.load(TEXT_INDEX_PATH)
+    if index is None or index.doc_count != row_count:
+        df = get_database(["Detail"])
+        with span("text_index.build"):
+            index = TextIndex.build(df["Detail"].tolist())
+        if os.path.exists(DATA_FILE_PATH):
+            index.save(TEXT_INDEX_PATH)
+    # Phrase checks read the candidate descriptions by row id
+    index.fetch_text = get_details
+    return index
+
+def _extend_player_stats(first_id: int, rows: pd.DataFrame):
+    """
+    Stores the player aggregate of rows appended at play id first_id as a
+    delta of the player table (the table itself is not read or rewritten).
+    A table that does not end at first_id is dropped and rebuilt on the
+    next get_player_stats().
+    """
+    if not player_stats.append_rows(PLAYER_STATS_PATH, first_id, rows):
+        delta_store.drop(PLAYER_STATS_PATH)
+
+def get_player_stats() -> pd.DataFrame:
+    """
+    Returns the per-player x situation table (see player_stats), building and
+    storing it if it is missing or out of date.
+    """
+    row_count = _load_current_metadata()["row_count"]
+    stored = player_stats.load_table(PLAYER_STATS_PATH, row_count)
+    if stored is not None:
+        return stored
+    df = get_database(["Down", "Distance", "FieldPosition", "YardsGained", "Success"] + enrich.PLAYER_COLUMNS)
+    with span("player_stats.build"):
+        table = player_stats.aggregate(df)
+    if os.path.exists(DATA_FILE_PATH):
+        player_stats.save_table(PLAYER_STATS_PATH, table, len(df))
+    return table
+
+def _extend_text_store(first_id: int, rows: pd.DataFrame):
+    """
+    Appends the text columns of rows added at play id first_id to the stored
+    text store. A store that does not end at first_id is dropped and rebuilt
+    on the next get_text_store().
+    """
+    global _text_store_cache
+    store = TextStore.load(TEXT_STORE_PATH)
+    if store is not None and store.row_count == first_id:
+        store.extend(rows).save(TEXT_STORE_PATH)
+    elif os.path.exists(TEXT_STORE_PATH):
+        os.remove(TEXT_STORE_PATH)
+    _text_store_cache = None
+
+def get_text_store() -> TextStore:
+    """
+    Returns the compressed store of Detail / RunCourse / PassCourse (see
+    text_store), building and storing it if it is missing or out of date.
+    Kept in memory per data version, so random reads do not reload the file.
+    """
+    global _text_store_cache
+    version = get_data_version()
+    if _text_store_cache is not None and _text_store_cache[0] == version:
+        return _text_store_cache[1]
+    row_count = _load_current_metadata()["row_count"]
+    with span("text_store.load"):
+        store = TextStore.load(TEXT_STORE_PATH)
+    if store is None or store.row_count != row_count:
+        df = get_database(STORE_COLUMNS)
+        with span("text_store.build"):
+            store = TextStore.build(df)
+        if os.path.exists(DATA_FILE_PATH):
+            store.save(TEXT_STORE_PATH)
+    _text_store_cache = (version, store)
+    return store
+
+def _extend_partitions(manifest: dict, first_id: int, offset: int, rows: pd.DataFrame, data: bytes):
+    """
+    Stores the catalog of rows appended at play id first_id (their CSV bytes
+    written at offset) as a delta of the partition catalog (the catalog
+    itself is not read or rewritten). A catalog of another file or that does
+    not end there is dropped and rebuilt on the next read.
+    """
+    global _partition_cache
+    _partition_cache = None
+    try:
+        if partitions.append_rows(PARTITIONS_PATH, manifest["live_file"], first_id, offset, rows, data):
+            return
+    except ValueError as e:
+        print(f"Partition catalog dropped: {e}")
+    delta_store.drop(PARTITIONS_PATH)
+
+def get_partition_catalog() -> Optional[dict]:
+    """
+    Returns the team / season partition catalog of the current version (see
+    partitions.py), building and storing it if it is missing or out of date.
+    None if the CSV cannot be mapped (malformed lines); callers then scan.
+    """
+    global _partition_cache
+    manifest = _load_manifest()
+    version = versions.current(manifest)
+    cached = _partition_cache
+    if cached is not None and cached[0] == version["id"]:
+        return cached[1]
+    if version["rows"] == 0:
+        catalog = partitions.empty_catalog(None, 0)
+    else:
+        catalog = partitions.load_catalog(PARTITIONS_PATH, manifest["live_file"], version["rows"])
+        if catalog is None:
+            with span("partitions.build"):
+                with open(DATA_FILE_PATH, "rb") as f:
+                    data = f.read(version["size"])
+                rows = get_database(["Date", "Team", "Detail", "Down", "Distance", "YardsGained", "Success"])
+                try:
+                    catalog = partitions.build_catalog(manifest["live_file"], data, rows)
+                except ValueError as e:
+                    print(f"Partition catalog not built: {e}")
+                    catalog = None
+            if catalog is not None:
+                partitions.save_catalog(PARTITIONS_PATH, catalog)
+    _partition_cache = (version["id"], catalog)
+    return catalog
+
+def list_partitions() -> pd.DataFrame:
+    """One line per team / season partition (plays, dates, 3rd-down success rate)."""
+    catalog = get_partition_catalog()
+    return partitions.summary_frame(catalog if catalog is not None else partitions.empty_catalog(None, 0))
+
+def _read_partition_table(catalog: dict, keys: list) -> Optional[pd.DataFrame]:
+    """PARTITION_TABLE_COLUMNS of the rows of the given partitions, read by byte range."""
+    if not keys:
+        return pd.DataFrame(columns=PARTITION_TABLE_COLUMNS)
+    header = _read_header(DATA_FILE_PATH)
+    if all(col in header for col in PARTITION_TABLE_COLUMNS):
+        df = partitions.read_partitions(
+            DATA_FILE_PATH, catalog, keys, usecols=PARTITION_TABLE_COLUMNS,
+            dtype={col: "category" for col in CATEGORY_COLUMNS}
+        )
+        return None if df is None else df[PARTITION_TABLE_COLUMNS]
+    df = partitions.read_partitions(DATA_FILE_PATH, catalog, keys)
+    if df is None:
+        return None
+    if any(col not in df.columns for col in enrich.DERIVED_COLUMNS):
+        df = enrich.add_derived_columns(df)
+    return _with_dimensions(df)[PARTITION_TABLE_COLUMNS]
+
+def get_partition_store(team: Optional[str] = None, season: Optional[str] = None,
+                        date_from: Optional[str] = None, date_to: Optional[str] = None) -> tuple:
+    """
+    Returns (table, PlayIndex) like get_play_store(), restricted to one team,
+    season and/or date range ("YYYY-MM-DD", inclusive). Only the partitions
+    that can match are read from the CSV (see partitions.py); the table is
+    indexed by play id and keeps Detail. A few recent scopes are kept in
+    memory per data version. Treat as read-only.
+    """
+    version = get_data_version()
+    key = (version, team, season, date_from, date_to)
+    with _partition_lock:
+        store = _partition_stores.get(key)
+        if store is not None:
+            _partition_stores.move_to_end(key)
+            return store
+        catalog = get_partition_catalog()
+        table = None
+        if catalog is not None:
+            selected = partitions.select(catalog, team, season, date_from, date_to)
+            with span("partitions.read"):
+                table = _read_partition_table(catalog, selected)
+        if table is None:
+            # No usable catalog: full read, filtered by the same keys
+            df = get_database(PARTITION_TABLE_COLUMNS + ["Team"])
+            parts = pd.Series(partitions.row_keys(df), index=df.index).str.rsplit("|", n=1, expand=True)
+            mask = pd.Series(True, index=df.index)
+            if team is not None:
+                mask &= parts[0] == team
+            if season is not None:
+                mask &= parts[1] == str(season)
+            table = df.loc[mask, [col for col in PARTITION_TABLE_COLUMNS if col in df.columns]]
+        if date_from is not None or date_to is not None:
+            dates = pd.to_datetime(table["Date"], errors='coerce')
+            mask = dates.notna()
+            if date_from is not None:
+                mask &= dates >= pd.Timestamp(date_from)
+            if date_to is not None:
+                mask &= dates <= pd.Timestamp(date_to)
+            table = table[mask]
+        with span("play_index.build"):
+            store = (table, PlayIndex(table))
+        _partition_stores[key] = store
+        while len(_partition_stores) > MAX_PARTITION_STORES:
+            _partition_stores.popitem(last=False)
+        return store
+
+def _snapshot_key() -> dict:
+    """What a snapshot must have been built from to be reused."""
+    manifest = _load_manifest()
+    return {"format": SNAPSHOT_FORMAT, "columns": PLAY_TABLE_COLUMNS,
+            "version": manifest["current"], "live_file": manifest["live_file"]}
+
+def _load_snapshot(key: dict) -> Optional[tuple]:
+    """Returns (play table, PlayIndex) from the snapshot if it matches key, else None."""
+    if not os.path.exists(SNAPSHOT_PATH):
+        return None
+    try:
+        with open(SNAPSHOT_PATH, "rb") as f:
+            stored_key = pickle.load(f)
+            if stored_key != key:
+                return None
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Error reading snapshot: {e}")
+        return None
+
+def _save_snapshot(key: dict, store: tuple):
+    """Writes the key, then the store, to one pickle file (atomic)."""
+    tmp_path = SNAPSHOT_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, SNAPSHOT_PATH)
+
+def get_play_store() -> tuple:
+    """
+    Returns (play table, PlayIndex): PLAY_TABLE_COLUMNS of every play and the
+    situation index over them. Loaded from a binary snapshot next to the CSV
+    when it matches the database, so a restart does not pay for the CSV parse
+    and the index build; otherwise built and snapshotted for the next start.
+    Kept in memory per data version. Treat as read-only.
+    """
+    global _play_store_cache
+    with _play_store_lock:
+        version = get_data_version()
+        if _play_store_cache is not None and _play_store_cache[0] == version:
+            return _play_store_cache[1]
+        key = _snapshot_key()
+        with span("snapshot.load"):
+            store = _load_snapshot(key)
+        if store is None:
+            table = get_database(PLAY_TABLE_COLUMNS)
+            with span("play_index.build"):
+                store = (table, PlayIndex(table))
+            if os.path.exists(DATA_FILE_PATH):
+                with span("snapshot.save"):
+                    _save_snapshot(key, store)
+        _play_store_cache = (version, store)
+        return store
+
+def warm_up():
+    """Loads the play store and the text store into memory (run in the background at boot)."""
+    get_play_store()
+    get_text_store()
 
 def get_statistics():
     """
     Returns a dictionary with basic stats of the database.
+    Read from the statistics sidecar, so it does not load the database.
     """
-    df = get_database()
+    meta = _load_current_metadata()
+    partitions = meta["partitions"]
     return {
-        "total_games": df["Date"].nunique() if not df.empty else 0,
-        "total_plays": len(df),
-        "last_update": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+        "total_games": len(partitions.get("Date", {})),
+        "total_plays": meta["row_count"],
+        "last_update": meta["last_modified"] or "-",
+        "teams": partitions.get("Team", {}),
+        "seasons": partitions.get("Season", {}),
+        "partitions": partitions
     }
@@ -0,0 +1,115 @@
+"""
+Sidecars kept as a compacted base plus one delta file per append.
+
+Derived tables that grow with every append (per-player aggregates, the
+partition catalog) are stored in a directory next to the CSV:
+    base.<tag>.<count>.json           the table for plays [0, count)
+    delta.<tag>.<first>.<stop>.json   what plays [first, stop) add
+A commit writes one delta file, so its cost is O(new rows) however large
+the table has grown, and the row ranges are in the file names: checking
+that the stored table ends where an append starts is a directory listing.
+Readers merge the base with the chain of deltas and, once the chain is
+longer than MAX_DELTAS, write a new base (compaction happens on the read
+side, outside the writer lock). tag ties the files to one CSV file where
+the payload depends on it (byte offsets); "" otherwise.
+"""
+
+import json
+import os
+import re
+import shutil
+from typing import Any, List, Optional, Tuple
+
+# Deltas merged at read time before the reader writes a new base
+MAX_DELTAS = 32
+
+_NAME_RE = re.compile(r"^(base|delta)\.([\w-]*)\.(\d+)(?:\.(\d+))?\.json$")
+
+
+def _entries(directory: str) -> List[Tuple[str, str, int, int, str]]:
+    """(kind, tag, first, stop, file name) of the stored files; a base covers [0, count)."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    entries = []
+    for name in names:
+        match = _NAME_RE.match(name)
+        if match is None:
+            continue
+        kind, tag, first, stop = match.groups()
+        if kind == "base":
+            entries.append((kind, tag, 0, int(first), name))
+        elif stop is not None:
+            entries.append((kind, tag, int(first), int(stop), name))
+    return entries
+
+
+def _write(path: str, payload: Any):
+    """Writes JSON atomically (temp file + rename), so readers never see half a file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, default=lambda value: value.item())
+    os.replace(tmp_path, path)
+
+
+def _read(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ends_at(directory: str, tag: str, row_count: int) -> bool:
+    """Whether the stored files of tag reach row_count (0 always does: nothing to continue)."""
+    return row_count == 0 or any(entry[1] == tag and entry[3] == row_count for entry in _entries(directory))
+
+
+def append(directory: str, tag: str, first: int, stop: int, payload: Any):
+    """Stores what plays [first, stop) add."""
+    os.makedirs(directory, exist_ok=True)
+    _write(os.path.join(directory, f"delta.{tag}.{first}.{stop}.json"), payload)
+
+
+def load(directory: str, tag: str, row_count: int) -> Optional[Tuple[Any, List[Any]]]:
+    """
+    (base payload or None for an empty start, delta payloads in order) that
+    together cover plays [0, row_count) for tag; None when the stored files
+    do not (missing, another file, a gap) or one disappeared while reading.
+    """
+    entries = [entry for entry in _entries(directory) if entry[1] == tag]
+    deltas = {first: (stop, name) for kind, _, first, stop, name in entries if kind == "delta"}
+    starts = sorted(((stop, name) for kind, _, _, stop, name in entries if kind == "base" and stop <= row_count),
+                    reverse=True) + [(0, None)]
+    for count, base_name in starts:
+        chain, position = [], count
+        while position < row_count and position in deltas:
+            position, name = deltas[position]
+            chain.append(name)
+        if position != row_count:
+            continue
+        try:
+            base = _read(os.path.join(directory, base_name)) if base_name else None
+            return base, [_read(os.path.join(directory, name)) for name in chain]
+        except (OSError, ValueError):
+            return None
+    return None
+
+
+def save_base(directory: str, tag: str, row_count: int, payload: Any):
+    """
+    Stores payload as the base for plays [0, row_count) and removes the files
+    it replaces (older bases and deltas ending there, files of other tags).
+    Deltas past row_count, e.g. written meanwhile, are kept.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"base.{tag}.{row_count}.json"
+    _write(os.path.join(directory, name), payload)
+    for _, entry_tag, _, stop, entry_name in _entries(directory):
+        if entry_name != name and (entry_tag != tag or stop <= row_count):
+            try:
+                os.remove(os.path.join(directory, entry_name))
+            except OSError:
+                pass
+
+
+def drop(directory: str):
+    shutil.rmtree(directory, ignore_errors=True)
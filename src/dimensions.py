@@ -0,0 +1,55 @@
+"""
+Scouting dimensions: extra categorical columns kept with every play.
+
+Each entry of DIMENSIONS declares one column (hash mark, formation, ...):
+the header keywords that map an uploaded column onto it, an optional token
+table normalizing its values, and a label for the UI. A declared dimension
+is stored in the database CSV, kept in the play table as a categorical,
+indexed by PlayIndex and accepted as a situation key by analyze_situation,
+so a query on it takes the same index path as Down. Adding a dimension is
+adding an entry here (older files get it as a blank column on the next
+write).
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class Dimension(NamedTuple):
+    column: str
+    label: str
+    # Header keywords for uploaded sheets (first column containing one wins)
+    keywords: Tuple[str, ...]
+    # Lower-case spelling -> stored value; None keeps values as written
+    tokens: Optional[Dict[str, str]] = None
+
+
+HASH_TOKENS = {
+    "l": "L", "left": "L", "lt": "L", "左": "L",
+    "m": "M", "middle": "M", "mid": "M", "c": "M", "center": "M", "中": "M", "中央": "M",
+    "r": "R", "right": "R", "rt": "R", "右": "R",
+}
+
+DIMENSIONS: List[Dimension] = [
+    Dimension("Hash", "ハッシュ", ("hash", "ハッシュ"), HASH_TOKENS),
+    Dimension("Formation", "フォーメーション", ("formation", "フォーメーション")),
+]
+
+DIMENSION_COLUMNS = [dimension.column for dimension in DIMENSIONS]
+
+
+def get(column: str) -> Optional[Dimension]:
+    for dimension in DIMENSIONS:
+        if dimension.column == column:
+            return dimension
+    return None
+
+
+def normalize_value(column: str, value) -> Optional[str]:
+    """A situation value as stored (e.g. hash 'left' -> 'L'); None for blank."""
+    if value is None or str(value).strip() == "":
+        return None
+    value = str(value).strip()
+    dimension = get(column)
+    if dimension is not None and dimension.tokens:
+        return dimension.tokens.get(value.lower(), value)
+    return value
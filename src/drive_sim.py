@@ -0,0 +1,217 @@
+"""
+Monte Carlo drive simulator over the empirical play distribution.
+
+Average yards hide the spread: a call that gains 4 yards every time and one
+that gains 0 or 12 have the same average but convert 3rd and 5 very
+differently. simulate_situation() plays many drives from the current
+situation for every candidate call and counts how they end:
+- first play: an outcome (yards gained, turnover flag) drawn from the past
+  plays of that call in the situation (the rows analyze_situation groups)
+- following plays: drawn from all run / pass plays of the same down,
+  distance bucket and field zone (down + distance, then down alone, when
+  fewer than MIN_POOL_PLAYS plays are known)
+- 4th down after the first play: a field goal attempt in range
+  (FieldPosition >= FG_MIN_FIELD_POSITION), a punt otherwise
+
+All drives advance together as NumPy arrays (one step = one play of every
+drive still alive), so 100k drives take a few dozen vectorized steps. The
+clock, penalties and missed field goals are not modelled.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.analyzer import get_strategy_name, play_families, situation_plays, strategy_names
+from src.play_index import PlayIndex
+from src.profiling import timed
+from src.text_index import TextIndex
+
+DRIVES_PER_CALL = 10_000
+MAX_CALLS = 10
+# Calls seen fewer times in the situation are not simulated (too few outcomes to draw from)
+MIN_CALL_PLAYS = 3
+MIN_POOL_PLAYS = 30
+MAX_PLAYS = 40
+# Field goal range: a kick of 54 yards or shorter (line of scrimmage + 17)
+FG_MIN_FIELD_POSITION = 63
+DEFAULT_SEED = 0
+
+# Drive results (0: still going after MAX_PLAYS)
+TOUCHDOWN, FIELD_GOAL, PUNT, TURNOVER, DOWNS, SAFETY = range(1, 7)
+_RESULTS = 7
+POINTS = {TOUCHDOWN: 7, FIELD_GOAL: 3, SAFETY: -2}
+
+# Pool table: 4 downs x 3 distance buckets x 3 field zones (see analyzer.situation_bucket)
+_DOWNS, _BUCKETS, _ZONES = 4, 3, 3
+
+
+def _distance_codes(distance: np.ndarray) -> np.ndarray:
+    """0 short (1-3), 1 medium (4-7), 2 long (8+), 3 unknown."""
+    return np.select([distance <= 3, distance <= 7, distance > 7], [0, 1, 2], 3)
+
+
+def _zone_codes(field_pos: np.ndarray) -> np.ndarray:
+    """0 own (0-19), 1 mid, 2 redzone (80-100), 3 unknown."""
+    return np.select([field_pos < 20, field_pos >= 80, ~np.isnan(field_pos)], [0, 2, 1], 3)
+
+
+def _outcomes(plays: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """(yards gained, turnover flag) of plays; a blank gain counts as 0."""
+    yards = pd.to_numeric(plays["YardsGained"], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    if "is_turnover" in plays.columns:
+        turnover = pd.to_numeric(plays["is_turnover"], errors='coerce').fillna(0).to_numpy() > 0
+    else:
+        turnover = np.zeros(len(plays), dtype=bool)
+    return yards, turnover
+
+
+class DriveModel:
+    """
+    Outcomes of all run / pass plays of a table, sorted by (down, distance
+    bucket, field zone) so that every bucket, and every coarser fallback, is
+    one contiguous slice. Built once per data version (and per scope).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        plays = df
+        if not df.empty:
+            # Labels of the distinct play types only (the course does not change the family)
+            types = df["PlayType"].astype(str)
+            unique = pd.Series(types.unique())
+            families = pd.Series(play_families(unique.map(lambda t: get_strategy_name({"PlayType": t}))).to_numpy(),
+                                 index=unique.to_numpy())
+            plays = df[(types.map(families) != "other").to_numpy()]
+        down = pd.to_numeric(plays["Down"], errors='coerce').to_numpy(dtype=np.float64)
+        distance = pd.to_numeric(plays["Distance"], errors='coerce').to_numpy(dtype=np.float64)
+        field_pos = pd.to_numeric(plays["FieldPosition"], errors='coerce').to_numpy(dtype=np.float64)
+        down_codes = np.where((down >= 1) & (down <= 4), np.nan_to_num(down) - 1, _DOWNS).astype(np.int64)
+        keys = down_codes * 16 + _distance_codes(distance) * 4 + _zone_codes(field_pos)
+        order = np.argsort(keys, kind="stable")
+        yards, turnover = _outcomes(plays)
+        self.yards, self.turnover = yards[order], turnover[order]
+        self.size = len(order)
+
+        # Slice of each bucket: the bucket itself, else down + distance, else the down, else everything
+        keys = keys[order]
+        self._start = np.zeros(_DOWNS * _BUCKETS * _ZONES, dtype=np.int64)
+        self._count = np.zeros(_DOWNS * _BUCKETS * _ZONES, dtype=np.int64)
+        for down_code in range(_DOWNS):
+            for bucket in range(_BUCKETS):
+                for zone in range(_ZONES):
+                    slot = (down_code * _BUCKETS + bucket) * _ZONES + zone
+                    for low, width in ((down_code * 16 + bucket * 4 + zone, 1), (down_code * 16 + bucket * 4, 4),
+                                       (down_code * 16, 16), (0, 16 * _DOWNS)):
+                        start, stop = np.searchsorted(keys, [low, low + width])
+                        if stop - start >= MIN_POOL_PLAYS:
+                            break
+                    self._start[slot], self._count[slot] = start, stop - start
+
+    def _draw(self, rng: np.random.Generator, down: np.ndarray, to_go: np.ndarray,
+              field_pos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        slots = ((down - 1) * _BUCKETS + _distance_codes(to_go)) * _ZONES + _zone_codes(field_pos)
+        picks = self._start[slots] + (rng.random(len(slots)) * self._count[slots]).astype(np.int64)
+        return self.yards[picks], self.turnover[picks]
+
+    def simulate(self, down: int, distance: float, field_pos: float,
+                 calls: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                 drives_per_call: int = DRIVES_PER_CALL, seed: int = DEFAULT_SEED) -> Dict[str, Dict[str, float]]:
+        """
+        Plays drives_per_call drives per call from (down, distance, field
+        position). calls maps a call to the (yards, turnover) outcomes its
+        first play is drawn from. Returns per call the share of drives that
+        convert the current series (first down or TD), end in a touchdown,
+        field goal, punt or turnover (turnover on downs included) and the
+        expected points (TD 7, FG 3, safety -2).
+        """
+        names = list(calls)
+        if not names or self.size == 0:
+            return {}
+        rng = np.random.default_rng(seed)
+        n = drives_per_call * len(names)
+        call_of = np.repeat(np.arange(len(names)), drives_per_call)
+
+        # First play: one outcome of the call, for every drive
+        sizes = np.array([len(calls[name][0]) for name in names], dtype=np.int64)
+        starts = np.r_[0, np.cumsum(sizes)[:-1]]
+        picks = starts[call_of] + (rng.random(n) * sizes[call_of]).astype(np.int64)
+        yards = np.concatenate([calls[name][0] for name in names])[picks]
+        turnover = np.concatenate([calls[name][1] for name in names])[picks]
+
+        pos = np.full(n, float(field_pos))
+        downs = np.full(n, int(down), dtype=np.int64)
+        to_go = np.full(n, float(distance))
+        result = np.zeros(n, dtype=np.int64)
+        first_series = np.ones(n, dtype=bool)
+        converted = np.zeros(n, dtype=bool)
+        live = np.arange(n)
+
+        for step in range(MAX_PLAYS):
+            if step:
+                fourth = downs[live] == 4
+                if fourth.any():
+                    kickers = live[fourth]
+                    result[kickers] = np.where(pos[kickers] >= FG_MIN_FIELD_POSITION, FIELD_GOAL, PUNT)
+                    live = live[~fourth]
+                if not live.size:
+                    break
+                yards, turnover = self._draw(rng, downs[live], to_go[live], pos[live])
+
+            new_pos = pos[live] + yards
+            touchdown = ~turnover & (new_pos >= 100)
+            safety = ~turnover & (new_pos <= 0)
+            gained = ~turnover & ~touchdown & ~safety & (yards >= to_go[live])
+            on_downs = ~turnover & ~touchdown & ~safety & ~gained & (downs[live] == 4)
+            result[live[turnover]] = TURNOVER
+            result[live[touchdown]] = TOUCHDOWN
+            result[live[safety]] = SAFETY
+            result[live[on_downs]] = DOWNS
+            moved = live[touchdown | gained]
+            converted[moved] |= first_series[moved]
+            first_series[live[gained]] = False
+
+            pos[live] = new_pos
+            to_go[live] = np.where(gained, np.minimum(10, 100 - new_pos), to_go[live] - yards)
+            downs[live] = np.where(gained, 1, downs[live] + 1)
+            live = live[~(turnover | touchdown | safety | on_downs)]
+            if not live.size:
+                break
+
+        counts = np.bincount(call_of * _RESULTS + result, minlength=len(names) * _RESULTS) \
+            .reshape(len(names), _RESULTS) / drives_per_call
+        first_downs = np.bincount(call_of, weights=converted, minlength=len(names)) / drives_per_call
+        points = sum(counts[:, code] * value for code, value in POINTS.items())
+        return {name: {
+            "first_down": float(first_downs[i]), "touchdown": float(counts[i, TOUCHDOWN]),
+            "field_goal": float(counts[i, FIELD_GOAL]), "punt": float(counts[i, PUNT]),
+            "turnover": float(counts[i, TURNOVER] + counts[i, DOWNS]), "expected_points": float(points[i]),
+        } for i, name in enumerate(names)}
+
+
+@timed("simulate_situation")
+def simulate_situation(df: pd.DataFrame, current_situation: Dict[str, Any], model: DriveModel,
+                       index: PlayIndex = None, text_index: TextIndex = None,
+                       drives_per_call: int = DRIVES_PER_CALL, seed: int = DEFAULT_SEED) -> List[Dict[str, Any]]:
+    """
+    Simulates drives for the run / pass calls of a situation (the plays
+    analyze_situation groups, at least MIN_CALL_PLAYS each, the MAX_CALLS
+    most frequent). model should be built from df. Needs Down, Distance and
+    FieldPosition; returns [] without them. Best expected points first.
+    """
+    down, distance, field_pos = (current_situation.get(key) for key in ("Down", "Distance", "FieldPosition"))
+    if down is None or distance is None or field_pos is None or model.size == 0:
+        return []
+    plays = situation_plays(df, current_situation, index, text_index)
+    if plays.empty:
+        return []
+    strategies = strategy_names(plays)
+    scrimmage = (play_families(strategies) != "other").to_numpy()
+    counts = strategies[scrimmage].value_counts()
+    counts = counts[counts >= MIN_CALL_PLAYS].head(MAX_CALLS)
+
+    calls = {name: _outcomes(plays[(strategies == name).to_numpy()]) for name in counts.index}
+    results = model.simulate(down, distance, field_pos, calls, drives_per_call, seed)
+    rows = [{"play_type": name, "sample_size": int(counts[name]), "drives": drives_per_call, **stats}
+            for name, stats in results.items()]
+    return sorted(rows, key=lambda row: (-row["expected_points"], -row["first_down"]))
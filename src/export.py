@@ -0,0 +1,189 @@
+"""
+Bulk export of plays and analysis tables to CSV, Excel and Parquet.
+
+Writers take an iterable of DataFrame chunks and stream them to a
+spooled temporary file (in memory while small, on disk beyond
+SPOOL_BYTES), so an export of a whole season holds one chunk at a time:
+- CSV: chunk by chunk, UTF-8 with BOM so Excel opens Japanese text correctly
+- Excel: openpyxl write-only workbook (rows are written, not kept as cells)
+- Parquet: one row group per chunk (pyarrow; optional, see available_formats)
+
+export_plays() streams the plays matching the data browser filters from the
+database CSV; export_frame() exports any table already in memory
+(suggestions, player tables).
+"""
+
+import importlib.util
+import io
+import tempfile
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data_manager import STANDARD_COLUMNS, filter_mask, iter_database
+from src.text_index import TextIndex
+
+CHUNK_ROWS = 20000
+SPOOL_BYTES = 16 * 1024 * 1024
+# Excel sheet limit, minus the header row
+EXCEL_MAX_ROWS = 1048575
+
+# format -> (label, extension, MIME type)
+FORMATS = {
+    "csv": ("CSV", "csv", "text/csv"),
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats() -> List[str]:
+    """Formats whose writer can be imported here (Parquet needs pyarrow)."""
+    return [fmt for fmt in FORMATS if fmt != "parquet" or importlib.util.find_spec("pyarrow") is not None]
+
+
+def write_chunks(chunks: Iterable[pd.DataFrame], fmt: str, sheet_name: str = "data") -> tempfile.SpooledTemporaryFile:
+    """Writes the chunks (same columns) in fmt; returns the file rewound to the start."""
+    writer = {"csv": _write_csv, "xlsx": _write_xlsx, "parquet": _write_parquet}.get(fmt)
+    if writer is None:
+        raise ValueError(f"unknown export format: {fmt}")
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    writer(chunks, out, sheet_name)
+    out.seek(0)
+    return out
+
+
+def _write_csv(chunks, out, sheet_name):
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(text, header=header, index=False)
+        header = False
+    text.flush()
+    text.detach()
+
+
+def _write_xlsx(chunks, out, sheet_name):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name[:31])
+    written = 0
+    for chunk in chunks:
+        if written == 0:
+            sheet.append([str(col) for col in chunk.columns])
+        written += len(chunk)
+        if written > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excelの上限 ({EXCEL_MAX_ROWS} 行) を超えています。CSVかParquetを使ってください。")
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append([_excel_value(sheet, value, WriteOnlyCell) for value in row])
+    workbook.save(out)
+
+
+def _excel_value(sheet, value, cell_type):
+    """Text starting with "=" stays text (openpyxl would store it as a formula)."""
+    if isinstance(value, str) and value.startswith("="):
+        cell = cell_type(sheet, value=value)
+        cell.data_type = "s"
+        return cell
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _write_parquet(chunks, out, sheet_name):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    for chunk in chunks:
+        if schema is None:
+            schema = _parquet_schema(chunk)
+            writer = pq.ParquetWriter(out, schema)
+        writer.write_table(pa.Table.from_pandas(_parquet_frame(chunk, schema), schema=schema, preserve_index=False))
+    if writer is None:
+        writer = pq.ParquetWriter(out, pa.schema([]))
+    writer.close()
+
+
+def _parquet_schema(chunk: pd.DataFrame):
+    """
+    One schema for every chunk: chunks are parsed separately, so an integer
+    column may come back as float in a chunk with blanks. Numbers are stored
+    as float64, flags as bool, everything else as string.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for col in chunk.columns:
+        dtype = chunk[col].dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            fields.append(pa.field(str(col), pa.bool_()))
+        elif pd.api.types.is_numeric_dtype(dtype):
+            fields.append(pa.field(str(col), pa.float64()))
+        else:
+            fields.append(pa.field(str(col), pa.string()))
+    return pa.schema(fields)
+
+
+def _parquet_frame(chunk: pd.DataFrame, schema) -> pd.DataFrame:
+    import pyarrow as pa
+
+    frame = pd.DataFrame(index=range(len(chunk)))
+    for field in schema:
+        values = chunk[field.name].reset_index(drop=True)
+        if field.type == pa.float64():
+            frame[field.name] = pd.to_numeric(values, errors="coerce").astype("float64")
+        elif field.type == pa.string():
+            frame[field.name] = values.astype(object).where(values.notna(), None).map(
+                lambda v: v if v is None or isinstance(v, str) else str(v))
+        else:
+            frame[field.name] = values
+    return frame
+
+
+def export_plays(fmt: str, table: Optional[pd.DataFrame] = None, filters: Optional[dict] = None,
+                 text_index: Optional[TextIndex] = None, columns: Optional[list] = None,
+                 chunk_rows: int = CHUNK_ROWS) -> tempfile.SpooledTemporaryFile:
+    """
+    Exports the plays of the current version matching filters (as in
+    get_page, evaluated on the in-memory play table) with all their columns,
+    in id (= import) order. The full rows are read from the CSV chunk by
+    chunk; without filters the whole database is streamed.
+    """
+    ids = None
+    if table is not None and filters:
+        mask = filter_mask(table, filters, text_index)
+        if mask is not None:
+            ids = table.index[mask].to_numpy()
+    chunks = iter_database(ids, columns or STANDARD_COLUMNS, chunk_rows)
+    return write_chunks(_with_header(chunks, columns or STANDARD_COLUMNS), fmt, "plays")
+
+
+def _with_header(chunks, columns):
+    """Yields the chunks; an empty selection still yields the header."""
+    empty = True
+    for chunk in chunks:
+        empty = False
+        yield chunk
+    if empty:
+        yield pd.DataFrame(columns=columns)
+
+
+def export_frame(df: pd.DataFrame, fmt: str, sheet_name: str = "data",
+                 chunk_rows: int = CHUNK_ROWS) -> tempfile.SpooledTemporaryFile:
+    """Exports a table already in memory (e.g. the suggestion list)."""
+    if df.empty:
+        return write_chunks([df], fmt, sheet_name)
+    return write_chunks((df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows)), fmt, sheet_name)
+
+
+def suggestions_frame(suggestions: List[dict]) -> pd.DataFrame:
+    """Suggestion list (analyze_situation) as a flat table for export."""
+    columns = ["play_type", "avg_gain", "success_rate", "sample_size", "reason", "example_ids"]
+    df = pd.DataFrame(suggestions, columns=columns)
+    df["example_ids"] = df["example_ids"].map(lambda ids: " ".join(map(str, ids)) if isinstance(ids, list) else "")
+    return df
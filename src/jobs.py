@@ -0,0 +1,235 @@
+"""
+Background jobs for long imports and report builds.
+
+Jobs run on a small worker pool inside the app process, independent of any
+browser session: closing the tab does not stop them, and the session that
+started one stays interactive. Each job is a JSON record under data/jobs/
+(status, progress, checkpoint, result) rewritten after every chunk, so the
+UI only polls records, and a job cut off by a restart is marked
+"interrupted" and can be resumed from its last checkpoint.
+
+A handler is a function handler(ctx, params) named in HANDLERS as
+"module:function" (imported on first use). It works in chunks:
+ctx.check_cancel() between chunks, ctx.save(checkpoint, progress, message)
+after each one. Appends are tagged with the job id as version group, so a
+finished import is one entry in the version history.
+"""
+
+import importlib
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+JOBS_DIR = "data/jobs"
+JOB_WORKERS = 2
+DEFAULT_CHUNK_ROWS = 5000
+
+# kind -> "module:function"
+HANDLERS = {
+    "nfl_import": "import_nfl_data:run_import_job",
+    "append_frame": "src.jobs:append_frame_job",
+    "tendency_report": "src.tendency_report:run_report_job",
+}
+
+ACTIVE = ("queued", "running")
+RESUMABLE = ("interrupted", "failed", "cancelled")
+
+# Identifies this process in the records; running/queued jobs of another run were interrupted
+_RUN_ID = uuid.uuid4().hex
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_records_lock = threading.Lock()
+_cancel_requested = set()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# --- records ---
+def _path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def input_path(job_id: str, suffix: str) -> str:
+    """Scratch file of a job (downloaded or uploaded input), removed when it finishes."""
+    return os.path.join(JOBS_DIR, f"{job_id}.{suffix}")
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _save(record: Dict[str, Any]):
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    record["updated"] = _now()
+    tmp_path = _path(record["id"]) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp_path, _path(record["id"]))
+
+
+def _load(job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path(job_id), "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record["status"] in ACTIVE and record.get("runner") != _RUN_ID:
+        record["status"] = "interrupted"
+        record["message"] = "アプリの再起動で中断されました"
+    return record
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return _load(job_id)
+
+
+def list_jobs(limit: int = 10) -> List[Dict[str, Any]]:
+    """Most recent jobs first."""
+    if not os.path.isdir(JOBS_DIR):
+        return []
+    ids = sorted((name[:-5] for name in os.listdir(JOBS_DIR) if name.endswith(".json")), reverse=True)
+    return [record for record in (_load(job_id) for job_id in ids[:limit]) if record is not None]
+
+
+# --- running ---
+class JobContext:
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        self.job_id = record["id"]
+        self.checkpoint: Dict[str, Any] = dict(record.get("checkpoint") or {})
+
+    def check_cancel(self):
+        if self.job_id in _cancel_requested:
+            raise JobCancelled()
+
+    def save(self, checkpoint: Optional[Dict[str, Any]] = None, progress: Optional[float] = None,
+             message: Optional[str] = None):
+        """Persists progress (0..1), a status message and the checkpoint to resume from."""
+        if checkpoint is not None:
+            self.checkpoint = dict(checkpoint)
+            self.record["checkpoint"] = self.checkpoint
+        if progress is not None:
+            self.record["progress"] = round(min(max(progress, 0.0), 1.0), 4)
+        if message is not None:
+            self.record["message"] = message
+        with _records_lock:
+            _save(self.record)
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+        return _pool
+
+
+def _handler(kind: str):
+    module_name, func_name = HANDLERS[kind].split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _run(record: Dict[str, Any]):
+    ctx = JobContext(record)
+    if ctx.job_id in _cancel_requested:
+        record["status"] = "cancelled"
+        ctx.save(message="キャンセルしました")
+        return
+    record["status"] = "running"
+    record["started"] = record.get("started") or _now()
+    ctx.save()
+    try:
+        result = _handler(record["kind"])(ctx, record["params"])
+    except JobCancelled:
+        record["status"] = "cancelled"
+        ctx.save(message="キャンセルしました")
+    except Exception as e:
+        print(f"Job {ctx.job_id} failed: {e}")
+        record["status"] = "failed"
+        record["error"] = str(e)
+        ctx.save(message=f"エラー: {e}")
+    else:
+        record["status"] = "done"
+        record["result"] = result
+        record["finished"] = _now()
+        ctx.save(progress=1.0)
+    finally:
+        _cancel_requested.discard(ctx.job_id)
+
+
+def _start(record: Dict[str, Any]):
+    record["status"] = "queued"
+    record["runner"] = _RUN_ID
+    with _records_lock:
+        _save(record)
+    _executor().submit(_run, record)
+
+
+def submit(kind: str, params: Dict[str, Any], label: str = "", job_id: Optional[str] = None) -> str:
+    """Queues a job and returns its id. params must be JSON serializable."""
+    if kind not in HANDLERS:
+        raise ValueError(f"unknown job kind: {kind}")
+    job_id = job_id or new_job_id()
+    _start({
+        "id": job_id, "kind": kind, "label": label or kind, "params": params,
+        "created": _now(), "progress": 0.0, "message": "待機中", "checkpoint": {},
+    })
+    return job_id
+
+
+def new_job_id() -> str:
+    """Sortable by creation time."""
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def cancel(job_id: str) -> bool:
+    """Asks a queued or running job to stop after its current chunk."""
+    record = _load(job_id)
+    if record is None or record["status"] not in ACTIVE:
+        return False
+    _cancel_requested.add(job_id)
+    return True
+
+
+def resume(job_id: str) -> bool:
+    """Restarts an interrupted, failed or cancelled job from its checkpoint."""
+    record = _load(job_id)
+    if record is None or record["status"] not in RESUMABLE:
+        return False
+    record.pop("error", None)
+    record["message"] = "再開待ち"
+    _start(record)
+    return True
+
+
+def has_active_jobs() -> bool:
+    return any(record["status"] in ACTIVE for record in list_jobs())
+
+
+# --- built-in handlers ---
+def append_frame_job(ctx: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Appends an already parsed upload (pickled DataFrame at params["input"])
+    in chunks of params["chunk_rows"] rows.
+    """
+    from src.data_manager import update_database
+
+    df = pd.read_pickle(params["input"])
+    chunk_rows = int(params.get("chunk_rows") or DEFAULT_CHUNK_ROWS)
+    start = int(ctx.checkpoint.get("next_row", 0))
+    added = int(ctx.checkpoint.get("added", 0))
+    for start in range(start, len(df), chunk_rows):
+        ctx.check_cancel()
+        end = min(start + chunk_rows, len(df))
+        added += update_database(df.iloc[start:end].copy(), note=params.get("note", ""), group=ctx.job_id)
+        ctx.save({"next_row": end, "added": added}, end / len(df), f"{end}/{len(df)} 件を追加")
+    os.remove(params["input"])
+    return {"added": added}
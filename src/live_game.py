@@ -0,0 +1,326 @@
+"""
+Live game mode.
+
+Plays are logged one at a time while the game is running. Each play is
+appended to a per-game log (data/live/<game_id>.csv) in O(1) and folded
+into running per-situation aggregates (count, yard sum, success sum), so
+today's tendencies are available immediately without touching or reloading
+the main database. After the game, commit_to_database() merges the log into
+the history with update_database().
+
+The files are the game's state: the log plus <game_id>.json (date, team,
+committed). Every process (app, API server) keeps its own LiveGame and
+reads the lines others appended before answering, so a play logged through
+the API shows up in the app, and a restart resumes the game from its files.
+Appends and the commit hold a per-game file lock.
+
+Plays are checked with the ingest schema (src/validation.py: Down 1-4,
+Distance 0-99, FieldPosition 0-100, ...) before they are logged; a blank
+down, distance or field position takes the live form's default.
+
+weight_suggestions() feeds today's results into the suggestion ranking.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src import validation
+from src.analyzer import get_strategy_name, situation_bucket
+from src.commit_queue import FileLock
+from src.data_manager import BASE_COLUMNS, update_database
+
+LIVE_DIR = "data/live"
+
+# Log layout: input columns plus the score state and the team the play belongs to
+LOG_COLUMNS = BASE_COLUMNS + ["ScoreDiff", "Team"]
+
+# Weight of one play of today's game against one historical play when ranking
+# suggestions (today's opponent, today's conditions)
+LIVE_WEIGHT = 3.0
+
+# Ingest schema with the live form's defaults for a blank situation
+LIVE_SCHEMA = validation.with_defaults({"Down": 1, "Distance": 10, "FieldPosition": 0})
+
+_games: Dict[str, "LiveGame"] = {}
+_games_lock = threading.Lock()
+
+
+def make_game_id(date: str, opponent: str) -> str:
+    """'2026-10-19', 'Tigers' -> '2026-10-19_Tigers' (safe as a file name)."""
+    opponent = re.sub(r"[^\w\-]+", "_", str(opponent).strip()) or "game"
+    return f"{date}_{opponent}"
+
+
+class LiveGame:
+    def __init__(self, game_id: str, date: Optional[str] = None, team: str = ""):
+        self.game_id = game_id
+        self.path = os.path.join(LIVE_DIR, f"{game_id}.csv")
+        self.meta_path = os.path.join(LIVE_DIR, f"{game_id}.json")
+        meta = self._load_meta()
+        self.date = meta.get("date") or date or game_id.split("_", 1)[0]
+        self.team = meta.get("team") or team
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(LIVE_DIR, f"{game_id}.lock"), timeout=10.0)
+        self._plays: List[Dict[str, Any]] = []
+        # situation bucket -> strategy -> [count, yard sum, success sum]
+        self._aggregates: Dict[tuple, Dict[str, List[float]]] = {}
+        # Bytes of the log folded in so far, and its header
+        self._offset = 0
+        self._columns: List[str] = LOG_COLUMNS
+        if not meta and (date or team):
+            # A newly started game: keep its date and team even before the first play
+            self._save_meta(committed=False)
+        with self._lock:
+            self._sync()
+
+    # --- persistence ---
+    def _load_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta(self, committed: bool):
+        """Writes <game_id>.json atomically (temp file + rename)."""
+        os.makedirs(LIVE_DIR, exist_ok=True)
+        meta = {"game_id": self.game_id, "date": self.date, "team": self.team, "committed": committed}
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+
+    @property
+    def committed(self) -> bool:
+        # Older games mark the commit with an empty <log>.committed file
+        return bool(self._load_meta().get("committed")) or os.path.exists(self.path + ".committed")
+
+    def _sync(self):
+        """Folds in plays appended to the log since the last read (by any process). Call with _lock held."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size == self._offset:
+            return
+        # Writers hold the file lock, so the new bytes are whole records
+        with self._file_lock:
+            self._read_new_lines()
+
+    def _read_new_lines(self):
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return
+        records = list(csv.reader(io.StringIO(data.decode("utf-8"), newline="")))
+        if self._offset == 0 and records:
+            self._columns = records.pop(0)
+        plays, errors = self._normalize([dict(zip(self._columns, record)) for record in records])
+        if errors:
+            # Lines written before plays were validated
+            print(f"Live game {self.game_id}: skipped {len(errors)} invalid logged plays: {'; '.join(errors)}")
+        for play in plays:
+            self._plays.append(play)
+            self._accumulate(play)
+        self._offset += len(data)
+
+    def _normalize(self, plays: List[Dict[str, Any]]) -> tuple:
+        """
+        Checks and coerces plays (one validation pass for all of them).
+        Returns (valid plays in log layout, error message per rejected play).
+        """
+        if not plays:
+            return [], []
+        rows = []
+        for play in plays:
+            row = {col: play.get(col, "") for col in LOG_COLUMNS}
+            for col, value in row.items():
+                if not pd.api.types.is_scalar(value):
+                    raise ValueError(f"{col}: 値が不正です ({value!r})")
+            row["Date"] = row["Date"] or self.date
+            row["Team"] = row["Team"] or self.team
+            rows.append(row)
+        valid, errors, _ = validation.validate_plays(pd.DataFrame(rows, columns=LOG_COLUMNS), LIVE_SCHEMA)
+        normalized = []
+        for row in valid.to_dict("records"):
+            row["Down"] = int(row["Down"])
+            row["Distance"] = int(row["Distance"])
+            row["FieldPosition"] = int(row["FieldPosition"])
+            row["YardsGained"] = float(row["YardsGained"])
+            row["Success"] = int(row["Success"])
+            row["ScoreDiff"] = int(row["ScoreDiff"]) if pd.notna(row["ScoreDiff"]) else ""
+            normalized.append(row)
+        return normalized, errors.tolist()
+
+    # --- online aggregates ---
+    def _accumulate(self, play: Dict[str, Any]):
+        bucket = situation_bucket(play["Down"], play["Distance"], play["FieldPosition"])
+        stats = self._aggregates.setdefault(bucket, {}).setdefault(get_strategy_name(play), [0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += play["YardsGained"]
+        stats[2] += play["Success"]
+
+    def append_play(self, play: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Logs one play: one line appended to the log plus an O(1) aggregate
+        update. Raises ValueError if the play does not pass validation.
+        """
+        rows, errors = self._normalize([play])
+        if errors:
+            raise ValueError(errors[0])
+        row = rows[0]
+        with self._lock, self._file_lock:
+            if self.committed:
+                raise ValueError("この試合はすでにデータベースに反映済みです")
+            # Plays logged elsewhere come first, so the offset ends up past our line
+            self._read_new_lines()
+            if not os.path.exists(self.meta_path):
+                self._save_meta(committed=False)
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=self._columns, extrasaction="ignore")
+            if self._offset == 0:
+                writer.writeheader()
+            writer.writerow(row)
+            with open(self.path, "ab") as f:
+                f.write(buffer.getvalue().encode("utf-8"))
+                self._offset = f.tell()
+            self._plays.append(row)
+            self._accumulate(row)
+        return row
+
+    # --- queries ---
+    @property
+    def play_count(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._plays)
+
+    def plays_frame(self) -> pd.DataFrame:
+        """Today's plays in database layout."""
+        with self._lock:
+            self._sync()
+            return pd.DataFrame(list(self._plays), columns=LOG_COLUMNS)
+
+    def _totals(self, down=None, distance=None, field_pos=None) -> Dict[str, List[float]]:
+        """strategy -> [count, yard sum, success sum] of today's plays in the situation."""
+        with self._lock:
+            self._sync()
+            if down is None and distance is None and field_pos is None:
+                buckets = list(self._aggregates.values())
+            else:
+                target = situation_bucket(down, distance, field_pos)
+                buckets = [
+                    by_strategy for bucket, by_strategy in self._aggregates.items()
+                    if all(want in (None, "unknown") or want == got for want, got in zip(target, bucket))
+                ]
+            totals: Dict[str, List[float]] = {}
+            for by_strategy in buckets:
+                for strategy, (count, yards, success) in by_strategy.items():
+                    t = totals.setdefault(strategy, [0, 0.0, 0])
+                    t[0] += count
+                    t[1] += yards
+                    t[2] += success
+        return totals
+
+    def tendencies(self, down=None, distance=None, field_pos=None) -> List[Dict[str, Any]]:
+        """
+        Today's results per strategy. With a situation, only the matching
+        (down, distance bucket, field zone) aggregates are used.
+        """
+        totals = self._totals(down, distance, field_pos)
+        rows = [{
+            "play_type": strategy,
+            "count": count,
+            "avg_gain": round(yards / count, 1),
+            "success_rate": f"{success / count * 100:.0f}%",
+        } for strategy, (count, yards, success) in totals.items() if count]
+        return sorted(rows, key=lambda r: (-r["avg_gain"], -r["count"]))
+
+    def weight_suggestions(self, suggestions: List[Dict[str, Any]], down=None, distance=None,
+                           field_pos=None) -> List[Dict[str, Any]]:
+        """
+        Folds today's results in the same situation into suggestions
+        (analyze_situation output, not modified): average gain and success
+        rate are pooled with each play of today counted LIVE_WEIGHT times,
+        and the list is ranked again like analyze_situation (average gain,
+        then sample size). Calls tried only today are added.
+        """
+        totals = self._totals(down, distance, field_pos)
+        if not totals:
+            return suggestions
+        weighted = []
+        for suggestion in suggestions:
+            suggestion = dict(suggestion)
+            today = totals.pop(suggestion["play_type"], None)
+            if today:
+                count, yards, success = today
+                history = suggestion["sample_size"]
+                rate = str(suggestion.get("success_rate", "")).rstrip("%")
+                history_success = float(rate) / 100 if rate.replace(".", "", 1).isdigit() else success / count
+                weight = history + LIVE_WEIGHT * count
+                suggestion["avg_gain"] = round((suggestion["avg_gain"] * history + LIVE_WEIGHT * yards) / weight, 1)
+                suggestion["success_rate"] = f"{(history_success * history + LIVE_WEIGHT * success) / weight * 100:.0f}%"
+                suggestion["sample_size"] = history + count
+                suggestion["live_count"] = count
+                suggestion["reason"] += f" 今日: {count}回 (平均 {round(yards / count, 1)} yd)"
+            weighted.append(suggestion)
+        for strategy, (count, yards, success) in totals.items():
+            if count:
+                weighted.append({
+                    "play_type": strategy, "avg_gain": round(yards / count, 1),
+                    "success_rate": f"{success / count * 100:.0f}%", "sample_size": count, "live_count": count,
+                    "reason": f"今日の試合の{count}回に基づく (平均 {round(yards / count, 1)} yd)。", "example_ids": [],
+                })
+        return sorted(weighted, key=lambda s: (-s["avg_gain"], -s["sample_size"]))
+
+    # --- end of game ---
+    def commit_to_database(self) -> int:
+        """
+        Merges today's plays into the main database, checked against the
+        declared ingest schema like an upload. Returns the number of rows
+        added; raises ValueError (nothing written) if a play fails the checks.
+        """
+        with self._lock, self._file_lock:
+            self._read_new_lines()
+            if self.committed or not self._plays:
+                return 0
+            plays, errors, _ = validation.validate_plays(pd.DataFrame(list(self._plays), columns=LOG_COLUMNS))
+            if len(errors):
+                raise ValueError(f"{len(errors)} プレーが検証で不合格です: " + ", ".join(validation.summarize(errors)))
+            added = update_database(plays, note=f"試合ログ: {self.game_id}")
+            self._save_meta(committed=True)
+        return added
+
+
+def get_game(game_id: str, date: Optional[str] = None, team: str = "") -> LiveGame:
+    """Returns the process-wide LiveGame for game_id (created or restored from its log)."""
+    if not re.fullmatch(r"[\w\-]+", game_id or ""):
+        raise ValueError(f"invalid game id: {game_id!r}")
+    with _games_lock:
+        game = _games.get(game_id)
+        if game is None:
+            game = LiveGame(game_id, date=date, team=team)
+            _games[game_id] = game
+        return game
+
+
+def list_games() -> List[str]:
+    """Game ids with a log or a started game on disk, newest first."""
+    if not os.path.isdir(LIVE_DIR):
+        return []
+    ids = {os.path.splitext(name)[0] for name in os.listdir(LIVE_DIR) if name.endswith((".csv", ".json"))}
+    return sorted(ids, reverse=True)
+
+
+def today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
@@ -0,0 +1,111 @@
+"""
+Statistics sidecar for the play database.
+
+A small JSON file next to the CSV holds the row count, per-partition counts
+(game dates, teams, seasons, ...) and the real last-modified time. Writers
+update it in O(new rows); readers get the sidebar metrics without loading
+the database.
+"""
+
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+# Trailing "(WAS)" that import_nfl_data appends to the play description
+_TEAM_IN_DETAIL = r"\(([A-Z]{2,3})\)\s*$"
+
+
+def _date_keys(df: pd.DataFrame) -> pd.Series:
+    return df["Date"].dropna().astype(str)
+
+
+def _team_keys(df: pd.DataFrame) -> pd.Series:
+    teams = pd.Series(index=df.index, dtype=object)
+    if "Team" in df.columns:
+        teams = df["Team"].where(df["Team"].notna() & (df["Team"].astype(str).str.strip() != ""))
+    if "Detail" in df.columns and teams.isna().any():
+        # Rows stored before the Team column existed
+        teams = teams.fillna(df["Detail"].astype(str).str.extract(_TEAM_IN_DETAIL, expand=False))
+    return teams
+
+
+def _season_keys(df: pd.DataFrame) -> pd.Series:
+    """NFL-style season: January/February games belong to the previous year."""
+    dates = pd.to_datetime(df["Date"], errors='coerce')
+    season = (dates.dt.year - (dates.dt.month <= 2).astype(int)).dropna()
+    return season.astype(int).astype(str)
+
+
+# Partition name -> function returning one key per row (None/NaN rows are not counted).
+# Register more entries here to get extra per-partition counts in the sidecar.
+PARTITION_KEYS: Dict[str, Callable[[pd.DataFrame], pd.Series]] = {
+    "Date": _date_keys,
+    "Team": _team_keys,
+    "Season": _season_keys,
+}
+
+
+def empty_metadata() -> Dict:
+    return {
+        "row_count": 0,
+        "file_size": 0,
+        "last_modified": None,
+        "partitions": {name: {} for name in PARTITION_KEYS},
+    }
+
+
+def count_partitions(df: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    """Per-partition row counts for a batch of rows."""
+    counts = {}
+    for name, key_func in PARTITION_KEYS.items():
+        try:
+            keys = key_func(df).dropna()
+        except KeyError:
+            counts[name] = {}
+            continue
+        counts[name] = {str(k): int(v) for k, v in keys.value_counts().items()}
+    return counts
+
+
+def load_metadata(path: str) -> Optional[Dict]:
+    """Returns the sidecar contents, or None if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    for name in PARTITION_KEYS:
+        meta.setdefault("partitions", {}).setdefault(name, {})
+    return meta
+
+
+def save_metadata(path: str, meta: Dict):
+    """Writes the sidecar atomically (temp file + rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def add_rows(meta: Dict, new_df: pd.DataFrame, file_size: int) -> Dict:
+    """Adds a batch of new rows to the metadata in O(len(new_df))."""
+    meta["row_count"] += len(new_df)
+    for name, counts in count_partitions(new_df).items():
+        merged = Counter(meta["partitions"].get(name, {}))
+        merged.update(counts)
+        meta["partitions"][name] = dict(merged)
+    meta["file_size"] = file_size
+    meta["last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return meta
+
+
+def build_metadata(df: pd.DataFrame, file_size: int, last_modified: Optional[float] = None) -> Dict:
+    """Full rebuild from the whole database (used when the sidecar is missing or stale)."""
+    meta = add_rows(empty_metadata(), df, file_size)
+    if last_modified is not None:
+        meta["last_modified"] = datetime.fromtimestamp(last_modified).strftime("%Y-%m-%d %H:%M:%S")
+    return meta
@@ -0,0 +1,313 @@
+"""
+Team / season partition catalog for the play database.
+
+The database stays one append-only CSV (play id = row position, see
+versions.py), but every row belongs to a partition: its team (the Team
+column: sheet name of an upload, posteam of an NFL import) and its season.
+The catalog, built from the CSV and extended on every append, keeps per
+partition:
+- row count and first/last date, so a date range prunes whole partitions
+- runs of consecutive rows: [first id, stop id, first byte, stop byte]; a
+  run never crosses a multiple of RUN_ROWS ids, so one row is found by
+  reading one short run (read_rows, the data browser's pages)
+- situation-bucket summaries: plays, successes and yards per down x distance
+
+A query scoped to a team, season or date range reads only the byte runs of
+the matching partitions (read_partitions), so scouting one opponent does not
+parse the other teams' rows.
+
+It is stored as a delta_store directory: a commit writes the catalog of its
+own rows (rows_catalog), readers fold the deltas into the base (merge).
+"""
+
+import io
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src import delta_store, metadata
+from src.analyzer import distance_buckets
+
+# Rows without a team or date go to the partition with a blank name
+_SEPARATOR = "|"
+_NEWLINE = ord("\n")
+_QUOTE = ord('"')
+# Runs are split at every multiple of this many play ids
+RUN_ROWS = 1024
+
+
+def partition_key(team: str, season: str) -> str:
+    return f"{team}{_SEPARATOR}{season}"
+
+
+def row_keys(df: pd.DataFrame) -> np.ndarray:
+    """Partition key of every row (team and season as in the statistics sidecar)."""
+    teams = metadata.PARTITION_KEYS["Team"](df).reindex(df.index)
+    teams = teams.where(teams.notna(), "").astype(str).str.strip()
+    seasons = metadata.PARTITION_KEYS["Season"](df).reindex(df.index).fillna("")
+    return (teams + _SEPARATOR + seasons.astype(str)).to_numpy(dtype=object)
+
+
+def record_ends(data: bytes) -> np.ndarray:
+    """
+    Offsets just past the end of every CSV record in data. A newline inside
+    a quoted field (multi-line Detail) does not end a record: quotes are
+    counted, and an escaped quote ("") counts twice, so the parity holds.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == _NEWLINE)
+    quotes = np.flatnonzero(buf == _QUOTE)
+    ends = newlines[np.searchsorted(quotes, newlines) % 2 == 0] + 1
+    if len(data) and (ends.size == 0 or ends[-1] != len(data)):
+        ends = np.append(ends, len(data))
+    return ends
+
+
+def empty_catalog(file_id: Optional[str], header_size: int) -> Dict:
+    return {"file": file_id, "row_count": 0, "size": header_size, "header_size": header_size, "run_rows": RUN_ROWS,
+            "partitions": {}}
+
+
+def add_rows(catalog: Dict, rows: pd.DataFrame, data: bytes) -> Dict:
+    """
+    Adds rows appended to the CSV as data (their CSV bytes, written at
+    catalog["size"]) in O(len(rows)). Raises ValueError if the records in
+    data do not match the rows.
+    """
+    return merge(catalog, rows_catalog(catalog["file"], catalog["row_count"], catalog["size"], rows, data))
+
+
+def rows_catalog(file_id: Optional[str], first_id: int, offset: int, rows: pd.DataFrame, data: bytes) -> Dict:
+    """
+    Catalog of only the rows appended at play id first_id (their CSV bytes
+    data, written at offset): what one commit adds, see merge(). Raises
+    ValueError if the records in data do not match the rows.
+    """
+    ends = offset + record_ends(data)
+    if len(ends) != len(rows):
+        raise ValueError(f"{len(ends)} CSV records for {len(rows)} rows")
+    delta = dict(empty_catalog(file_id, offset), first_id=first_id, first_size=offset,
+                 row_count=first_id + len(rows), size=int(ends[-1]) if len(ends) else offset)
+    if rows.empty:
+        return delta
+    starts = np.r_[offset, ends[:-1]]
+    keys = row_keys(rows)
+    partitions = delta["partitions"]
+
+    # Runs of consecutive rows with the same key (one per sheet, or per drive in NFL data),
+    # also split where the play id is a multiple of RUN_ROWS
+    ids = first_id + np.arange(len(keys))
+    change = np.flatnonzero((keys[1:] != keys[:-1]) | (ids[1:] % RUN_ROWS == 0)) + 1
+    run_start, run_stop = np.r_[0, change], np.r_[change, len(keys)]
+    runs = pd.DataFrame({"key": keys[run_start], "first": first_id + run_start, "stop": first_id + run_stop,
+                         "first_byte": starts[run_start], "stop_byte": ends[run_stop - 1]})
+
+    dates = pd.to_datetime(rows["Date"], errors='coerce') if "Date" in rows.columns \
+        else pd.Series(pd.NaT, index=rows.index)
+    stats = pd.DataFrame({
+        "key": keys, "date": dates.to_numpy(),
+        "bucket": pd.to_numeric(rows["Down"], errors='coerce').astype("Int64").astype(str).to_numpy()
+        + _SEPARATOR + distance_buckets(rows["Distance"]).to_numpy(),
+        "success": pd.to_numeric(rows["Success"], errors='coerce').fillna(0).to_numpy(),
+        "yards": pd.to_numeric(rows["YardsGained"], errors='coerce').fillna(0).to_numpy(),
+    })
+    per_key = stats.groupby("key", sort=False).agg(rows=("key", "size"), low=("date", "min"), high=("date", "max"))
+    for key, group in runs.groupby("key", sort=False):
+        team, season = key.rsplit(_SEPARATOR, 1)
+        low, high = per_key.at[key, "low"], per_key.at[key, "high"]
+        partitions[key] = {
+            "team": team, "season": season, "rows": int(per_key.at[key, "rows"]),
+            "min_date": low.strftime("%Y-%m-%d") if pd.notna(low) else None,
+            "max_date": high.strftime("%Y-%m-%d") if pd.notna(high) else None,
+            "runs": group[["first", "stop", "first_byte", "stop_byte"]].to_numpy().ravel().tolist(), "summary": {},
+        }
+
+    buckets = stats.groupby(["key", "bucket"]).agg(plays=("yards", "size"), success=("success", "sum"),
+                                                   yards=("yards", "sum"))
+    for (key, bucket), plays, success, yards in zip(buckets.index, buckets["plays"], buckets["success"], buckets["yards"]):
+        partitions[key]["summary"][bucket] = [int(plays), int(success), round(float(yards), 1)]
+    return delta
+
+
+def merge(catalog: Dict, delta: Dict) -> Dict:
+    """
+    Folds delta (rows_catalog() of the rows that follow catalog) into
+    catalog in O(size of delta). Raises ValueError if delta does not start
+    where catalog ends.
+    """
+    if (delta["file"], delta["first_id"], delta["first_size"]) != (catalog["file"], catalog["row_count"], catalog["size"]):
+        raise ValueError(f"rows from {delta['first_id']} do not continue the catalog ({catalog['row_count']} rows)")
+    partitions = catalog["partitions"]
+    for key, new in delta["partitions"].items():
+        part = partitions.get(key)
+        if part is None:
+            partitions[key] = new
+            continue
+        new_runs = new["runs"]
+        if part["runs"] and part["runs"][-3] == new_runs[0] and new_runs[0] % RUN_ROWS:
+            # Continues the partition's last run (e.g. the next chunk of the same sheet)
+            part["runs"][-3], part["runs"][-1] = new_runs[1], new_runs[3]
+            new_runs = new_runs[4:]
+        part["runs"] += new_runs
+        part["rows"] += new["rows"]
+        if new["min_date"] is not None:
+            part["min_date"] = new["min_date"] if part["min_date"] is None else min(part["min_date"], new["min_date"])
+            part["max_date"] = new["max_date"] if part["max_date"] is None else max(part["max_date"], new["max_date"])
+        summary = part["summary"]
+        for bucket, (plays, success, yards) in new["summary"].items():
+            old_plays, old_success, old_yards = summary.get(bucket, [0, 0, 0])
+            summary[bucket] = [old_plays + plays, old_success + success, round(old_yards + yards, 1)]
+    catalog["row_count"], catalog["size"] = delta["row_count"], delta["size"]
+    return catalog
+
+
+def build_catalog(file_id: Optional[str], data: bytes, rows: pd.DataFrame) -> Dict:
+    """Full rebuild from the CSV bytes (header included) and its parsed rows."""
+    header_size = data.find(b"\n") + 1
+    return add_rows(empty_catalog(file_id, header_size), rows, data[header_size:])
+
+
+def load_catalog(directory: str, file_id: str, row_count: int) -> Optional[Dict]:
+    """
+    The stored catalog of file file_id covering plays [0, row_count), or
+    None if it is not stored. Writes a new base when the chain of deltas
+    has grown long.
+    """
+    stored = delta_store.load(directory, file_id, row_count)
+    if stored is None or (stored[0] is None and not stored[1]):
+        return None
+    base, deltas = stored
+    try:
+        catalog = base if base is not None else empty_catalog(file_id, deltas[0]["first_size"])
+        for delta in deltas:
+            merge(catalog, delta)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Error reading partition catalog: {e}")
+        return None
+    if catalog.get("run_rows") != RUN_ROWS:
+        return None
+    if len(deltas) > delta_store.MAX_DELTAS:
+        save_catalog(directory, catalog)
+    return catalog
+
+
+def append_rows(directory: str, file_id: str, first_id: int, offset: int, rows: pd.DataFrame, data: bytes) -> bool:
+    """
+    Stores the catalog of rows appended at play id first_id (see
+    rows_catalog) as a delta. Returns False (nothing written) when the
+    stored catalog does not end at first_id.
+    """
+    if not delta_store.ends_at(directory, file_id, first_id):
+        return False
+    delta_store.append(directory, file_id, first_id, first_id + len(rows),
+                       rows_catalog(file_id, first_id, offset, rows, data))
+    return True
+
+
+def save_catalog(directory: str, catalog: Dict):
+    """Stores catalog as the base for its file and row count."""
+    delta_store.save_base(directory, catalog["file"], catalog["row_count"], catalog)
+
+
+def select(catalog: Dict, team: Optional[str] = None, season: Optional[str] = None,
+           date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[str]:
+    """Keys of the partitions that can hold rows of the scope (None: any)."""
+    keys = []
+    for key, part in catalog["partitions"].items():
+        if team is not None and part["team"] != team:
+            continue
+        if season is not None and part["season"] != str(season):
+            continue
+        if (date_from is not None or date_to is not None) and part["min_date"] is None:
+            continue
+        if date_from is not None and part["max_date"] < date_from:
+            continue
+        if date_to is not None and part["min_date"] > date_to:
+            continue
+        keys.append(key)
+    return keys
+
+
+def sorted_runs(catalog: Dict, keys: Optional[List[str]] = None) -> np.ndarray:
+    """Runs of the given partitions (None: all) as an (n, 4) array in id order."""
+    if keys is None:
+        keys = list(catalog["partitions"])
+    runs = np.array([run for key in keys for run in catalog["partitions"][key]["runs"]], dtype=np.int64).reshape(-1, 4)
+    return runs[np.argsort(runs[:, 0], kind="stable")]
+
+
+def read_partitions(path: str, catalog: Dict, keys: List[str], **read_csv_args) -> Optional[pd.DataFrame]:
+    """
+    Parses only the rows of the given partitions (in id order, indexed by
+    play id): the header plus their byte runs are read and handed to
+    pd.read_csv. Returns None if the file no longer matches the catalog.
+    """
+    runs = sorted_runs(catalog, keys)
+    parts = []
+    with open(path, "rb") as f:
+        parts.append(f.read(catalog["header_size"]))
+        # Runs of different partitions that touch are read in one go
+        start = 0
+        for i in range(len(runs)):
+            if i + 1 < len(runs) and runs[i, 3] == runs[i + 1, 2]:
+                continue
+            f.seek(runs[start, 2])
+            parts.append(f.read(runs[i, 3] - runs[start, 2]))
+            start = i + 1
+    df = pd.read_csv(io.BytesIO(b"".join(parts)), on_bad_lines='skip', **read_csv_args)
+    ids = np.concatenate([np.arange(a, b) for a, b in runs[:, :2]]) if len(runs) else np.empty(0, dtype=np.int64)
+    if len(df) != len(ids):
+        return None
+    df.index = ids
+    return df
+
+
+def read_rows(path: str, catalog: Dict, ids, runs: Optional[np.ndarray] = None,
+              **read_csv_args) -> Optional[pd.DataFrame]:
+    """
+    Parses only the rows with the given play ids (in id order, indexed by
+    play id): the run holding each id is read and split into records, so the
+    cost does not depend on where the rows are in the file. runs is
+    sorted_runs(catalog) if the caller keeps it. Returns None if an id is
+    not in the catalog or the file no longer matches it.
+    """
+    ids = np.unique(np.asarray(ids, dtype=np.int64))
+    if runs is None:
+        runs = sorted_runs(catalog)
+    at = np.searchsorted(runs[:, 0], ids, side="right") - 1
+    if ids.size and (at[0] < 0 or (ids >= runs[at, 1]).any()):
+        return None
+    parts = []
+    with open(path, "rb") as f:
+        parts.append(f.read(catalog["header_size"]))
+        for run in np.unique(at):
+            first, stop, first_byte, stop_byte = runs[run]
+            f.seek(first_byte)
+            data = f.read(stop_byte - first_byte)
+            ends = record_ends(data)
+            if len(ends) != stop - first:
+                return None
+            starts = np.r_[0, ends[:-1]]
+            parts += [data[starts[i]:ends[i]] for i in ids[at == run] - first]
+    df = pd.read_csv(io.BytesIO(b"".join(parts)), on_bad_lines='skip', **read_csv_args)
+    if len(df) != len(ids):
+        return None
+    df.index = ids
+    return df
+
+
+def summary_frame(catalog: Dict) -> pd.DataFrame:
+    """One line per partition for display: team, season, plays, dates, 3rd-down success rate."""
+    records = []
+    for part in catalog["partitions"].values():
+        third = [v for k, v in part["summary"].items() if k.startswith(f"3{_SEPARATOR}")]
+        plays = sum(v[0] for v in third)
+        records.append({
+            "チーム": part["team"] or "(不明)", "シーズン": part["season"] or "(不明)", "プレー数": part["rows"],
+            "期間": f"{part['min_date']} - {part['max_date']}" if part["min_date"] else "",
+            "3rdダウン成功率": f"{sum(v[1] for v in third) / plays:.0%}" if plays else "",
+            "ブロック数": len(part["runs"]) // 4,
+        })
+    df = pd.DataFrame(records, columns=["チーム", "シーズン", "プレー数", "期間", "3rdダウン成功率", "ブロック数"])
+    return df.sort_values(["チーム", "シーズン"], ignore_index=True)
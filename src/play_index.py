@@ -0,0 +1,131 @@
+"""
+In-memory indexes over the play table.
+
+Built once per data version and reused by every query:
+- categorical columns: value -> sorted row positions (posting lists)
+- numeric columns: values sorted once, so a range is two binary searches
+
+select() materializes only the most selective condition and checks the
+remaining ones on that candidate set, so a narrow query touches a handful
+of rows regardless of the table size.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.dimensions import DIMENSION_COLUMNS
+
+CATEGORICAL_COLUMNS = ["Down", "Quarter"] + DIMENSION_COLUMNS
+NUMERIC_COLUMNS = [
+    "Distance", "FieldPosition",
+    "QuarterSecondsRemaining", "GameSecondsRemaining", "ScoreDiff"
+]
+
+
+def _category_key(value) -> str:
+    """Categorical values are compared as strings ('1', '4Q', ...)."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+class PlayIndex:
+    def __init__(self, df: pd.DataFrame,
+                 categorical: Iterable[str] = CATEGORICAL_COLUMNS,
+                 numeric: Iterable[str] = NUMERIC_COLUMNS):
+        self.size = len(df)
+        self._codes: Dict[str, np.ndarray] = {}
+        self._code_of: Dict[str, Dict[str, int]] = {}
+        self._postings: Dict[str, Dict[int, np.ndarray]] = {}
+        self._values: Dict[str, np.ndarray] = {}
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        for col in categorical:
+            if col not in df.columns:
+                continue
+            keys = df[col].map(_category_key, na_action='ignore')
+            codes, uniques = pd.factorize(keys, use_na_sentinel=True)
+            self._codes[col] = codes
+            self._code_of[col] = {str(v): i for i, v in enumerate(uniques)}
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self._postings[col] = {i: order[bounds[i]:bounds[i + 1]] for i in range(len(uniques))}
+
+        for col in numeric:
+            if col not in df.columns:
+                continue
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+            valid = np.flatnonzero(~np.isnan(values))
+            order = valid[np.argsort(values[valid], kind="stable")]
+            self._values[col] = values
+            self._sorted[col] = (values[order], order)
+
+    def has(self, col: str) -> bool:
+        return col in self._codes or col in self._values
+
+    # --- single-condition lookups ---
+    def _equal_positions(self, col: str, value) -> np.ndarray:
+        code = self._code_of[col].get(_category_key(value))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._postings[col][code]
+
+    def _range_bounds(self, col: str, low, high) -> Tuple[int, int]:
+        sorted_values, _ = self._sorted[col]
+        low = -np.inf if low is None else low
+        high = np.inf if high is None else high
+        return (int(np.searchsorted(sorted_values, low, side="left")),
+                int(np.searchsorted(sorted_values, high, side="right")))
+
+    # --- combined query ---
+    def select(self, equals: Optional[Dict[str, object]] = None,
+               ranges: Optional[Dict[str, Tuple]] = None) -> np.ndarray:
+        """
+        Row positions (ascending) matching all equality and inclusive range conditions.
+        Conditions on columns without an index raise KeyError.
+        """
+        equals = equals or {}
+        ranges = ranges or {}
+
+        # Estimate each condition's size without materializing it
+        candidates: List[Tuple[int, str, str]] = []
+        for col, value in equals.items():
+            if col not in self._codes:
+                raise KeyError(col)
+            candidates.append((len(self._equal_positions(col, value)), "eq", col))
+        for col, (low, high) in ranges.items():
+            if col not in self._sorted:
+                raise KeyError(col)
+            start, stop = self._range_bounds(col, low, high)
+            candidates.append((stop - start, "range", col))
+
+        if not candidates:
+            return np.arange(self.size)
+
+        candidates.sort()
+        _, kind, col = candidates[0]
+        if kind == "eq":
+            positions = self._equal_positions(col, equals[col])
+        else:
+            start, stop = self._range_bounds(col, *ranges[col])
+            positions = np.sort(self._sorted[col][1][start:stop])
+
+        # Verify the other conditions on the (small) candidate set only
+        for _, kind, other in candidates[1:]:
+            if positions.size == 0:
+                break
+            if kind == "eq":
+                code = self._code_of[other].get(_category_key(equals[other]), -2)
+                positions = positions[self._codes[other][positions] == code]
+            else:
+                low, high = ranges[other]
+                values = self._values[other][positions]
+                keep = np.ones(positions.size, dtype=bool)
+                if low is not None:
+                    keep &= values >= low
+                if high is not None:
+                    keep &= values <= high
+                positions = positions[keep]
+        return positions
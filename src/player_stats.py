@@ -0,0 +1,141 @@
+"""
+Per-player x situation aggregate table.
+
+For every player token found in the descriptions (see enrich.PLAYER_COLUMNS)
+the table holds, per role (Passer / Rusher / Target / Tackler) and coarse
+situation (down, distance bucket, field zone): number of plays, yards and
+successes, so "who gets the ball on 3rd & short" is a lookup in a small
+table instead of a scan of the descriptions.
+
+The table is stored next to the CSV as a delta_store directory: writers add
+the aggregate of the appended plays only (O(new rows)), readers sum the
+base and the deltas with merge_tables().
+"""
+
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from src import delta_store
+from src.analyzer import distance_bucket, distance_buckets, field_zone, field_zones
+from src.enrich import PLAYER_COLUMNS
+
+KEY_COLUMNS = ["Player", "Role", "Down", "DistanceBucket", "FieldZone"]
+SUM_COLUMNS = ["Plays", "Yards", "Successes"]
+TABLE_COLUMNS = KEY_COLUMNS + SUM_COLUMNS
+
+# Roles that mean "had the ball" on offense
+BALL_CARRIER_ROLES = ["Rusher", "Target"]
+
+
+def empty_table() -> pd.DataFrame:
+    return pd.DataFrame(columns=TABLE_COLUMNS)
+
+
+def aggregate(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates plays (database layout with player columns) into table rows."""
+    roles = [col for col in PLAYER_COLUMNS if col in df.columns]
+    if df.empty or not roles:
+        return empty_table()
+
+    base = pd.DataFrame({
+        "Down": pd.to_numeric(df["Down"], errors='coerce').fillna(0).astype(int),
+        "DistanceBucket": distance_buckets(df["Distance"]),
+        "FieldZone": field_zones(df["FieldPosition"]),
+        "Yards": pd.to_numeric(df["YardsGained"], errors='coerce').fillna(0.0),
+        "Successes": pd.to_numeric(df["Success"], errors='coerce').fillna(0).astype(int),
+    }, index=df.index)
+
+    parts = []
+    for role in roles:
+        players = df[role].fillna("").astype(str)
+        named = players != ""
+        if named.any():
+            part = base[named].assign(Player=players[named], Role=role, Plays=1)
+            parts.append(part)
+    if not parts:
+        return empty_table()
+    rows = pd.concat(parts, ignore_index=True)
+    return rows.groupby(KEY_COLUMNS, as_index=False)[SUM_COLUMNS].sum()[TABLE_COLUMNS]
+
+
+def merge_tables(tables: List[pd.DataFrame]) -> pd.DataFrame:
+    """Sums tables (e.g. a stored base and the deltas of later appends) into one."""
+    tables = [table for table in tables if not table.empty]
+    if not tables:
+        return empty_table()
+    if len(tables) == 1:
+        return tables[0]
+    merged = pd.concat(tables, ignore_index=True)
+    return merged.groupby(KEY_COLUMNS, as_index=False)[SUM_COLUMNS].sum()[TABLE_COLUMNS]
+
+
+def top_players(table: pd.DataFrame, roles: Iterable[str] = BALL_CARRIER_ROLES, down=None, distance=None,
+                field_pos=None, limit: int = 10) -> pd.DataFrame:
+    """
+    Players ranked by number of plays in the given roles and situation.
+    None for down / distance / field_pos means any.
+    """
+    roles = list(roles)
+    rows = table[table["Role"].isin(roles)]
+    if down is not None:
+        rows = rows[rows["Down"] == int(down)]
+    if distance is not None:
+        rows = rows[rows["DistanceBucket"] == distance_bucket(distance)]
+    if field_pos is not None:
+        rows = rows[rows["FieldZone"] == field_zone(field_pos)]
+    if rows.empty:
+        return pd.DataFrame(columns=["Player", "Plays", "Share", "AvgGain", "SuccessRate"])
+
+    totals = rows.groupby("Player")[SUM_COLUMNS].sum()
+    totals = totals.nlargest(limit, "Plays")
+    result = pd.DataFrame({
+        "Player": totals.index,
+        "Plays": totals["Plays"].astype(int).to_numpy(),
+        "Share": (totals["Plays"] / rows["Plays"].sum()).round(3).to_numpy(),
+        "AvgGain": (totals["Yards"] / totals["Plays"]).round(1).to_numpy(),
+        "SuccessRate": (totals["Successes"] / totals["Plays"]).round(3).to_numpy(),
+    })
+    return result
+
+
+# --- persistence ---
+def _payload(table: pd.DataFrame) -> list:
+    return table[TABLE_COLUMNS].values.tolist()
+
+
+def load_table(directory: str, row_count: int) -> Optional[pd.DataFrame]:
+    """
+    The stored table covering plays [0, row_count), or None if it is not
+    stored. Writes a new base when the chain of deltas has grown long.
+    """
+    stored = delta_store.load(directory, "", row_count)
+    if stored is None:
+        return None
+    base, deltas = stored
+    try:
+        tables = [pd.DataFrame(rows, columns=TABLE_COLUMNS) for rows in ([base] if base is not None else []) + deltas]
+    except Exception as e:
+        print(f"Error reading player stats: {e}")
+        return None
+    table = merge_tables(tables)
+    if len(deltas) > delta_store.MAX_DELTAS:
+        save_table(directory, table, row_count)
+    return table
+
+
+def append_rows(directory: str, first_id: int, new_df: pd.DataFrame) -> bool:
+    """
+    Stores the aggregate of plays appended at play id first_id as a delta.
+    Returns False (nothing written) when the stored table does not end at
+    first_id.
+    """
+    if not delta_store.ends_at(directory, "", first_id):
+        return False
+    delta_store.append(directory, "", first_id, first_id + len(new_df), _payload(aggregate(new_df)))
+    return True
+
+
+def save_table(directory: str, table: pd.DataFrame, row_count: int):
+    """Stores table as the base for plays [0, row_count)."""
+    delta_store.save_base(directory, "", row_count, _payload(table))
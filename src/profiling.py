@@ -0,0 +1,153 @@
+"""
+Lightweight timing spans.
+
+    with span("analyze.filter"):
+        ...
+
+Durations are kept per span name in a fixed-size ring buffer and summarized
+as p50/p95/p99 for the admin performance panel. Timing is opt-in: set
+TACTICS_TIMING=1, start the API server with --timing or tick the box in the
+admin panel. When disabled, span() returns a shared no-op context manager,
+so instrumented code pays only a function call and a flag check.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+from typing import Dict, List, Optional
+
+# Samples kept per span name
+RING_SIZE = 500
+
+_enabled = os.environ.get("TACTICS_TIMING", "0") == "1"
+_buffers: Dict[str, deque] = {}
+_lock = threading.Lock()
+_NULL_SPAN = nullcontext()
+
+# Startup milestones: seconds from the first import of this module (process boot)
+_BOOT = time.perf_counter()
+_startup: Dict[str, float] = {}
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def span(name: str):
+    """Context manager timing the enclosed block under `name`."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name: str):
+    """Decorator form of span()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name: str, seconds: float):
+    """Adds one duration sample (in seconds) to the ring buffer for `name`."""
+    buffer = _buffers.get(name)
+    if buffer is None:
+        with _lock:
+            buffer = _buffers.setdefault(name, deque(maxlen=RING_SIZE))
+    buffer.append(seconds)
+
+
+def reset():
+    with _lock:
+        _buffers.clear()
+
+
+def mark_startup(name: str) -> Optional[float]:
+    """
+    Records the time since boot for a startup milestone (e.g. "first_suggestion").
+    Only the first call per name counts; returns the seconds, or None if already marked.
+    """
+    with _lock:
+        if name in _startup:
+            return None
+        seconds = time.perf_counter() - _BOOT
+        _startup[name] = seconds
+    print(f"Startup: {name} after {seconds:.2f}s")
+    return seconds
+
+
+def startup_times() -> Dict[str, float]:
+    """Milestone name -> seconds since boot. Kept across reset()."""
+    with _lock:
+        return dict(_startup)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summary() -> List[Dict]:
+    """One row per span name with count and p50/p95/p99/max in milliseconds."""
+    with _lock:
+        snapshot = {name: list(buffer) for name, buffer in _buffers.items()}
+
+    rows = []
+    for name, values in sorted(snapshot.items()):
+        if not values:
+            continue
+        values.sort()
+        rows.append({
+            "span": name,
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 50) * 1000, 3),
+            "p95_ms": round(_percentile(values, 95) * 1000, 3),
+            "p99_ms": round(_percentile(values, 99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3),
+        })
+    return rows
+
+
+def export_json() -> str:
+    """Summary plus raw samples (ms) as a JSON document."""
+    with _lock:
+        samples = {name: [round(v * 1000, 3) for v in buffer] for name, buffer in _buffers.items()}
+    return json.dumps({
+        "exported_at": datetime.now().isoformat(),
+        "ring_size": RING_SIZE,
+        "summary": summary(),
+        "startup_s": startup_times(),
+        "samples_ms": samples,
+    }, indent=2, ensure_ascii=False)
@@ -13,6 +13,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Tuple, List, Dict
 
+from src.profiling import timed
+
 # Security config file path
 SECURITY_DIR = Path(__file__).parent / "data"
 USERS_FILE = SECURITY_DIR / "users.json"
@@ -36,6 +38,10 @@ DEFAULT_USER_PASSWORD = "tactics2026"
 # Admin username
 ADMIN_USERNAME = "host_this_app"
 
+# Generation numbers bumped on every write (used as cache keys by the app)
+_users_generation = 0
+_log_generation = 0
+
 
 def ensure_security_dir():
     """Ensure security directory exists"""
@@ -47,6 +53,7 @@ def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
+@timed("security.load_users")
 def load_users() -> Dict:
     """Load users database"""
     ensure_security_dir()
@@ -71,11 +78,33 @@ def load_users() -> Dict:
     return users
 
 
+@timed("security.save_users")
 def save_users(users: Dict):
     """Save users database"""
+    global _users_generation
     ensure_security_dir()
     with open(USERS_FILE, 'w', encoding='utf-8') as f:
         json.dump(users, f, indent=2, ensure_ascii=False)
+    _users_generation += 1
+
+
+def _file_version(path: Path, generation: int) -> Tuple:
+    """Cheap cache key: in-process generation plus the file's stat"""
+    try:
+        st = path.stat()
+        return (generation, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (generation, 0, 0)
+
+
+def get_users_version() -> Tuple:
+    """Cache key that changes whenever the users database is written"""
+    return _file_version(USERS_FILE, _users_generation)
+
+
+def get_access_log_version() -> Tuple:
+    """Cache key that changes whenever the access log is written"""
+    return _file_version(ACCESS_LOG_FILE, _log_generation)
 
 
 def user_exists(username: str) -> bool:
@@ -233,8 +262,10 @@ def get_failed_attempts(username: str) -> int:
     return 0
 
 
+@timed("security.log_access")
 def log_access(event_type: str, username: str = ""):
     """Log an access event"""
+    global _log_generation
     ensure_security_dir()
     
     log_entries = []
@@ -256,8 +287,10 @@ def log_access(event_type: str, username: str = ""):
     
     with open(ACCESS_LOG_FILE, 'w', encoding='utf-8') as f:
         json.dump(log_entries, f, indent=2, ensure_ascii=False)
+    _log_generation += 1
 
 
+@timed("security.get_access_log")
 def get_access_log(limit: int = 50) -> List[Dict]:
     """Get access log (admin only)"""
     if ACCESS_LOG_FILE.exists():
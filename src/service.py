@@ -0,0 +1,313 @@
+"""
+Local HTTP/JSON recommendation service.
+
+Serves analyze_situation and the database statistics from a long-lived,
+preloaded play store, without going through a Streamlit rerun.
+
+    GET  /health                  -> {"status": "ok", "plays": ..., "version": ...}
+    GET  /statistics              -> get_statistics()
+    GET  /suggest?down=3&distance=2&field_position=80&keyword=s.howell
+    GET  /suggest?down=3&distance=2&team=KC&season=2023  -> one opponent's partitions only
+    POST /suggest  {"Down": 3, "Distance": 2, "FieldPosition": 80, "Quarter": "4Q"}
+    GET  /suggest?down=3&distance=2&game=<game_id>  -> weighted by today's live game
+    GET  /players?down=3&distance=2&role=Rusher,Target  -> most frequent players
+    GET  /timings                 -> profiling summary
+    GET  /metrics                 -> request coalescing counters
+    GET  /live                    -> live game ids
+    POST /live/<game_id>/plays    -> log one play of a live game
+    GET  /live/<game_id>/tendencies?down=3&distance=2
+
+Connections are HTTP/1.1 keep-alive and are handled by a fixed thread pool.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from src import profiling
+from src import coalesce, live_game, player_stats
+from src.analyzer import SCOPE_KEYS, coalesced_analyze_situation, normalize_situation
+from src.data_manager import (
+    get_data_version, get_partition_store, get_play_store, get_statistics, get_text_index, get_player_stats
+)
+from src.play_index import PlayIndex
+from src.text_index import TextIndex
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+DEFAULT_WORKERS = 8
+
+# Idle keep-alive connections are closed after this many seconds so they do not pin a worker
+KEEP_ALIVE_TIMEOUT = 15
+MAX_BODY_BYTES = 64 * 1024
+SUGGESTION_CACHE_SIZE = 256
+
+# Query-string aliases for GET /suggest
+_QUERY_ALIASES = {
+    "field_position": "FieldPosition",
+    "score_diff": "ScoreDiff",
+    "time_remaining": "TimeRemaining",
+    "date_from": "DateFrom",
+    "date_to": "DateTo",
+}
+
+
+class PlayStore:
+    """
+    Keeps the play table, its PlayIndex, the full-text index and the
+    per-player table in memory and reloads them only when the database
+    version changes. Suggestions are cached per
+    (version, situation).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._df = pd.DataFrame()
+        self._index: Optional[PlayIndex] = None
+        self._text_index: Optional[TextIndex] = None
+        self._players = player_stats.empty_table()
+        self._suggestions: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+
+    def snapshot(self) -> tuple:
+        """Returns (version, DataFrame), reloading if a write, rollback or reset changed the version."""
+        version = get_data_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    with profiling.span("service.reload"):
+                        self._df, self._index = get_play_store()
+                        self._text_index = get_text_index()
+                        self._players = get_player_stats()
+                    self._version = version
+                    self._suggestions.clear()
+        return self._version, self._df
+
+    def players(self) -> pd.DataFrame:
+        self.snapshot()
+        with self._lock:
+            return self._players
+
+    def suggest(self, situation: Dict[str, Any]) -> tuple:
+        """Returns (version, suggestions) for an already normalized situation."""
+        self.snapshot()
+        with self._lock:
+            version, df, index, text_index = self._version, self._df, self._index, self._text_index
+        key = (version, tuple(sorted(situation.items())))
+        with self._lock:
+            cached = self._suggestions.get(key)
+            if cached is not None:
+                self._suggestions.move_to_end(key)
+                return version, cached
+        scope = [situation.get(key) for key in SCOPE_KEYS]
+        if any(value is not None for value in scope):
+            # Team / season / date scoped: only the matching partitions are read
+            df, index = get_partition_store(*scope)
+            text_index = None
+        result = coalesced_analyze_situation(df, situation, version, index=index, text_index=text_index) \
+            if not df.empty else []
+        with self._lock:
+            self._suggestions[key] = result
+            while len(self._suggestions) > SUGGESTION_CACHE_SIZE:
+                self._suggestions.popitem(last=False)
+        profiling.mark_startup("first_suggestion")
+        return version, result
+
+
+def _json_default(value):
+    """Makes numpy scalars JSON serializable."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body are written separately; without this, keep-alive
+    # responses stall on Nagle + delayed ACK (~40 ms each)
+    disable_nagle_algorithm = True
+    server_version = "TacticsService/1.0"
+
+    # --- helpers ---
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        token = self.server.api_token
+        if not token:
+            return True
+        header = self.headers.get("Authorization", "")
+        return header == f"Bearer {token}" or self.headers.get("X-API-Key") == token
+
+    def _read_json_body(self) -> Optional[Dict[str, Any]]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        raw = self.rfile.read(length) if length else b"{}"
+        data = json.loads(raw.decode("utf-8") or "{}")
+        if not isinstance(data, dict):
+            raise ValueError("request body must be a JSON object")
+        return data
+
+    def _suggest(self, raw_situation: Dict[str, Any]):
+        start = time.perf_counter()
+        try:
+            situation = normalize_situation(raw_situation)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        game_id = raw_situation.get("game") or raw_situation.get("game_id")
+        with profiling.span("service.suggest"):
+            version, suggestions = self.server.store.suggest(situation)
+        if game_id:
+            try:
+                game = live_game.get_game(str(game_id))
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            suggestions = game.weight_suggestions(suggestions, situation["Down"], situation["Distance"],
+                                                  situation["FieldPosition"])
+        self._send_json(200, {
+            "situation": situation,
+            "game_id": game_id,
+            "suggestions": suggestions,
+            "version": version,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        })
+
+    def _dispatch(self, route):
+        """Runs a route; an unexpected error is answered with 500 instead of dropping the connection."""
+        try:
+            route()
+        except Exception as e:
+            print(f"Error handling {self.command} {self.path}: {e!r}")
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    # --- routes ---
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def _get(self):
+        if not self._authorized():
+            self._send_json(401, {"error": "unauthorized"})
+            return
+        url = urlparse(self.path)
+        if url.path == "/health":
+            version, df = self.server.store.snapshot()
+            self._send_json(200, {"status": "ok", "plays": len(df), "version": version})
+        elif url.path == "/statistics":
+            self._send_json(200, get_statistics())
+        elif url.path == "/suggest":
+            params = {_QUERY_ALIASES.get(k, k): v[-1] for k, v in parse_qs(url.query).items()}
+            self._suggest(params)
+        elif url.path == "/players":
+            params = {_QUERY_ALIASES.get(k, k): v[-1] for k, v in parse_qs(url.query).items()}
+            roles = [r for r in params.pop("role", "").split(",") if r] or player_stats.BALL_CARRIER_ROLES
+            try:
+                situation = normalize_situation(params)
+                limit = int(params.get("limit", 10))
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            top = player_stats.top_players(self.server.store.players(), roles, situation["Down"],
+                                           situation["Distance"], situation["FieldPosition"], limit=limit)
+            self._send_json(200, {"situation": situation, "roles": roles, "players": top.to_dict("records")})
+        elif url.path == "/timings":
+            self._send_json(200, profiling.summary())
+        elif url.path == "/metrics":
+            self._send_json(200, {"coalescing": coalesce.all_stats()})
+        elif url.path == "/live":
+            self._send_json(200, {"games": live_game.list_games()})
+        elif url.path.startswith("/live/") and url.path.endswith("/tendencies"):
+            params = {_QUERY_ALIASES.get(k, k): v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                game = live_game.get_game(url.path.split("/")[2])
+                situation = normalize_situation(params)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(200, {
+                "game_id": game.game_id,
+                "plays": game.play_count,
+                "tendencies": game.tendencies(situation["Down"], situation["Distance"], situation["FieldPosition"]),
+            })
+        else:
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+
+    def _post(self):
+        if not self._authorized():
+            self._send_json(401, {"error": "unauthorized"})
+            return
+        url = urlparse(self.path)
+        try:
+            body = self._read_json_body()
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        if url.path == "/suggest":
+            self._suggest(body)
+        elif url.path.startswith("/live/") and url.path.endswith("/plays"):
+            try:
+                game = live_game.get_game(url.path.split("/")[2])
+                row = game.append_play(body)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(200, {"game_id": game.game_id, "plays": game.play_count, "play": row})
+        else:
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+
+    def log_message(self, format, *args):
+        # Request logging goes through the timing spans instead of stderr
+        pass
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each connection to a fixed-size thread pool."""
+
+    def __init__(self, address, handler, workers: int = DEFAULT_WORKERS,
+                 store: Optional[PlayStore] = None, api_token: Optional[str] = None):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tactics-api")
+        self.store = store or PlayStore()
+        self.api_token = api_token
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS,
+                  api_token: Optional[str] = None, preload: bool = True) -> PooledHTTPServer:
+    """Builds the server; with preload=True the play table is loaded before the first request."""
+    server = PooledHTTPServer((host, port), RecommendationHandler, workers=workers, api_token=api_token)
+    if preload:
+        server.store.snapshot()
+    return server
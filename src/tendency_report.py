@@ -0,0 +1,271 @@
+"""
+Opponent tendency reports (scouting packs).
+
+For every team partition (see partitions.py) the report collects its
+situational tendencies:
+- summary: run/pass split, success rate, 3rd-down and red-zone success,
+  big-play, sack and turnover rates
+- down x distance: run/pass split, success rate and average gain per bucket
+- favourite plays overall, on 3rd down and in the red zone, grouped like
+  analyze_situation (PlayType plus course, see get_strategy_name)
+
+build_reports() runs the teams in parallel on a process pool (the work is
+pandas-bound, so threads would take turns on one core). Each worker reads
+only its team's partitions and writes <team>[_<season>].xlsx / .html; the
+league overview (index.html, overview.xlsx) links them.
+"""
+
+import hashlib
+import html
+import multiprocessing
+import os
+import re
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src import data_manager
+from src.analyzer import distance_buckets, field_zones, play_families, strategy_names
+
+REPORTS_DIR = "data/reports"
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+FORMATS = ("xlsx", "html")
+
+# Big play: a run of BIG_RUN_YARDS or more, a pass of BIG_PASS_YARDS or more
+BIG_RUN_YARDS = 10
+BIG_PASS_YARDS = 20
+TOP_PLAYS = 10
+
+BUCKET_LABELS = {"short": "ショート (1-3)", "medium": "ミドル (4-7)", "long": "ロング (8+)"}
+
+_HTML_STYLE = """
+body { font-family: sans-serif; margin: 2em; color: #222; }
+h1 { border-bottom: 3px solid #1e3a8a; padding-bottom: .3em; }
+h2 { color: #1e3a8a; margin-top: 1.6em; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #ccc; padding: .3em .7em; text-align: right; }
+th { background: #eef2ff; }
+td:first-child, th:first-child { text-align: left; }
+"""
+
+
+def _percent(mask: pd.Series, within: Optional[pd.Series] = None) -> float:
+    """Share of True in mask (restricted to within), in percent; NaN for no plays."""
+    if within is not None:
+        mask = mask[within]
+    return round(float(mask.mean()) * 100, 1) if len(mask) else np.nan
+
+
+def _strategy_table(plays: pd.DataFrame) -> pd.DataFrame:
+    """Most used strategies with their share, average gain and success rate."""
+    columns = ["プレー", "回数", "割合%", "平均ヤード", "成功率%"]
+    if plays.empty:
+        return pd.DataFrame(columns=columns)
+    stats = plays.groupby("Strategy").agg(count=("yards", "size"), avg_gain=("yards", "mean"),
+                                          success_rate=("success", "mean")).reset_index()
+    stats = stats.sort_values(["count", "avg_gain"], ascending=[False, False]).head(TOP_PLAYS)
+    return pd.DataFrame({
+        "プレー": stats["Strategy"], "回数": stats["count"],
+        "割合%": (stats["count"] / len(plays) * 100).round(1),
+        "平均ヤード": stats["avg_gain"].round(1), "成功率%": (stats["success_rate"] * 100).round(1),
+    })[columns]
+
+
+def team_tendencies(table: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Report sections (sheet name -> table) for the plays of one team."""
+    plays = pd.DataFrame(index=table.index)
+    plays["Strategy"] = strategy_names(table)
+    plays["family"] = play_families(plays["Strategy"])
+    plays["yards"] = pd.to_numeric(table["YardsGained"], errors='coerce').fillna(0)
+    plays["success"] = pd.to_numeric(table["Success"], errors='coerce').fillna(0)
+    plays["down"] = pd.to_numeric(table["Down"], errors='coerce')
+    plays["bucket"] = distance_buckets(table["Distance"])
+    plays["zone"] = field_zones(table["FieldPosition"])
+    for flag in ("is_sack", "is_turnover", "is_td"):
+        plays[flag] = pd.to_numeric(table[flag], errors='coerce').fillna(0) if flag in table.columns else 0
+
+    is_run, is_pass = plays["family"] == "run", plays["family"] == "pass"
+    scrimmage = is_run | is_pass
+    third, redzone = plays["down"] == 3, plays["zone"] == "redzone"
+    big = (is_run & (plays["yards"] >= BIG_RUN_YARDS)) | (is_pass & (plays["yards"] >= BIG_PASS_YARDS))
+    success = plays["success"] > 0
+
+    summary = [
+        ("プレー数", len(plays)),
+        ("ラン割合%", _percent(is_run, scrimmage)),
+        ("パス割合%", _percent(is_pass, scrimmage)),
+        ("成功率%", _percent(success)),
+        ("平均獲得ヤード", round(float(plays["yards"].mean()), 1) if len(plays) else np.nan),
+        (f"3rdダウン成功率% ({int(third.sum())}回)", _percent(success, third)),
+        (f"レッドゾーン成功率% ({int(redzone.sum())}回)", _percent(success, redzone)),
+        ("レッドゾーンTD率%", _percent(plays["is_td"] > 0, redzone)),
+        (f"ビッグプレー率% (ラン{BIG_RUN_YARDS}+/パス{BIG_PASS_YARDS}+ヤード)", _percent(big, scrimmage)),
+        ("サック率% (パスプレー中)", _percent(plays["is_sack"] > 0, is_pass)),
+        ("ターンオーバー率%", _percent(plays["is_turnover"] > 0, scrimmage)),
+    ]
+    # object column: the play count stays an integer next to the rates
+    summary = pd.DataFrame({"項目": [label for label, _ in summary],
+                            "値": pd.Series([value for _, value in summary], dtype=object)})
+
+    rows = []
+    for down in (1, 2, 3, 4):
+        for bucket, label in BUCKET_LABELS.items():
+            cell = (plays["down"] == down) & (plays["bucket"] == bucket) & scrimmage
+            if not cell.any():
+                continue
+            rows.append({"ダウン": down, "残りヤード": label, "プレー数": int(cell.sum()),
+                         "ラン%": _percent(is_run, cell), "パス%": _percent(is_pass, cell),
+                         "成功率%": _percent(success, cell),
+                         "平均ヤード": round(float(plays.loc[cell, "yards"].mean()), 1)})
+    down_distance = pd.DataFrame(rows, columns=["ダウン", "残りヤード", "プレー数", "ラン%", "パス%", "成功率%", "平均ヤード"])
+
+    return {
+        "概要": summary,
+        "ダウン×距離": down_distance,
+        "よく使うプレー": _strategy_table(plays[scrimmage]),
+        "3rdダウン": _strategy_table(plays[scrimmage & third]),
+        "レッドゾーン": _strategy_table(plays[scrimmage & redzone]),
+    }
+
+
+def write_excel(sections: Dict[str, pd.DataFrame], path: str):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for name, df in sections.items():
+            df.to_excel(writer, sheet_name=name[:31], index=False)
+
+
+def write_html(title: str, sections: Dict[str, pd.DataFrame], path: str, intro: str = ""):
+    body = [f"<h1>{html.escape(title)}</h1>", intro]
+    for name, df in sections.items():
+        body.append(f"<h2>{html.escape(name)}</h2>")
+        body.append(df.to_html(index=False, na_rep="-", border=0, escape=True) if not df.empty else "<p>データなし</p>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+                f"<style>{_HTML_STYLE}</style></head><body>{''.join(body)}</body></html>")
+
+
+def _file_stem(team: str, season: Optional[str]) -> str:
+    """
+    Report file name: the team name with unsafe characters replaced, plus a
+    short hash of the name when that changed it or it has lowercase letters,
+    so two teams never share a file ("A B" / "A_B", or "kc" / "KC" on a
+    case-insensitive file system).
+    """
+    stem = re.sub(r"[^\w-]+", "_", team).strip("_") or "team"
+    if stem != team or team != team.upper():
+        stem = f"{stem}_{hashlib.sha1(team.encode('utf-8')).hexdigest()[:8]}"
+    return f"{stem}_{season}" if season else stem
+
+
+def team_report(team: str, season: Optional[str], out_dir: str, formats: Sequence[str] = FORMATS) -> Dict:
+    """
+    Writes the report of one team (one season, or all of them) to out_dir and
+    returns its overview line. Runs in a worker process: only the team's
+    partitions are read.
+    """
+    table, _ = data_manager.get_partition_store(team, season)
+    sections = team_tendencies(table)
+    stem = _file_stem(team, season)
+    title = f"{team} {season or '全シーズン'} 傾向レポート"
+    files = []
+    if "xlsx" in formats:
+        write_excel(sections, os.path.join(out_dir, f"{stem}.xlsx"))
+        files.append(f"{stem}.xlsx")
+    if "html" in formats:
+        write_html(title, sections, os.path.join(out_dir, f"{stem}.html"))
+        files.append(f"{stem}.html")
+    values = dict(zip(sections["概要"]["項目"], sections["概要"]["値"]))
+    line = {"チーム": team, "シーズン": season or "全て"}
+    line.update({key.split(" (")[0]: value for key, value in values.items()})
+    line["ファイル"] = files
+    return line
+
+
+def report_scopes(season: Optional[str] = None, teams: Optional[List[str]] = None) -> List[tuple]:
+    """(team, season) of every report to build: each named team of the catalog (or of teams)."""
+    catalog = data_manager.get_partition_catalog()
+    if catalog is None:
+        found = {team for team in data_manager.get_statistics()["teams"]}
+    else:
+        found = {part["team"] for part in catalog["partitions"].values()
+                 if part["team"] and (season is None or part["season"] == str(season))}
+    if teams:
+        found &= set(teams)
+    return [(team, season) for team in sorted(found)]
+
+
+def build_reports(out_dir: str, season: Optional[str] = None, teams: Optional[List[str]] = None,
+                  workers: int = DEFAULT_WORKERS, formats: Sequence[str] = FORMATS,
+                  progress: Optional[Callable[[float, str], None]] = None,
+                  check_cancel: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    Builds the report of every team (see report_scopes) in parallel and the
+    league overview. progress(fraction, message) is called as teams finish;
+    check_cancel() may raise to stop (pending teams are dropped).
+    Returns {"dir", "teams", "files"}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # Built once here, so the workers only read it
+    data_manager.get_partition_catalog()
+    scopes = report_scopes(season, teams)
+    lines = []
+    if scopes:
+        # spawn: the app process has threads, which fork does not copy safely
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(scopes))), mp_context=context) as pool:
+            futures = {pool.submit(team_report, team, scope_season, out_dir, tuple(formats)): team
+                       for team, scope_season in scopes}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    lines.append(future.result())
+                    if progress is not None:
+                        progress(done / len(scopes), f"{done}/{len(scopes)} チーム ({futures[future]})")
+                    if check_cancel is not None:
+                        check_cancel()
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    overview = pd.DataFrame(lines).sort_values(["チーム", "シーズン"], ignore_index=True) if lines else pd.DataFrame()
+    files = [name for line in lines for name in line["ファイル"]]
+    if not overview.empty:
+        links = overview["ファイル"].map(lambda names: " ".join(
+            f'<a href="{html.escape(name)}">{html.escape(name.rsplit(".", 1)[1])}</a>' for name in names))
+        table = overview.drop(columns="ファイル")
+        if "xlsx" in formats:
+            write_excel({"リーグ概要": table}, os.path.join(out_dir, "overview.xlsx"))
+            files.append("overview.xlsx")
+        if "html" in formats:
+            # Cells are escaped (team names come from uploads); the links replace placeholders afterwards
+            nonce = uuid.uuid4().hex
+            page = table.assign(レポート=[f"{nonce}-{i}-" for i in range(len(links))]).to_html(
+                index=False, na_rep="-", border=0, escape=True)
+            for i, link in enumerate(links):
+                page = page.replace(f"{nonce}-{i}-", link, 1)
+            write_html(f"リーグ概要 {season or '全シーズン'}", {}, os.path.join(out_dir, "index.html"), intro=page)
+            files.append("index.html")
+    return {"dir": out_dir, "teams": len(lines), "files": files}
+
+
+def zip_reports(out_dir: str) -> str:
+    """Packs a report folder into <out_dir>.zip and returns its path."""
+    return shutil.make_archive(out_dir, "zip", out_dir)
+
+
+def run_report_job(ctx, params: Dict) -> Dict:
+    """
+    Background job (see jobs.py): builds the scouting pack of params
+    ["season"] / ["teams"] under REPORTS_DIR/<job id> and zips it. A resumed
+    job builds the pack again.
+    """
+    out_dir = os.path.join(REPORTS_DIR, ctx.job_id)
+    result = build_reports(out_dir, params.get("season"), params.get("teams"),
+                           int(params.get("workers") or DEFAULT_WORKERS),
+                           progress=lambda fraction, message: ctx.save(progress=fraction * 0.95, message=message),
+                           check_cancel=ctx.check_cancel)
+    result["zip"] = zip_reports(out_dir)
+    return result
@@ -0,0 +1,174 @@
+"""
+Inverted full-text index over the play descriptions (Detail).
+
+A play id is the row position of the play in the database CSV, which only
+ever grows by appending (rewrites keep the row order). The index maps each
+term to the sorted ids of the plays containing it and is stored next to the
+CSV, so a search costs a few dictionary lookups and sorted-array
+intersections instead of a str.contains over every description.
+
+Terms are lowercased words plus player tokens: "14-S.Howell" is indexed as
+"14-s.howell", "s.howell" and "howell", so a player can be searched with or
+without the jersey number and initial.
+
+Query syntax: whitespace separated terms are ANDed; "double quoted" text is
+a phrase (all its terms, then verified as a substring of the description).
+"""
+
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Player tokens first ("14-s.howell"), then plain words
+_TOKEN_RE = re.compile(r"(?:\d{1,2}-)?[a-z]{1,3}\.[a-z][\w'\-]*|\w+")
+# The same player tokens, capturing (name without number, surname)
+_PLAYER_RE = re.compile(r"(?<![\w.])(?:\d{1,2}-)?([a-z]{1,3}\.([a-z][\w'\-]*))")
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def tokenize(text) -> List[str]:
+    """Distinct terms of one description, in order of first appearance."""
+    if not isinstance(text, str):
+        return []
+    text = text.lower()
+    terms = _TOKEN_RE.findall(text)
+    for name, surname in _PLAYER_RE.findall(text):
+        terms += [name, surname]
+    return list(dict.fromkeys(terms))
+
+
+def parse_query(query: str) -> tuple:
+    """'pass "short right" s.howell' -> (['pass', 's.howell'], ['short right'])."""
+    phrases = [p.strip().lower() for p in _PHRASE_RE.findall(query or "") if p.strip()]
+    rest = _PHRASE_RE.sub(" ", query or "")
+    return tokenize(rest), phrases
+
+
+def _build_postings(texts: Iterable, start: int) -> Dict[str, np.ndarray]:
+    """term -> sorted ids for the given texts, numbered from start (same terms as tokenize)."""
+    texts = pd.Series(list(texts), dtype=object)
+    texts.index = np.arange(start, start + len(texts))
+    lower = texts.where(texts.map(lambda t: isinstance(t, str)), "").str.lower()
+    words = lower.str.findall(_TOKEN_RE).explode().dropna()
+    if words.empty:
+        return {}
+    players = lower.str.findall(_PLAYER_RE).explode().dropna()
+    names = pd.DataFrame(players.tolist(), index=players.index, columns=["name", "surname"]) \
+        if not players.empty else pd.DataFrame(columns=["name", "surname"])
+    terms = pd.concat([words, names["name"], names["surname"]])
+    pairs = pd.DataFrame({"id": terms.index.to_numpy(dtype=np.int64), "term": terms.to_numpy(dtype=object)})
+    pairs = pairs.drop_duplicates()
+
+    codes, uniques = pd.factorize(pairs["term"])
+    ids = pairs["id"].to_numpy()
+    order = np.lexsort((ids, codes))
+    ids_sorted = ids[order]
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {term: ids_sorted[bounds[i]:bounds[i + 1]] for i, term in enumerate(uniques)}
+
+
+class TextIndex:
+    def __init__(self, postings: Optional[Dict[str, np.ndarray]] = None, doc_count: int = 0):
+        self.postings = postings or {}
+        self.doc_count = doc_count
+        # ids -> descriptions, used for phrase checks when the caller has no text at hand
+        self.fetch_text: Optional[Callable[[np.ndarray], Sequence]] = None
+
+    @classmethod
+    def build(cls, texts: Sequence) -> "TextIndex":
+        return cls(_build_postings(texts, 0), len(texts))
+
+    def extend(self, texts: Sequence) -> "TextIndex":
+        """Returns a new index with texts appended as ids doc_count, doc_count + 1, ..."""
+        postings = dict(self.postings)
+        for term, ids in _build_postings(texts, self.doc_count).items():
+            old = postings.get(term)
+            postings[term] = ids if old is None else np.concatenate([old, ids])
+        return TextIndex(postings, self.doc_count + len(texts))
+
+    # --- queries ---
+    def lookup(self, term: str) -> np.ndarray:
+        return self.postings.get(term, EMPTY)
+
+    def search(self, query: str, fetch_text: Optional[Callable[[np.ndarray], Sequence]] = None) -> np.ndarray:
+        """
+        Ids (ascending) of plays matching every term and phrase of query.
+        fetch_text(ids) returns the descriptions of the candidate ids (default:
+        self.fetch_text); it is needed to check phrase word order, without it
+        phrases match as terms.
+        """
+        fetch_text = fetch_text or self.fetch_text
+        terms, phrases = parse_query(query)
+        for phrase in phrases:
+            terms.extend(tokenize(phrase))
+        terms = list(dict.fromkeys(terms))
+        if not terms:
+            return np.arange(self.doc_count)
+
+        lists = sorted((self.lookup(term) for term in terms), key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            if result.size == 0:
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+
+        if phrases and fetch_text is not None and result.size:
+            texts = pd.Series(list(fetch_text(result)), dtype=object).fillna("").astype(str).str.lower()
+            keep = np.ones(result.size, dtype=bool)
+            for phrase in phrases:
+                keep &= texts.str.contains(phrase, regex=False).to_numpy()
+            result = result[keep]
+        return result
+
+    # --- persistence ---
+    def save(self, path: str):
+        """Stores the index as one .npz (terms, offsets, concatenated ids); atomic."""
+        terms = list(self.postings)
+        lengths = np.fromiter((len(self.postings[t]) for t in terms), dtype=np.int64, count=len(terms))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        ids = np.concatenate([self.postings[t] for t in terms]) if terms else EMPTY
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, terms=np.array(terms, dtype=str), offsets=offsets,
+                     ids=ids.astype(np.int32), doc_count=np.array(self.doc_count))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TextIndex"]:
+        """Returns the stored index, or None if the file is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                terms = data["terms"].tolist()
+                offsets = data["offsets"]
+                ids = data["ids"].astype(np.int64)
+                doc_count = int(data["doc_count"])
+        except Exception as e:
+            print(f"Error reading text index: {e}")
+            return None
+        postings = {term: ids[offsets[i]:offsets[i + 1]] for i, term in enumerate(terms)}
+        return cls(postings, doc_count)
+
+
+def search_positions(df: pd.DataFrame, query: str, index: Optional[TextIndex] = None) -> np.ndarray:
+    """
+    Row positions (ascending) of df whose Detail matches query.
+    Uses the index when it was built for df (the whole table); otherwise
+    every term and phrase is matched as a case-insensitive substring.
+    df may leave out Detail when the index can fetch descriptions itself.
+    """
+    if index is not None and index.doc_count == len(df):
+        fetch_text = (lambda ids: df["Detail"].iloc[ids]) if "Detail" in df.columns else None
+        return index.search(query, fetch_text=fetch_text)
+    terms, phrases = parse_query(query)
+    detail = df["Detail"].astype(str)
+    mask = np.ones(len(df), dtype=bool)
+    for term in terms + phrases:
+        mask &= detail.str.contains(term, case=False, regex=False, na=False).to_numpy()
+    return np.flatnonzero(mask)
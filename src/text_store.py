@@ -0,0 +1,191 @@
+"""
+Compressed side store for the free-text columns.
+
+Play descriptions repeat a lot of boilerplate ("(Shotgun)", "pass short
+right to", team codes, player tokens). Kept as one Python string per row they
+cost ~2x their raw size in memory. The store is built next to the CSV and
+holds them compressed:
+- Detail: blocks of BLOCK_ROWS descriptions, each zlib-compressed with a
+  shared preset dictionary sampled from the first descriptions. Row id ->
+  block = id // BLOCK_ROWS; a block is located by its offset in the
+  concatenated bytes, so one description costs one block decompression.
+- RunCourse / PassCourse: dictionary encoded (distinct values + small integer codes).
+
+A play id is the row position in the database CSV, which only grows by
+appending, so extend() only recompresses the last (partial) block.
+Missing values are stored as "".
+"""
+
+import os
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BLOCK_COLUMN = "Detail"
+DICTIONARY_COLUMNS = ["RunCourse", "PassCourse"]
+STORE_COLUMNS = [BLOCK_COLUMN] + DICTIONARY_COLUMNS
+
+BLOCK_ROWS = 128
+ZDICT_BYTES = 32 * 1024
+LEVEL = 6
+_SEPARATOR = "\x1e"
+
+EMPTY_BYTES = np.empty(0, dtype=np.uint8)
+
+
+def _texts(values: Iterable) -> List[str]:
+    """Values as strings ("" for missing); the separator cannot occur inside."""
+    return [value.replace(_SEPARATOR, " ") if isinstance(value, str) else "" for value in values]
+
+
+def _code_dtype(count: int):
+    """Smallest signed integer type holding codes 0..count-1."""
+    return np.int8 if count <= 127 else np.int16 if count <= 32767 else np.int32
+
+
+def _compress(texts: List[str], zdict: bytes) -> bytes:
+    compressor = zlib.compressobj(LEVEL, zdict=zdict) if zdict else zlib.compressobj(LEVEL)
+    return compressor.compress(_SEPARATOR.join(texts).encode("utf-8")) + compressor.flush()
+
+
+def _decompress(data: bytes, zdict: bytes) -> List[str]:
+    decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    return (decompressor.decompress(data) + decompressor.flush()).decode("utf-8").split(_SEPARATOR)
+
+
+def _train_zdict(texts: List[str]) -> bytes:
+    """Preset dictionary: the first descriptions, up to ZDICT_BYTES (zlib favours the end)."""
+    return _SEPARATOR.join(texts).encode("utf-8")[:ZDICT_BYTES]
+
+
+class TextStore:
+    def __init__(self, blocks: np.ndarray = EMPTY_BYTES, offsets: Optional[np.ndarray] = None,
+                 zdict: bytes = b"", codes: Optional[Dict[str, np.ndarray]] = None,
+                 values: Optional[Dict[str, List[str]]] = None, row_count: int = 0, raw_bytes: int = 0):
+        self.blocks = blocks
+        self.offsets = offsets if offsets is not None else np.zeros(1, dtype=np.int64)
+        self.zdict = zdict
+        self.codes = codes or {col: np.empty(0, dtype=np.int8) for col in DICTIONARY_COLUMNS}
+        self.values = values or {col: [] for col in DICTIONARY_COLUMNS}
+        self.row_count = row_count
+        self.raw_bytes = raw_bytes
+        # Last decompressed block (neighbouring ids are usually read together)
+        self._cached_block = (-1, [])
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "TextStore":
+        """Store for the text columns of df (database layout, rows in id order)."""
+        return cls().extend(df)
+
+    def extend(self, df: pd.DataFrame) -> "TextStore":
+        """Returns a new store with the rows of df appended as ids row_count, row_count + 1, ..."""
+        texts = _texts(df[BLOCK_COLUMN] if BLOCK_COLUMN in df.columns else [""] * len(df))
+        raw_bytes = self.raw_bytes + sum(len(text.encode("utf-8")) for text in texts)
+
+        zdict = self.zdict
+        first_block = self.row_count // BLOCK_ROWS
+        if len(zdict) < ZDICT_BYTES:
+            # The dictionary is still filling up (small store): rebuild it and every block
+            texts = self._block_texts(0, first_block + 1) + texts
+            zdict = _train_zdict(texts)
+            first_block = 0
+        elif self.row_count % BLOCK_ROWS:
+            # Reopen the last, partial block
+            texts = self._block_texts(first_block, first_block + 1) + texts
+
+        keep = self.offsets[first_block]
+        chunks = [_compress(texts[i:i + BLOCK_ROWS], zdict) for i in range(0, len(texts), BLOCK_ROWS)]
+        sizes = np.fromiter((len(chunk) for chunk in chunks), dtype=np.int64, count=len(chunks))
+        blocks = np.concatenate([self.blocks[:keep], np.frombuffer(b"".join(chunks), dtype=np.uint8)])
+        offsets = np.concatenate([self.offsets[:first_block + 1], keep + np.cumsum(sizes)])
+
+        codes, values = {}, {}
+        for col in DICTIONARY_COLUMNS:
+            known = self.values[col]
+            new = pd.Series(_texts(df[col] if col in df.columns else [""] * len(df)), dtype=object)
+            lookup = {value: i for i, value in enumerate(known)}
+            added = [value for value in new.unique() if value not in lookup]
+            lookup.update({value: len(known) + i for i, value in enumerate(added)})
+            values[col] = known + added
+            raw_bytes += sum(len(value.encode("utf-8")) for value in new)
+            dtype = _code_dtype(len(values[col]))
+            codes[col] = np.concatenate([self.codes[col].astype(dtype), new.map(lookup).to_numpy(dtype=dtype)])
+
+        return TextStore(blocks, offsets, zdict, codes, values, self.row_count + len(df), raw_bytes)
+
+    # --- random access ---
+    def _block(self, number: int) -> List[str]:
+        cached = self._cached_block
+        if cached[0] != number:
+            start, stop = self.offsets[number], self.offsets[number + 1]
+            cached = (number, _decompress(self.blocks[start:stop].tobytes(), self.zdict))
+            self._cached_block = cached
+        return cached[1]
+
+    def _block_texts(self, first: int, stop: int) -> List[str]:
+        texts = []
+        for number in range(first, min(stop, len(self.offsets) - 1)):
+            texts += self._block(number)
+        return texts
+
+    def get(self, column: str, ids) -> List[str]:
+        """Values of one store column for the given row ids (in the order of ids)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size and (ids.min() < 0 or ids.max() >= self.row_count):
+            raise IndexError("row id out of range")
+        if column in self.codes:
+            values = np.array(self.values[column], dtype=object)
+            return values[self.codes[column][ids]].tolist()
+        if column != BLOCK_COLUMN:
+            raise KeyError(column)
+        # Each needed block is decompressed once
+        result = [""] * ids.size
+        for position in np.argsort(ids // BLOCK_ROWS, kind="stable"):
+            row = int(ids[position])
+            result[position] = self._block(row // BLOCK_ROWS)[row % BLOCK_ROWS]
+        return result
+
+    def get_frame(self, ids, columns: Iterable[str] = STORE_COLUMNS) -> pd.DataFrame:
+        """Store columns for the given row ids as a DataFrame indexed by id."""
+        ids = [int(i) for i in ids]
+        return pd.DataFrame({col: self.get(col, ids) for col in columns}, index=ids)
+
+    def sizes(self) -> Dict[str, int]:
+        """Raw text bytes of the store columns vs. bytes held (blocks + dictionaries + codes)."""
+        stored = self.blocks.nbytes + self.offsets.nbytes + len(self.zdict)
+        stored += sum(codes.nbytes for codes in self.codes.values())
+        stored += sum(len(value.encode("utf-8")) for values in self.values.values() for value in values)
+        return {"rows": self.row_count, "raw_bytes": self.raw_bytes, "stored_bytes": int(stored)}
+
+    # --- persistence ---
+    def save(self, path: str):
+        """Stores everything in one uncompressed .npz (the blocks already are); atomic."""
+        arrays = {
+            "blocks": self.blocks, "offsets": self.offsets,
+            "zdict": np.frombuffer(self.zdict, dtype=np.uint8),
+            "row_count": np.array(self.row_count), "raw_bytes": np.array(self.raw_bytes),
+        }
+        for col in DICTIONARY_COLUMNS:
+            arrays[f"codes_{col}"] = self.codes[col]
+            arrays[f"values_{col}"] = np.array(self.values[col], dtype=str)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TextStore"]:
+        """Returns the stored text store, or None if the file is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                codes = {col: data[f"codes_{col}"] for col in DICTIONARY_COLUMNS}
+                values = {col: data[f"values_{col}"].tolist() for col in DICTIONARY_COLUMNS}
+                return cls(data["blocks"], data["offsets"], data["zdict"].tobytes(), codes, values,
+                           int(data["row_count"]), int(data["raw_bytes"]))
+        except Exception as e:
+            print(f"Error reading text store: {e}")
+            return None
@@ -0,0 +1,207 @@
+"""
+Ingest validation and coercion.
+
+Uploaded plays are checked against SCHEMA with column-wise (vectorized)
+operations before they reach the database:
+- numbers are coerced and range checked (Down 1-4, Distance, ...)
+- yard lines are normalized to 0-100 (own goal line = 0): "OWN 25",
+  "自陣25" and "-25" are own territory, "OPP 30", "敵陣30" and "+30" the
+  opponent's (-> 70), a plain number is taken as is
+- Success is read through a token table ("成功", "yes", "○", 1, ...)
+- scouting dimensions (src/dimensions.py) are trimmed and, where declared,
+  spelled one way (hash "left" / "左" -> "L")
+
+Nothing is guessed. A missing required value or an unreadable one is an
+error, and rows with errors are rejected: validate_plays() returns them
+with a compact per-row message, and quarantine() keeps them (as uploaded)
+in data/quarantine/ so they can be fixed and uploaded again. Declared
+defaults (a blank YardsGained counts as 0, and those a sheet layout
+declares, see with_defaults) are applied and counted, so the caller can log
+them.
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src import dimensions
+
+QUARANTINE_DIR = "data/quarantine"
+
+SUCCESS_TOKENS = {
+    "1": 1, "success": 1, "successful": 1, "yes": 1, "y": 1, "true": 1, "s": 1, "o": 1, "○": 1, "◯": 1, "成功": 1,
+    "0": 0, "fail": 0, "failure": 0, "failed": 0, "no": 0, "n": 0, "false": 0, "f": 0, "x": 0, "×": 0, "失敗": 0,
+}
+
+# column -> rule. kind: "int" / "number" / "yardline" / "token" / "text" / "category".
+# required: a missing value is an error; default: value used for a missing one.
+SCHEMA: Dict[str, dict] = {
+    "PlayType": {"kind": "text", "required": True},
+    "Down": {"kind": "int", "min": 1, "max": 4, "required": True},
+    "Distance": {"kind": "number", "min": 0, "max": 99, "required": True},
+    "FieldPosition": {"kind": "yardline", "min": 0, "max": 100},
+    "YardsGained": {"kind": "number", "min": -110, "max": 110, "default": 0},
+    "Success": {"kind": "token", "tokens": SUCCESS_TOKENS, "default": 0},
+    "ScoreDiff": {"kind": "number", "min": -200, "max": 200},
+}
+SCHEMA.update({dimension.column: {"kind": "category", "tokens": dimension.tokens}
+               for dimension in dimensions.DIMENSIONS})
+
+MESSAGES = {
+    "missing": "値がありません",
+    "not_number": "数値ではありません",
+    "not_integer": "整数ではありません",
+    "out_of_range": "範囲外",
+    "unknown_token": "不明な値",
+    "bad_yardline": "ヤード位置を解釈できません",
+}
+
+_YARDLINE_RE = re.compile(r"^(own|opp|自陣|敵陣|相手陣?|[-+])?\s*(\d+(?:\.\d+)?)$", re.IGNORECASE)
+_OPPONENT_SIDE = {"opp", "敵陣", "相手", "相手陣", "+"}
+
+
+def _missing(values: pd.Series) -> np.ndarray:
+    return (values.isna() | (values.astype(str).str.strip() == "")).to_numpy()
+
+
+def _to_number(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values, errors="coerce").astype("float64")
+
+
+def _to_yardline(values: pd.Series) -> pd.Series:
+    """Yard lines -> 0-100 from the own goal line; NaN where not readable."""
+    is_text = values.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    # Numeric cells: a negative number is an own-territory yard line
+    numbers = _to_number(values.where(~is_text)).abs()
+    text = values[is_text].astype(str).str.strip().str.lower()
+    if not text.empty:
+        parts = text.str.extract(_YARDLINE_RE)
+        yards = pd.to_numeric(parts[1], errors="coerce")
+        opponent = parts[0].isin(_OPPONENT_SIDE)
+        numbers.loc[text.index] = yards.where(~opponent, 100 - yards)
+    return numbers
+
+
+def _to_token(values: pd.Series, tokens: Dict[str, int]) -> pd.Series:
+    numbers = _to_number(values)
+    result = numbers.where(numbers.isin(set(tokens.values())))
+    text = values[result.isna() & values.notna()].astype(str).str.strip().str.lower()
+    result.loc[text.index] = text.map(tokens)
+    return result
+
+
+def _to_category(values: pd.Series, tokens) -> pd.Series:
+    """Trimmed text; with tokens, the declared spelling (NaN for an unknown value)."""
+    text = values.astype(str).str.strip()
+    if tokens:
+        text = text.str.lower().map(tokens)
+    return text
+
+
+def with_defaults(defaults: Dict[str, object], schema: Dict[str, dict] = SCHEMA) -> Dict[str, dict]:
+    """Schema in which the columns of defaults are optional, a missing value taking the given default."""
+    schema = dict(schema)
+    for col, value in defaults.items():
+        schema[col] = dict(schema[col], required=False, default=value)
+    return schema
+
+
+def validate_plays(df: pd.DataFrame, schema: Dict[str, dict] = SCHEMA) -> Tuple[pd.DataFrame, pd.Series, Dict[str, int]]:
+    """
+    Checks and coerces the schema columns of df (standard column names).
+    Returns (valid rows, coerced; error message per rejected row, indexed
+    like df; number of declared defaults applied per column). Columns of the
+    schema that df does not have count as missing.
+    """
+    result = df.copy()
+    errors = pd.Series("", index=df.index, dtype=object)
+    defaults = {}
+
+    def flag(bad: np.ndarray, col: str, code: str, values: pd.Series):
+        if not bad.any():
+            return
+        shown = values[bad]
+        shown = np.where(_missing(shown), "", " (" + shown.astype(str).str.slice(0, 20) + ")")
+        errors[bad] = errors[bad] + f"{col}: {MESSAGES[code]}" + shown + "; "
+
+    for col, rule in schema.items():
+        if col not in result.columns:
+            if not rule.get("required"):
+                continue
+            result[col] = np.nan
+        values = result[col]
+        missing = _missing(values)
+
+        kind = rule["kind"]
+        if kind == "text":
+            coerced = values.where(~missing, "")
+        elif kind == "category":
+            coerced = _to_category(values, rule.get("tokens"))
+            flag(~missing & coerced.isna().to_numpy(), col, "unknown_token", values)
+        elif kind == "yardline":
+            coerced = _to_yardline(values)
+            flag(~missing & coerced.isna().to_numpy(), col, "bad_yardline", values)
+        elif kind == "token":
+            coerced = _to_token(values, rule["tokens"])
+            flag(~missing & coerced.isna().to_numpy(), col, "unknown_token", values)
+        else:
+            coerced = _to_number(values)
+            flag(~missing & coerced.isna().to_numpy(), col, "not_number", values)
+            if kind == "int":
+                flag((coerced.notna() & (coerced != coerced.round())).to_numpy(), col, "not_integer", values)
+
+        if "min" in rule:
+            flag((coerced.notna() & ((coerced < rule["min"]) | (coerced > rule["max"]))).to_numpy(),
+                 col, "out_of_range", values)
+
+        if rule.get("required"):
+            flag(missing, col, "missing", values)
+        elif "default" in rule and missing.any():
+            coerced = coerced.where(~missing, rule["default"])
+            defaults[col] = int(missing.sum())
+        elif kind == "category":
+            coerced = coerced.where(~missing, "")
+        elif kind != "text":
+            # Optional and blank: stays blank
+            coerced = coerced.where(~missing, np.nan)
+        result[col] = coerced
+
+    bad = (errors != "").to_numpy()
+    valid = result[~bad].copy()
+    for col, rule in schema.items():
+        if col in valid.columns and rule["kind"] in ("int", "token") and not valid[col].isna().any():
+            valid[col] = valid[col].astype(int)
+    return valid, errors[bad].str.rstrip("; "), defaults
+
+
+def quarantine(rows: pd.DataFrame, errors: pd.Series, source: str) -> str:
+    """
+    Writes rejected rows (as uploaded) with their error messages to a CSV in
+    QUARANTINE_DIR and returns its path. rows needs the columns _sheet and
+    _row (spreadsheet row number) besides the uploaded ones.
+    """
+    os.makedirs(QUARANTINE_DIR, exist_ok=True)
+    stem = re.sub(r"[^\w.-]+", "_", os.path.splitext(os.path.basename(source))[0]) or "upload"
+    path = os.path.join(QUARANTINE_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{stem}.csv")
+    out = rows.copy()
+    out.insert(0, "_errors", errors.to_numpy())
+    front = ["_sheet", "_row", "_errors"]
+    out[front + [col for col in out.columns if col not in front]].to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+
+def error_report(rows: pd.DataFrame, errors: pd.Series, limit: int = 200) -> pd.DataFrame:
+    """Compact report for display: sheet, spreadsheet row and the errors of each rejected row."""
+    report = pd.DataFrame({"シート": rows["_sheet"].to_numpy(), "行": rows["_row"].to_numpy(),
+                           "エラー": errors.to_numpy()})
+    return report.head(limit)
+
+
+def summarize(errors: pd.Series) -> List[str]:
+    """Error counts per column and kind, e.g. ["Down: 範囲外 × 12", ...]."""
+    parts = errors.str.split("; ").explode().str.replace(r"\s*\(.*\)$", "", regex=True)
+    return [f"{message} × {count}" for message, count in parts.value_counts().items()]
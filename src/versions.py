@@ -0,0 +1,119 @@
+"""
+Database versions.
+
+Every write creates a new immutable version: the first `rows` rows (`size`
+bytes) of one CSV file. Writes append, so consecutive versions are prefixes
+of the same file and share every earlier row on disk. A write on top of an
+older version (after a rollback) or with a new layout starts a new file
+(copy-on-write); files still referenced by a kept version move to
+data/versions/.
+
+A small JSON manifest next to the CSV lists the recent versions and points
+at the current one. Rollback and reset only move that pointer (reset points
+at version 0, the empty database). The current version id is the data
+version: every cache and index built on the data is keyed by it.
+
+Appends tagged with the same group (a background import job writing chunk
+by chunk) replace each other's version as long as they follow one another
+in the same file, so one import is one history entry.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Versions kept for rollback (version 0, the empty database, is always kept)
+MAX_VERSIONS = 20
+
+
+def empty_manifest() -> Dict:
+    return {
+        "current": 0,
+        "next_id": 1,
+        "next_file": 1,
+        # Id of the file at DATA_FILE_PATH and its size when we last wrote it
+        "live_file": None,
+        "live_size": 0,
+        "versions": [{"id": 0, "file": None, "rows": 0, "size": 0, "created": None, "note": "空"}],
+    }
+
+
+def load_manifest(path: str) -> Optional[Dict]:
+    """Returns the manifest, or None if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(path: str, manifest: Dict):
+    """Writes the manifest atomically (temp file + rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def find(manifest: Dict, version_id: int) -> Optional[Dict]:
+    for version in manifest["versions"]:
+        if version["id"] == version_id:
+            return version
+    return None
+
+
+def current(manifest: Dict) -> Dict:
+    return find(manifest, manifest["current"]) or manifest["versions"][0]
+
+
+def new_file_id(manifest: Dict) -> str:
+    file_id = f"g{manifest['next_file']}"
+    manifest["next_file"] += 1
+    return file_id
+
+
+def add_version(manifest: Dict, file_id: str, rows: int, size: int, note: str = "",
+                group: Optional[str] = None) -> Dict:
+    """
+    Appends a version, makes it current and drops the oldest beyond
+    MAX_VERSIONS. A version of the same group directly before it in the same
+    file is replaced.
+    """
+    previous = current(manifest)
+    if group is not None and previous.get("group") == group and previous["file"] == file_id:
+        manifest["versions"] = [v for v in manifest["versions"] if v["id"] != previous["id"]]
+    version = {
+        "id": manifest["next_id"],
+        "file": file_id,
+        "rows": int(rows),
+        "size": int(size),
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "note": note,
+    }
+    if group is not None:
+        version["group"] = group
+    manifest["next_id"] += 1
+    manifest["versions"].append(version)
+    manifest["current"] = version["id"]
+    others = [v for v in manifest["versions"] if v["id"] != 0]
+    if len(others) > MAX_VERSIONS:
+        dropped = {v["id"] for v in others[:len(others) - MAX_VERSIONS]}
+        manifest["versions"] = [v for v in manifest["versions"] if v["id"] not in dropped]
+    return version
+
+
+def drop_file(manifest: Dict, file_id: str):
+    """Forgets every version stored in file_id (e.g. the file was changed outside the app)."""
+    manifest["versions"] = [v for v in manifest["versions"] if v["file"] != file_id]
+    if find(manifest, manifest["current"]) is None:
+        manifest["current"] = 0
+
+
+def referenced_files(manifest: Dict) -> set:
+    return {v["file"] for v in manifest["versions"] if v["file"] is not None}
+
+
+def history(manifest: Dict) -> List[Dict]:
+    """Versions newest first, with a flag for the current one."""
+    return [dict(v, current=v["id"] == manifest["current"]) for v in reversed(manifest["versions"])]